@@ -18,7 +18,7 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-from app.models.models import User, UserProfile, FitnessPlan
+from app.models.models import User, UserProfile, FitnessPlan, ConversationHistory, ConversationSummary, PlanChange, PlanVersion
 from app.database import Base
 
 target_metadata = Base.metadata
@@ -0,0 +1,28 @@
+"""add conversation_summaries.summarized_through_id
+
+Revision ID: a7e4d2c9f051
+Revises: c93e1f7a4b68
+Create Date: 2026-10-17 23:18:42.604517
+
+Existing summaries keep summarized_through_id NULL; the app then resumes
+after summarized_until as before and records the turn id from the next fold.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e4d2c9f051'
+down_revision: Union[str, None] = 'c93e1f7a4b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversation_summaries', sa.Column('summarized_through_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('conversation_summaries', 'summarized_through_id')
@@ -0,0 +1,70 @@
+"""add unique indexes on users.user_name, user_profiles.user_id and fitness_plans.user_id
+
+Revision ID: c93e1f7a4b68
+Revises: f2b7c4d8e013
+Create Date: 2026-10-17 22:41:09.532871
+
+The migration does not change data: if any of these columns has duplicate
+values it stops and names them. Review and fix them with
+fix_duplicate_user_rows.py (report only by default), then run it again.
+The indexes are built with CREATE UNIQUE INDEX CONCURRENTLY on PostgreSQL,
+so reads and writes continue while they build. A concurrent build that
+fails (e.g. a duplicate written after the check) leaves an invalid index
+behind; it is dropped on the next run, so the migration can just be retried.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c93e1f7a4b68'
+down_revision: Union[str, None] = 'f2b7c4d8e013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column)
+INDEXES = [
+    ('ix_users_user_name', 'users', 'user_name'),
+    ('ix_user_profiles_user_id', 'user_profiles', 'user_id'),
+    ('ix_fitness_plans_user_id', 'fitness_plans', 'user_id'),
+]
+
+
+def _check_no_duplicates(bind):
+    """Fail with the duplicated values instead of letting an index build fail on them"""
+    problems = []
+    for _, table, column in INDEXES:
+        values = sa.column(column)
+        rows = bind.execute(sa.select(values, sa.func.count()).select_from(sa.table(table, values))
+                            .group_by(values).having(sa.func.count() > 1)).all()
+        if rows:
+            examples = ", ".join(f"{value!r} x{count}" for value, count in rows[:5])
+            problems.append(f"{table}.{column}: {len(rows)} duplicated value(s), e.g. {examples}")
+    if problems:
+        raise RuntimeError(
+            "Cannot add the unique user indexes while duplicates exist:\n  " + "\n  ".join(problems)
+            + "\nRun `python fix_duplicate_user_rows.py` to review them, fix them "
+            "(--apply, --rename-users), then run this migration again."
+        )
+
+
+def upgrade() -> None:
+    # Offline (--sql) there is no data to check
+    if not context.is_offline_mode():
+        _check_no_duplicates(op.get_bind())
+
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            if postgresql:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(name, table, [column], unique=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
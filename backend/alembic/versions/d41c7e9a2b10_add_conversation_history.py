@@ -0,0 +1,48 @@
+"""add conversation_history and conversation_summaries
+
+Revision ID: d41c7e9a2b10
+Revises: b5e44d5d424a
+Create Date: 2026-10-17 10:12:41.208316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7e9a2b10'
+down_revision: Union[str, None] = 'b5e44d5d424a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('conversation_history',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('plan_id', sa.String(), nullable=True),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('plan_changes', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_conversation_history_user_timestamp', 'conversation_history', ['user_id', 'timestamp'], unique=False)
+    op.create_table('conversation_summaries',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('summarized_until', sa.DateTime(), nullable=True),
+    sa.Column('turn_count', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('conversation_summaries')
+    op.drop_index('ix_conversation_history_user_timestamp', table_name='conversation_history')
+    op.drop_table('conversation_history')
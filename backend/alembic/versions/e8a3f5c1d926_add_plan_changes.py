@@ -0,0 +1,41 @@
+"""add plan_changes
+
+Revision ID: e8a3f5c1d926
+Revises: d41c7e9a2b10
+Create Date: 2026-10-17 13:41:09.552870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3f5c1d926'
+down_revision: Union[str, None] = 'd41c7e9a2b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('plan_changes',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('plan_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('change_type', sa.String(), nullable=True),
+    sa.Column('target', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('before_data', sa.JSON(), nullable=True),
+    sa.Column('after_data', sa.JSON(), nullable=True),
+    sa.Column('reason', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_plan_changes_plan_id'), 'plan_changes', ['plan_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_plan_changes_plan_id'), table_name='plan_changes')
+    op.drop_table('plan_changes')
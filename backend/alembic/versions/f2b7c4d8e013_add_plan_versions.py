@@ -0,0 +1,88 @@
+"""add plan_versions
+
+Revision ID: f2b7c4d8e013
+Revises: e8a3f5c1d926
+Create Date: 2026-10-17 15:02:47.118304
+
+"""
+import json
+import uuid
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7c4d8e013'
+down_revision: Union[str, None] = 'e8a3f5c1d926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('fitness_plans', sa.Column('last_modified', sa.DateTime(), nullable=True))
+    op.add_column('fitness_plans', sa.Column('version', sa.Integer(), nullable=True))
+    op.add_column('plan_changes', sa.Column('version', sa.Integer(), nullable=True))
+    plan_versions = op.create_table('plan_versions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('base_version', sa.Integer(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=True),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_plan_versions_user_version', 'plan_versions', ['user_id', 'version'], unique=True)
+
+    # Existing plans become version 1, stored as a snapshot. Offline (--sql)
+    # there are no rows to read: plans keep version NULL, which the app
+    # treats as saved before versioning (their next save is version 1)
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    plans = sa.table('fitness_plans',
+        sa.column('id', sa.String()), sa.column('user_id', sa.String()),
+        sa.column('workout_plan', sa.JSON()), sa.column('meal_plan', sa.JSON()),
+        sa.column('health_metrics', sa.JSON()), sa.column('tips', sa.JSON()),
+        sa.column('created_at', sa.DateTime()), sa.column('last_modified', sa.DateTime()),
+        sa.column('version', sa.Integer()),
+    )
+    rows = bind.execute(sa.select(plans.c.user_id, plans.c.workout_plan, plans.c.meal_plan,
+                                  plans.c.health_metrics, plans.c.tips, plans.c.created_at)).all()
+    now = datetime.utcnow()
+    snapshots = []
+    for row in rows:
+        document = {
+            "health_metrics": row.health_metrics or {},
+            "workout_plan": row.workout_plan or {},
+            "meal_plan": row.meal_plan or {},
+            "tips": row.tips or [],
+        }
+        snapshots.append({
+            "id": str(uuid.uuid4()),
+            "user_id": row.user_id,
+            "version": 1,
+            "kind": "snapshot",
+            "base_version": 1,
+            "data": document,
+            "size_bytes": len(json.dumps(document, separators=(",", ":"), default=str)),
+            "source": "migration",
+            "created_at": row.created_at or now,
+        })
+    if snapshots:
+        op.bulk_insert(plan_versions, snapshots)
+    bind.execute(plans.update().values(version=1, last_modified=sa.func.coalesce(plans.c.created_at, now)))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_plan_versions_user_version', table_name='plan_versions')
+    op.drop_table('plan_versions')
+    op.drop_column('plan_changes', 'version')
+    op.drop_column('fitness_plans', 'version')
+    op.drop_column('fitness_plans', 'last_modified')
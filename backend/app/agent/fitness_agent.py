@@ -1,30 +1,48 @@
 #### LOCAL Strands Implementation for Dev ####
 
 from dotenv import load_dotenv
-import os, boto3, json
+import os, boto3, json, time
 from strands import Agent
 from strands.models.bedrock import BedrockModel # BedRock: fully managed services that offers high performing FMs from leading AI companies via unified API
 from app.agent.tools import get_agent_tools
-from app.agent.prompts import get_fitness_system_prompt, get_plan_generation_prompt, get_structure_prompt
-from app.schemas.agent_schemas import PlanGenerationResponse
+from app.agent.generation import TOOLS_MODE, PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE
+from app.agent.generation import UsageRecorder, usage_snapshot, usage_delta, FanOutBusyError, iter_fan_out, complete_branches
+from app.agent.generation import check_plan_complete, prompt_prefix
+from app.agent.prompts import get_fitness_system_prompt, get_plan_generation_prompt, get_structure_prompt, get_precomputed_plan_prompt, get_single_pass_prompt
+from app.agent.prompts import get_workout_branch_prompt, get_meal_branch_prompt, get_tips_branch_prompt, get_personalize_prompt
+from app.agent.prompts import get_chat_system_prompt, get_chat_prompt, get_summary_prompt
+from app.agent.health_calculations import compute_health_metrics
+from app.schemas.agent_schemas import PlanGenerationResponse, WorkoutPlan, MealPlan, PlanTips
+from app.services.aws_clients import aws_clients, build_bedrock_model
 
 load_dotenv()  # load AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION
 
 class FitnessAgent:
-    def __init__(self):
+    def __init__(self, model: BedrockModel = None):
         # initalize agent w/ model and optional tools
         self.tools = get_agent_tools() 
-        self.model_id = os.environ['AWS_BEDROCK_MODEL_ID']
-        self.model = BedrockModel(model_id=self.model_id)
-        self.agent = Agent(model=self.model, tools=self.tools)
+        if model is None:
+            # The client uses the process-wide session and pooled connection settings
+            model = build_bedrock_model(model_id=os.environ['AWS_BEDROCK_MODEL_ID'])
+        # Pass a model to share it (and its client) between agents
+        self.model = model
+        self.model_id = self.model.get_config().get("model_id")
         self.system_prompt = get_fitness_system_prompt()
+        # Token usage of every model call this agent makes (branches included)
+        self.usage = UsageRecorder()
+        self.agent = Agent(model=self.model, tools=self.tools, system_prompt=self.system_prompt,
+                           callback_handler=self.usage)
+        # Tool-free agent for precomputed mode: no tool specs, no tool turns
+        self.planner = Agent(model=self.model, tools=[], system_prompt=self.system_prompt,
+                             callback_handler=self.usage)
+        self.last_usage = {}
 
 
     def test_bedrock():
         """
         Ensure agent is connected to BedRock 
         """
-        client = boto3.client('bedrock', region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'))
+        client = aws_clients.get('bedrock')
         resp = client.list_foundation_models()
         for fm in resp.get("modelSummaries", []):
             print(fm.get("modelName"), fm.get("modelArn"))  
@@ -33,30 +51,81 @@ class FitnessAgent:
         prompt = "What is the best way to learn AWS?"
         return self.agent(prompt=prompt)
 
-    def generate_fitness_plan(self, user_profile: dict) -> dict:
-        """Generate comprehensive fitness plan for user"""
+    def generate_fitness_plan(self, user_profile: dict, mode: str = TOOLS_MODE, archetype: dict = None) -> dict:
+        """
+        Generate comprehensive fitness plan for user.
+
+        In PRECOMPUTED_MODE the health metrics are calculated here and given
+        to the model as facts, so it never spends a turn on tool calls.
+        SINGLE_PASS_MODE additionally asks for the schema directly in one
+        call, falling back to the two-step path if the output doesn't
+        validate. FAN_OUT_MODE runs workout, meal and tips sub-agents
+        concurrently (see _generate_fan_out). PERSONALIZE_MODE adapts an
+        archetype plan (see app/services/plan_archetypes.py) in one structured
+        call. Round trips, tokens (cache reads/writes included) and latency
+        land in self.last_usage.
+        """
         try:
             print(f"#######GENERATING PLAN FOR USER: {user_profile} #######")
-            
-            # Step 1: Let agent use tools to calculate and plan (tools available)
-            planning_prompt = get_plan_generation_prompt(user_profile)
-            raw_response = self.agent(prompt=planning_prompt, system=self.system_prompt)
-            
-            # Step 2: Structure the response (only PlanGenerationResponse tool available)
-            structure_prompt = f"""
-            {get_structure_prompt()}
-            
-            Previous analysis:
-            {raw_response}
-            """
-            
-            structured_response = self.agent.structured_output(
-                PlanGenerationResponse, 
-                prompt=structure_prompt
-            )
+            start = time.perf_counter()
+            self.last_usage = {"mode": mode, "error": "generation failed"}
+
+            metrics = None
+            if mode == PERSONALIZE_MODE and not archetype:
+                mode = SINGLE_PASS_MODE
+            if mode in (PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE):
+                try:
+                    metrics = compute_health_metrics(user_profile)
+                except ValueError as e:
+                    print(f"⚠️ Falling back to tool mode: {e}")
+                    mode = TOOLS_MODE
+
+            agent = self.planner if metrics else self.agent
+            before = usage_snapshot(agent, self.usage)
+            structured_calls = 0
+            fallback = False
+
+            structured_response = None
+            if mode == FAN_OUT_MODE:
+                try:
+                    structured_response, report = self._generate_fan_out(user_profile, metrics)
+                    structured_calls += len(report["branch_ms"]) + len(report["retried"])
+                    if structured_response is None:
+                        fallback = True
+                except FanOutBusyError as e:
+                    print(f"⚠️ {e}, using single pass")
+                    mode = SINGLE_PASS_MODE
+            if mode in (SINGLE_PASS_MODE, PERSONALIZE_MODE):
+                structured_calls += 1
+                prefix = prompt_prefix(self.system_prompt, output_model=PlanGenerationResponse)
+                if mode == PERSONALIZE_MODE:
+                    prompt = get_personalize_prompt(user_profile, metrics, archetype, prefix=prefix)
+                else:
+                    prompt = get_single_pass_prompt(user_profile, metrics, prefix=prefix)
+                try:
+                    structured_response = agent.structured_output(PlanGenerationResponse, prompt=prompt)
+                    check_plan_complete(structured_response)
+                except Exception as e:
+                    print(f"⚠️ One-shot output rejected, using two-step path: {e}")
+                    structured_response = None
+                    fallback = True
+                    agent.messages = []
+
+            if structured_response is None:
+                structured_calls += 1
+                structured_response = self._generate_two_step(agent, user_profile, metrics)
+
+            usage = usage_delta(before, usage_snapshot(agent, self.usage))
+            usage["model_calls"] += structured_calls
+            usage.update(mode=mode, fallback=fallback, latency_ms=round((time.perf_counter() - start) * 1000))
+            if mode == FAN_OUT_MODE:
+                usage.update(report)
+            self.last_usage = usage
+            print(f"📊 Plan generation usage: {usage}")
             
             return {
-                "health_metrics": structured_response.health_metrics,
+                # Precomputed metrics are exact; don't let the model restate them
+                "health_metrics": metrics or structured_response.health_metrics,
                 "workout_plan": structured_response.workout_plan,
                 "meal_plan": structured_response.meal_plan,
                 "tips": structured_response.tips,
@@ -71,8 +140,105 @@ class FitnessAgent:
                 "tips": [],
             }
     
-    # def chat(self, message: str, context: dict = None) -> str:
-    #      """Chat with agent about plans"""
-    #     # YOUR TASK: Handle conversational interactions
-    #     pass
+    def _generate_fan_out(self, user_profile: dict, metrics: dict):
+        """
+        Workout and meal sub-plans are independent once the targets are
+        known, so run them (plus tips) as concurrent sub-agents. Returns
+        (plan or None, report); a failed workout or meal branch is retried
+        once, and the plan is None if it fails again (a failed tips branch
+        only leaves the tips empty). Raises FanOutBusyError if the branches
+        can't all start now.
+        """
+        def branch(schema, build_prompt):
+            # Fresh conversation per branch; the model and its client are shared
+            prompt = build_prompt(user_profile, metrics, prefix=prompt_prefix(self.system_prompt, output_model=schema))
+            return lambda: Agent(model=self.model, tools=[], system_prompt=self.system_prompt,
+                                 callback_handler=self.usage).structured_output(schema, prompt=prompt)
+
+        branches = {
+            "workout": branch(WorkoutPlan, get_workout_branch_prompt),
+            "meal": branch(MealPlan, get_meal_branch_prompt),
+            "tips": branch(PlanTips, get_tips_branch_prompt),
+        }
+        results = {}
+        report = {"branch_ms": {}, "partial": [], "retried": []}
+        for name, result, error, elapsed_ms in iter_fan_out(branches):
+            report["branch_ms"][name] = elapsed_ms
+            if error:
+                print(f"⚠️ Fan-out branch '{name}' failed: {error}")
+                report["partial"].append(name)
+            else:
+                results[name] = result
+
+        if not complete_branches(branches, results, report):
+            return None, report
+        plan = PlanGenerationResponse(
+            health_metrics=metrics,
+            workout_plan=results["workout"],
+            meal_plan=results["meal"],
+            tips=results["tips"].tips if "tips" in results else [],
+        )
+        return plan, report
+
+    def _generate_two_step(self, agent, user_profile: dict, metrics: dict = None) -> PlanGenerationResponse:
+        """Free-text analysis, then a second call to structure it"""
+        # Step 1: Plan (tool mode lets the agent calculate metrics itself)
+        prefix = prompt_prefix(self.system_prompt, () if metrics else self.tools)
+        if metrics:
+            planning_prompt = get_precomputed_plan_prompt(user_profile, metrics, prefix=prefix)
+        else:
+            planning_prompt = get_plan_generation_prompt(user_profile, prefix=prefix)
+        raw_response = agent(prompt=planning_prompt)
+        
+        # Step 2: Structure the response (only PlanGenerationResponse tool available)
+        structure_prompt = f"""
+        {get_structure_prompt()}
+        
+        Previous analysis:
+        {raw_response}
+        """
+        
+        return agent.structured_output(
+            PlanGenerationResponse, 
+            prompt=structure_prompt
+        )
+
+    async def stream_chat(self, message: str, history: list, plan_digest: str = "", summary: str = ""):
+        """
+        Chat with agent about plans. history holds the recent turns as
+        Strands messages; older turns only reach the model through summary.
+        Yields ("delta", text) as the reply streams, then ("usage", dict).
+        """
+        # Fresh, quiet conversation per turn; the model and its client are shared
+        agent = Agent(model=self.model, tools=[], messages=history, system_prompt=get_chat_system_prompt(),
+                      callback_handler=None)
+        async for event in agent.stream_async(get_chat_prompt(plan_digest, summary, message)):
+            if "data" in event:
+                yield "delta", event["data"]
+            elif "result" in event:
+                usage = event["result"].metrics.accumulated_usage
+                yield "usage", {
+                    "input_tokens": usage.get("inputTokens", 0),
+                    "output_tokens": usage.get("outputTokens", 0),
+                    "cache_read_input_tokens": usage.get("cacheReadInputTokens", 0),
+                }
+
+    def regenerate_section(self, schema, build_prompt):
+        """
+        One structured call for a slice of the plan (a DayWorkout or a Meal);
+        build_prompt(prefix) returns its prompt. Returns (section, usage);
+        the conversation is fresh every time.
+        """
+        recorder = UsageRecorder()
+        agent = Agent(model=self.model, tools=[], system_prompt=self.system_prompt, callback_handler=recorder)
+        prompt = build_prompt(prompt_prefix(self.system_prompt, output_model=schema))
+        section = agent.structured_output(schema, prompt=prompt)
+        usage = usage_snapshot(agent, recorder)
+        usage["model_calls"] += 1
+        return section, usage
+
+    def summarize_chat(self, summary: str, turns: list) -> str:
+        """Fold (message, response) turns into the rolling chat recap"""
+        agent = Agent(model=self.model, tools=[], system_prompt=get_chat_system_prompt(), callback_handler=None)
+        return str(agent(get_summary_prompt(summary, turns))).strip()
     
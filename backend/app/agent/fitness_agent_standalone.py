@@ -1,8 +1,12 @@
 # Standalone Fitness Agent for PRODUCTION AgentCore Runtime
-# All dependencies included in this file to avoid import issues
+# Deployed from backend/app/agent alone (with its requirements.txt), so the
+# modules it shares with the backend sit next to it: health_calculations.py,
+# prompts.py and generation.py
 
 from dotenv import load_dotenv
-import os, boto3, json
+import os, boto3, json, queue, threading, time, asyncio
+from contextlib import contextmanager
+from botocore.config import Config as BotocoreConfig
 from strands import Agent, tool
 from strands.models.bedrock import BedrockModel
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
@@ -43,111 +47,33 @@ if not os.getenv('AWS_BEDROCK_MODEL_ID'):
 # Create AgentCore app instance
 app = BedrockAgentCoreApp()
 
-# ===== HEALTH CALCULATIONS (copied from backend/app/utils/health_calculations.py) =====
-
-def imperial_to_metric(weight_lbs: float, height_feet: int, height_inches: float) -> dict:
-    """Convert imperial measurements to metric system"""
-    total_inches = (height_feet * 12) + height_inches
-    height_meters = total_inches * 0.0254
-    weight_kgs = weight_lbs * 0.453592
-    return {"height": height_meters, "weight": weight_kgs}
-
-@tool
-def calculate_bmi(weight_lbs: float, height_feet: int, height_inches: float) -> dict:
-    """Calculate Body Mass Index (BMI) and health category from imperial measurements."""
-    metric = imperial_to_metric(weight_lbs, height_feet, height_inches)
-    bmi = round(metric['weight'] / (metric['height'] ** 2), 1)
-    
-    if bmi < 18.5:
-        category = 'Underweight'
-    elif bmi < 25:
-        category = 'Normal weight'
-    elif bmi < 30:
-        category = 'Overweight'
-    else:
-        category = 'Obese'
-    
-    return {"bmi": bmi, "category": category}
-
-@tool
-def calculate_bmr(weight_lbs: float, height_feet: int, height_inches: float, age: int, gender: str) -> dict:
-    """Calculate Basal Metabolic Rate (BMR) - calories burned at rest per day."""
-    metric = imperial_to_metric(weight_lbs, height_feet, height_inches)
-    
-    male_bmr = (10 * metric['weight']) + (6.25 * metric['height'] * 100) - (5 * age) + 5
-    female_bmr = (10 * metric['weight']) + (6.25 * metric['height'] * 100) - (5 * age) - 161
-    other_bmr = (male_bmr + female_bmr) / 2
-    
-    if gender.lower() == 'male':
-        bmr = int(male_bmr)
-    elif gender.lower() == 'female':
-        bmr = int(female_bmr)
-    else: 
-        bmr = int(other_bmr)
-
-    return {"bmr": bmr}
-
-@tool
-def calculate_tdee(bmr: int, activity_level: str) -> dict:
-    """Calculate Total Daily Energy Expenditure (TDEE) - total calories burned per day."""
-    activity_multiplier = {
-        "sedentary": 1.2,
-        "light": 1.375,
-        "moderate": 1.55,
-        "active": 1.725,
-        "very_active": 1.9
-    }
-    tdee = bmr * activity_multiplier.get(activity_level.lower(), 1.55)
-    return {"tdee": tdee}
-
-def calorie_goal(tdee: float, goal: str) -> float:
-    """Adjust TDEE based on fitness goal to create calorie deficit/surplus."""
-    if goal == "lose_weight":
-        return tdee * 0.8  # 20% deficit for sustainable weight loss
-    elif goal == "gain_weight":
-        return tdee * 1.15  # 15% surplus for lean muscle gain
-    return tdee  # maintenance calories
-
-@tool
-def calculate_macros(tdee: float, goal: str, weight_lbs: float) -> dict:
-    """Calculate optimal daily macronutrient breakdown for fitness goals."""
-    calories = calorie_goal(tdee, goal)
-
-    # Goal-specific protein and fat ratios
-    if goal == 'lose_weight':
-        protein_per_lb = 1.1  # Higher protein preserves muscle in deficit
-        fat_ratio = 0.27      # 27% of calories from fat
-    elif goal == 'gain_weight':
-        protein_per_lb = 0.9  # Adequate protein for muscle building
-        fat_ratio = 0.25      # 25% of calories from fat
-    else:  # maintain or other
-        protein_per_lb = 1.0  # Standard protein intake
-        fat_ratio = 0.27      # 27% of calories from fat
-
-    # Calculate macronutrients
-    protein_grams = weight_lbs * protein_per_lb
-    protein_calories = protein_grams * 4
-
-    fat_calories = calories * fat_ratio
-    fat_grams = fat_calories / 9
-
-    carbs_calories = calories - (protein_calories + fat_calories)
-    carbs_grams = carbs_calories / 4
-
-    return {
-        'protein_g': round(protein_grams),
-        'carbs_g': round(carbs_grams),
-        'fat_g': round(fat_grams),
-        'protein_calories': round(protein_calories),
-        'carbs_calories': round(carbs_calories),
-        'fat_calories': round(fat_calories),
-        'total_calories': round(calories),
-        'protein_percentage': round(protein_calories / calories * 100),
-        'carb_percentage': round(carbs_calories / calories * 100),
-        'fat_percentage': round(fat_calories / calories * 100)
-    }
-
-# ===== PROMPTS (copied from backend/app/agent/prompts.py) =====
+# ===== HEALTH CALCULATIONS (shared core: backend/app/agent/health_calculations.py) =====
+# The core is standard library only and lives next to this file, so it is
+# deployed with the runtime; the calculators are wrapped as tools here.
+try:
+    from app.agent.health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros, compute_health_metrics
+except ImportError:  # deployed alone: this directory is the runtime's top level
+    from health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros, compute_health_metrics
+
+# Short tool descriptions keep the tool specs sent with every call small
+TOOL_DESCRIPTIONS = {
+    "calculate_bmi": "Calculate Body Mass Index (BMI) and health category from imperial measurements.",
+    "calculate_bmr": "Calculate Basal Metabolic Rate (BMR) - calories burned at rest per day.",
+    "calculate_tdee": "Calculate Total Daily Energy Expenditure (TDEE) - total calories burned per day.",
+    "calculate_macros": "Calculate optimal daily macronutrient breakdown for fitness goals.",
+}
+AGENT_TOOLS = [tool(fn, description=TOOL_DESCRIPTIONS[fn.__name__])
+               for fn in (calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros)]
+
+# ===== PROMPTS (shared: backend/app/agent/prompts.py) =====
+try:
+    from app.agent.prompts import get_plan_generation_prompt, get_precomputed_plan_prompt, get_single_pass_prompt
+    from app.agent.prompts import get_workout_branch_prompt, get_meal_branch_prompt, get_tips_branch_prompt, get_personalize_prompt
+except ImportError:  # deployed alone: this directory is the runtime's top level
+    from prompts import get_plan_generation_prompt, get_precomputed_plan_prompt, get_single_pass_prompt
+    from prompts import get_workout_branch_prompt, get_meal_branch_prompt, get_tips_branch_prompt, get_personalize_prompt
+
+# The runtime keeps its own shorter system prompt and a JSON-shaped structure prompt
 def get_fitness_system_prompt():
     return """You are a fitness expert. Use your calculation tools (calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros) to analyze user data. Provide evidence-based workout and meal recommendations."""
 
@@ -182,35 +108,6 @@ def get_fitness_system_prompt():
 #     - Key Tips & Motivation
 #     """
 
-def get_plan_generation_prompt(user_profile: dict):
-    """Step 1: Analysis and planning with tools"""
-    return f"""
-    Analyze this user's fitness profile and create a comprehensive plan using your calculation tools:
-    
-    USER PROFILE:
-    - Age: {user_profile.get('age', 'Not provided')}
-    - Weight: {user_profile.get('weight_lbs', 'Not provided')} lbs
-    - Height: {user_profile.get('height_feet', 'Not provided')}'{user_profile.get('height_inches', 0)}"
-    - Gender: {user_profile.get('gender', 'Not provided')}
-    - Fitness Goal: {user_profile.get('fitness_goal', 'Not provided')}
-    - Activity Level: {user_profile.get('activity_level', 'moderate')}
-    - Workout Days/Week: {user_profile.get('workout_days_per_week', 3)}
-    - Workout Duration: {user_profile.get('workout_duration_minutes', 45)} minutes
-    - Available Equipment: {user_profile.get('available_equipment', [])}
-    - Dietary Preferences: {user_profile.get('dietary_preferences', [])}
-    
-    ANALYSIS STEPS:
-    1. Calculate BMI and assess health status
-    2. Calculate BMR for baseline metabolism
-    3. Calculate TDEE for daily calorie needs
-    4. Calculate optimal macro targets (protein/carbs/fat)
-    5. Design specific workout routines for their goals and equipment
-    6. Create detailed meal planning recommendations
-    7. Identify key success strategies and potential challenges
-    
-    Provide a thorough analysis with all calculations, specific workout details, meal suggestions, and practical advice. Be comprehensive - this analysis will be structured later.
-    """
-
 # def get_structure_prompt():
 #     """Step 2: Structure the analysis into the required format"""
 #     return """
@@ -349,61 +246,219 @@ class PlanGenerationResponse(BaseModel):
     meal_plan: MealPlan = Field(default_factory=MealPlan)
     tips: List[str] = []
 
+# Tips on their own (fan-out generation branch)
+class PlanTips(BaseModel):
+    tips: List[str] = []
+
 class ChatRequest(BaseModel):
     message: str
     plan_context: Dict = {}
 # ===== AGENT CLASS =====
 
+# Generation modes, usage accounting and fan-out (shared: backend/app/agent/generation.py)
+try:
+    from app.agent.generation import TOOLS_MODE, PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE
+    from app.agent.generation import UsageRecorder, usage_snapshot, usage_delta, FanOutBusyError, iter_fan_out, complete_branches
+    from app.agent.generation import check_plan_complete, prompt_prefix
+except ImportError:  # deployed alone
+    from generation import TOOLS_MODE, PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE
+    from generation import UsageRecorder, usage_snapshot, usage_delta, FanOutBusyError, iter_fan_out, complete_branches
+    from generation import check_plan_complete, prompt_prefix
+DEFAULT_MODE = os.getenv("PLAN_GENERATION_MODE", TOOLS_MODE)
+
+# The runtime can't import backend/app/services/aws_clients.py, so its one
+# bedrock-runtime client (the shared model's) gets the same pooled settings
+# there: every pooled agent and fan-out branch calls Bedrock through it
+BEDROCK_CLIENT_CONFIG = BotocoreConfig(
+    max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+    read_timeout=int(os.getenv("BEDROCK_READ_TIMEOUT", "120")),
+)
+
+def build_bedrock_model() -> BedrockModel:
+    # Get model ID with fallback
+    model_id = os.getenv('AWS_BEDROCK_MODEL_ID')
+    if not model_id:
+        # Use the model ID from your .env file as fallback
+        model_id = 'us.anthropic.claude-sonnet-4-20250514-v1:0'
+
+    return BedrockModel(
+        boto_client_config=BEDROCK_CLIENT_CONFIG,
+        model_id=model_id,
+        temperature=0.3,        # Lower = faster, more consistent
+        # max_tokens=2000,        # Limit response length
+        top_p=0.9,             # Focus on most likely tokens
+    )
+
 class FitnessAgentCore:
     """AgentCore-compatible version of FitnessAgent"""
     
-    def __init__(self):
+    def __init__(self, model: BedrockModel = None):
         # Initialize agent with model and tools
-        self.tools = [calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros]
-        
-        # Get model ID with fallback
-        self.model_id = os.getenv('AWS_BEDROCK_MODEL_ID')
-        if not self.model_id:
-            # Use the model ID from your .env file as fallback
-            self.model_id = 'us.anthropic.claude-sonnet-4-20250514-v1:0'
-            # print(f"⚠️ Using fallback model ID: {self.model_id}")
-        # else:
-            # print(f"✅ Using model ID from environment: {self.model_id}")
-
-        self.model = BedrockModel(
-            model_id=self.model_id,
-            temperature=0.3,        # Lower = faster, more consistent
-            # max_tokens=2000,        # Limit response length
-            top_p=0.9              # Focus on most likely tokens
-        )
+        self.tools = list(AGENT_TOOLS)
+        # The model (and its boto client) is shared by every pooled agent
+        self.model = model or build_bedrock_model()
+        self.model_id = self.model.get_config().get("model_id")
 
-        self.agent = Agent(model=self.model, tools=self.tools)
         self.system_prompt = get_fitness_system_prompt()
+        # Token usage of every model call this agent makes (branches included)
+        self.usage = UsageRecorder()
+
+        self.agent = Agent(model=self.model, tools=self.tools, system_prompt=self.system_prompt,
+                           callback_handler=self.usage)
+        # Tool-free agent for precomputed mode: no tool specs, no tool turns
+        self.planner = Agent(model=self.model, tools=[], system_prompt=self.system_prompt,
+                             callback_handler=self.usage)
+        self.last_usage = {}
+
+    def reset(self):
+        """Drop conversation state so the next invocation starts clean"""
+        self.agent.messages = []
+        self.planner.messages = []
+
+    def _prepare(self, user_profile: dict, mode: str, archetype: dict = None):
+        """Pick the agent and step-1 prompt for a mode -> (agent, prompt, metrics, mode)"""
+        if mode == PERSONALIZE_MODE and not archetype:
+            mode = SINGLE_PASS_MODE
+        if mode in (PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE):
+            try:
+                metrics = compute_health_metrics(user_profile)
+                prefix = prompt_prefix(self.system_prompt)
+                return self.planner, get_precomputed_plan_prompt(user_profile, metrics, prefix=prefix), metrics, mode
+            except ValueError as e:
+                print(f"Falling back to tool mode: {e}")
+        prefix = prompt_prefix(self.system_prompt, self.tools)
+        return self.agent, get_plan_generation_prompt(user_profile, prefix=prefix), None, TOOLS_MODE
+
+    def _one_shot_prompt(self, user_profile: dict, metrics: dict, mode: str, archetype: dict = None):
+        prefix = prompt_prefix(self.system_prompt, output_model=PlanGenerationResponse)
+        if mode == PERSONALIZE_MODE:
+            return get_personalize_prompt(user_profile, metrics, archetype, prefix=prefix)
+        return get_single_pass_prompt(user_profile, metrics, prefix=prefix)
+
+    def _try_one_shot(self, agent, prompt: str):
+        """One structured call; None (after resetting the agent) if it doesn't validate"""
+        try:
+            plan = agent.structured_output(PlanGenerationResponse, prompt=prompt)
+            check_plan_complete(plan)
+            return plan
+        except Exception as e:
+            print(f"One-shot output rejected, using two-step path: {e}")
+            agent.messages = []
+            return None
 
-    def generate_fitness_plan(self, user_profile: dict) -> dict:
-        """Generate comprehensive fitness plan for user"""
+    def _fan_out_branches(self, user_profile: dict, metrics: dict) -> dict:
+        def branch(schema, build_prompt):
+            # Fresh conversation per branch; the model and its client are shared
+            prompt = build_prompt(user_profile, metrics, prefix=prompt_prefix(self.system_prompt, output_model=schema))
+            return lambda: Agent(model=self.model, tools=[], system_prompt=self.system_prompt,
+                                 callback_handler=self.usage).structured_output(schema, prompt=prompt)
+
+        return {
+            "workout": branch(WorkoutPlan, get_workout_branch_prompt),
+            "meal": branch(MealPlan, get_meal_branch_prompt),
+            "tips": branch(PlanTips, get_tips_branch_prompt),
+        }
+
+    def _merge_fan_out(self, branches: dict, results: dict, metrics: dict, report: dict):
+        """
+        Assemble branch results once a failed workout or meal branch has been
+        retried; None if one still failed, so no partial plan is returned
+        """
+        if not complete_branches(branches, results, report):
+            return None
+        return PlanGenerationResponse(
+            health_metrics=metrics,
+            workout_plan=results["workout"],
+            meal_plan=results["meal"],
+            tips=results["tips"].tips if "tips" in results else [],
+        )
+
+    def _generate_fan_out(self, user_profile: dict, metrics: dict):
+        """
+        Workout and meal sub-plans are independent once the targets are
+        known, so run them (plus tips) as concurrent sub-agents. Returns
+        (plan or None, report); failed branches are listed in report['partial'],
+        retried ones in report['retried']. Raises FanOutBusyError if the
+        branches can't all start now.
+        """
+        branches = self._fan_out_branches(user_profile, metrics)
+        results = {}
+        report = {"branch_ms": {}, "partial": [], "retried": []}
+        for name, result, error, elapsed_ms in iter_fan_out(branches):
+            report["branch_ms"][name] = elapsed_ms
+            if error:
+                print(f"Fan-out branch '{name}' failed: {error}")
+                report["partial"].append(name)
+            else:
+                results[name] = result
+        return self._merge_fan_out(branches, results, metrics, report), report
+
+    def _record_usage(self, agent, before: dict, mode: str, start: float,
+                      structured_calls: int = 1, fallback: bool = False, report: dict = None) -> dict:
+        usage = usage_delta(before, usage_snapshot(agent, self.usage))
+        usage["model_calls"] += structured_calls  # structured_output isn't in the event loop metrics
+        usage.update(mode=mode, fallback=fallback, latency_ms=round((time.perf_counter() - start) * 1000))
+        if report:
+            usage.update(report)
+        self.last_usage = usage
+        print(f"📊 Plan generation usage: {usage}")
+        return usage
+
+    def generate_fitness_plan(self, user_profile: dict, mode: str = DEFAULT_MODE, archetype: dict = None) -> dict:
+        """
+        Generate comprehensive fitness plan for user. PRECOMPUTED_MODE hands
+        the model fixed metrics instead of letting it call the tools;
+        SINGLE_PASS_MODE also skips the free-text analysis unless the
+        one-shot output fails validation; FAN_OUT_MODE builds the workout,
+        meal and tips sections with concurrent sub-agents; PERSONALIZE_MODE
+        adapts the archetype plan the backend sent in one structured call.
+        """
         try:
             # print(f"#######GENERATING PLAN FOR USER: {user_profile} #######")
-            
-            # Step 1: Let agent use tools to calculate and plan
-            planning_prompt = get_plan_generation_prompt(user_profile)
-            raw_response = self.agent(prompt=planning_prompt, system=self.system_prompt)
-            
-            # Step 2: Structure the response
-            structure_prompt = f"""
-            {get_structure_prompt()}
-            
-            Previous analysis:
-            {raw_response}
-            """
-            
-            structured_response = self.agent.structured_output(
-                PlanGenerationResponse, 
-                prompt=structure_prompt
-            )
+            start = time.perf_counter()
+            self.last_usage = {"mode": mode, "error": "generation failed"}
+            agent, planning_prompt, metrics, mode = self._prepare(user_profile, mode, archetype)
+            before = usage_snapshot(agent, self.usage)
+            structured_calls = 0
+
+            structured_response = None
+            report = None
+            if mode == FAN_OUT_MODE:
+                try:
+                    structured_response, report = self._generate_fan_out(user_profile, metrics)
+                    structured_calls += len(report["branch_ms"]) + len(report["retried"])
+                except FanOutBusyError as e:
+                    print(f"⚠️ {e}, using single pass")
+                    mode = SINGLE_PASS_MODE
+            if mode in (SINGLE_PASS_MODE, PERSONALIZE_MODE):
+                structured_calls += 1
+                structured_response = self._try_one_shot(
+                    agent, self._one_shot_prompt(user_profile, metrics, mode, archetype))
+            fallback = mode in (SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE) and structured_response is None
+
+            if structured_response is None:
+                # Step 1: Plan (tool mode lets the agent calculate metrics itself)
+                raw_response = agent(prompt=planning_prompt)
+                
+                # Step 2: Structure the response
+                structure_prompt = f"""
+                {get_structure_prompt()}
+                
+                Previous analysis:
+                {raw_response}
+                """
+                
+                structured_calls += 1
+                structured_response = agent.structured_output(
+                    PlanGenerationResponse, 
+                    prompt=structure_prompt
+                )
+            self._record_usage(agent, before, mode, start, structured_calls, fallback, report)
             
             return {
-                "health_metrics": structured_response.health_metrics,
+                # Precomputed metrics are exact; don't let the model restate them
+                "health_metrics": metrics or structured_response.health_metrics,
                 "workout_plan": structured_response.workout_plan,
                 "meal_plan": structured_response.meal_plan,
                 "tips": structured_response.tips,
@@ -418,6 +473,166 @@ class FitnessAgentCore:
                 "tips": [],
             }
 
+    async def stream_fitness_plan(self, user_profile: dict, mode: str = DEFAULT_MODE, archetype: dict = None):
+        """
+        Same two steps as generate_fitness_plan, but yields events as it goes
+        so AgentCore can stream them back (text/event-stream)
+        """
+        try:
+            yield {"event": "progress", "stage": "analysis", "message": "Analyzing your profile..."}
+            start = time.perf_counter()
+            agent, planning_prompt, metrics, mode = self._prepare(user_profile, mode, archetype)
+            before = usage_snapshot(agent, self.usage)
+            structured_calls = 0
+            if metrics:
+                yield {"event": "section", "name": "health_metrics", "data": metrics}
+
+            structured_response = None
+            report = None
+            fan_out = None
+            if mode == FAN_OUT_MODE:
+                fan_out = self._fan_out_branches(user_profile, metrics)
+                try:
+                    branches = iter_fan_out(fan_out)
+                except FanOutBusyError as e:
+                    print(f"⚠️ {e}, using single pass")
+                    mode = SINGLE_PASS_MODE
+                    fan_out = None
+            if fan_out is not None:
+                yield {"event": "progress", "stage": "fan_out", "message": "Designing workouts and meals..."}
+                results = {}
+                report = {"branch_ms": {}, "partial": [], "retried": []}
+                # Blocking waits happen off the event loop; sections stream as branches finish
+                while (item := await asyncio.to_thread(next, branches, None)) is not None:
+                    name, result, error, elapsed_ms = item
+                    report["branch_ms"][name] = elapsed_ms
+                    structured_calls += 1
+                    if error:
+                        report["partial"].append(name)
+                        yield {"event": "progress", "stage": "branch_failed", "branch": name, "message": error}
+                    else:
+                        results[name] = result
+                        yield {"event": "progress", "stage": "branch_done", "branch": name}
+                # A failed workout or meal branch is retried before merging
+                structured_response = await asyncio.to_thread(self._merge_fan_out, fan_out, results, metrics, report)
+                structured_calls += len(report["retried"])
+            elif mode in (SINGLE_PASS_MODE, PERSONALIZE_MODE):
+                yield {"event": "progress", "stage": "structuring", "message": "Building your plan..."}
+                structured_calls += 1
+                # Blocking model call; keep the event loop free
+                structured_response = await asyncio.to_thread(
+                    self._try_one_shot, agent, self._one_shot_prompt(user_profile, metrics, mode, archetype))
+            fallback = mode in (SINGLE_PASS_MODE, FAN_OUT_MODE, PERSONALIZE_MODE) and structured_response is None
+
+            if structured_response is None:
+                # Step 1: forward the analysis text as the model produces it
+                analysis = []
+                async for event in agent.stream_async(planning_prompt):
+                    if "data" in event:
+                        analysis.append(event["data"])
+                        yield {"event": "delta", "text": event["data"]}
+
+                yield {"event": "progress", "stage": "structuring", "message": "Building your plan..."}
+
+                # Step 2: Structure the response
+                structure_prompt = f"""
+                {get_structure_prompt()}
+                
+                Previous analysis:
+                {''.join(analysis)}
+                """
+                structured_calls += 1
+                structured_response = await agent.structured_output_async(
+                    PlanGenerationResponse,
+                    prompt=structure_prompt
+                )
+            usage = self._record_usage(agent, before, mode, start, structured_calls, fallback, report)
+            plan = structured_response.model_dump()
+            if metrics:
+                plan["health_metrics"] = metrics
+
+            # Each section is already validated, so clients can render it early
+            # (precomputed metrics were already sent before step 1)
+            sections = ["workout_plan", "meal_plan", "tips"]
+            if not metrics:
+                sections.insert(0, "health_metrics")
+            for section in sections:
+                yield {"event": "section", "name": section, "data": plan[section]}
+
+            yield {"event": "plan", "response": plan, "status": "success", "usage": usage}
+
+        except Exception as e:
+            print(f"Error streaming plan: {str(e)}")
+            yield {"event": "error", "message": str(e), "status": "error"}
+
+# ===== WARM AGENT POOL =====
+
+class AgentPool:
+    """
+    FitnessAgentCore instances built once at startup and reused across
+    invocations. Each checkout resets the conversation, so requests never
+    share message history. When every agent is busy an extra one is built
+    and discarded afterwards.
+    """
+
+    def __init__(self, size: int, model: BedrockModel = None):
+        self.size = size
+        self._idle = queue.LifoQueue()  # most recently used (warmest) first
+        self._lock = threading.Lock()
+        self.stats = {"invocations": 0, "warm_hits": 0, "cold_builds": 0}
+
+        start = time.perf_counter()
+        self.model = model or build_bedrock_model()
+        for _ in range(size):
+            self._idle.put(FitnessAgentCore(model=self.model))
+        self.startup_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"🔥 Warmed {size} agent(s) in {self.startup_ms}ms")
+
+    @contextmanager
+    def acquire(self):
+        """Check out a clean agent; yields (agent, acquire_ms, warm)"""
+        start = time.perf_counter()
+        try:
+            agent, warm = self._idle.get_nowait(), True
+        except queue.Empty:
+            agent, warm = FitnessAgentCore(model=self.model), False
+        agent.reset()
+        acquire_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        with self._lock:
+            self.stats["invocations"] += 1
+            self.stats["warm_hits" if warm else "cold_builds"] += 1
+        try:
+            yield agent, acquire_ms, warm
+        finally:
+            agent.reset()
+            if warm:
+                self._idle.put(agent)
+
+
+agent_pool = AgentPool(size=int(os.getenv("AGENT_POOL_SIZE", "2")))
+
+
+def _timings(acquire_ms: float, warm: bool, start: float) -> dict:
+    return {
+        "pool_startup_ms": agent_pool.startup_ms,
+        "agent_acquire_ms": acquire_ms,
+        "warm_agent": warm,
+        "generation_ms": round((time.perf_counter() - start) * 1000, 1),
+        "pool": dict(agent_pool.stats),
+        "pool_size": agent_pool.size,
+    }
+
+
+async def _stream_with_pooled_agent(user_profile: dict, mode: str, archetype: dict = None):
+    """Hold a pooled agent for the whole stream and return it afterwards"""
+    with agent_pool.acquire() as (agent, acquire_ms, warm):
+        start = time.perf_counter()
+        async for event in agent.stream_fitness_plan(user_profile, mode, archetype):
+            if event.get("event") == "plan":
+                event["timings"] = _timings(acquire_ms, warm, start)
+            yield event
+
 # ===== AGENTCORE ENTRY POINT =====
 
 @app.entrypoint
@@ -431,14 +646,28 @@ def invoke(payload, context):
         if not user_profile and "user_profile" in payload.get("prompt", ""):
             user_profile = payload
         
-        # Generate fitness plan
-        agent = FitnessAgentCore()
-        result = agent.generate_fitness_plan(user_profile)
+        mode = payload.get("mode") or DEFAULT_MODE
+        # Closest library plan, sent by the backend with mode 'personalize'
+        archetype = payload.get("archetype")
+
+        # Streaming callers get an async generator, which AgentCore sends as SSE
+        if payload.get("stream"):
+            return _stream_with_pooled_agent(user_profile, mode, archetype)
+
+        # Generate fitness plan with a warm agent
+        with agent_pool.acquire() as (agent, acquire_ms, warm):
+            start = time.perf_counter()
+            result = agent.generate_fitness_plan(user_profile, mode, archetype)
+            timings = _timings(acquire_ms, warm, start)
+            usage = agent.last_usage
+        print(f"⏱️ Invocation timings: {timings}")
         
         # Return in AgentCore expected format
         return {
             "response": result,
-            "status": "success"
+            "status": "success",
+            "timings": timings,
+            "usage": usage
         }
         
     except Exception as e:
@@ -0,0 +1,179 @@
+# backend/app/agent/generation.py
+# Generation modes, usage accounting and the fan-out runner shared by the
+# local FitnessAgent (fitness_agent.py) and the AgentCore runtime
+# (fitness_agent_standalone.py). Deployed with the runtime from this
+# directory, so it needs only Strands and the standard library.
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from strands.handlers.callback_handler import PrintingCallbackHandler
+from strands.tools.structured_output import convert_pydantic_to_tool_spec
+
+# Generation modes
+TOOLS_MODE = "tools"              # model calls the calculation tools itself
+PRECOMPUTED_MODE = "precomputed"  # metrics computed up front, no tool turns
+SINGLE_PASS_MODE = "single_pass"  # precomputed metrics + one structured call
+FAN_OUT_MODE = "fan_out"          # workout/meal/tips sub-agents run concurrently
+PERSONALIZE_MODE = "personalize"  # adapt a library archetype in one structured call
+
+# Per-branch time limits for FAN_OUT_MODE (seconds)
+BRANCH_TIMEOUTS = {
+    "workout": float(os.getenv("FAN_OUT_WORKOUT_TIMEOUT", "150")),
+    "meal": float(os.getenv("FAN_OUT_MEAL_TIMEOUT", "150")),
+    "tips": float(os.getenv("FAN_OUT_TIPS_TIMEOUT", "45")),
+}
+
+class UsageRecorder(PrintingCallbackHandler):
+    """
+    Agent callback handler that still prints the stream, and totals the
+    usage metadata of every model call - including structured_output
+    calls, which the event loop metrics don't see
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self.totals = {}
+
+    def __call__(self, **kwargs):
+        super().__call__(**kwargs)
+        usage = (kwargs.get("event") or {}).get("metadata", {}).get("usage")
+        if usage:
+            with self._lock:
+                for key, value in usage.items():
+                    self.totals[key] = self.totals.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.totals)
+
+def usage_snapshot(agent, recorder: UsageRecorder) -> dict:
+    """Cumulative event loop round trips, and tokens for every model call"""
+    usage = recorder.snapshot()
+    return {
+        "model_calls": agent.event_loop_metrics.cycle_count,
+        "input_tokens": usage.get("inputTokens", 0),
+        "output_tokens": usage.get("outputTokens", 0),
+        # Prompt caching: prefix tokens served from / written to the Bedrock cache
+        "cache_read_input_tokens": usage.get("cacheReadInputTokens", 0),
+        "cache_write_input_tokens": usage.get("cacheWriteInputTokens", 0),
+    }
+
+def usage_delta(before: dict, after: dict) -> dict:
+    return {key: after[key] - before[key] for key in before}
+
+# Branch threads shared by every request. A timed-out branch can't be
+# interrupted and keeps its thread until the model call returns, so a
+# request only fans out if every branch can start right away; otherwise
+# it uses single pass (FanOutBusyError)
+FAN_OUT_WORKERS = int(os.getenv("FAN_OUT_WORKERS", "8"))
+_branch_executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="plan-branch")
+_branch_slots = threading.BoundedSemaphore(FAN_OUT_WORKERS)  # threads not held by a running branch
+
+class FanOutBusyError(RuntimeError):
+    """Raised when too few branch threads are free to start every branch at once"""
+
+def iter_fan_out(branches: dict):
+    """
+    Start branches ({name: callable}) concurrently and return an iterator of
+    (name, result, error, elapsed_ms) as each one finishes or times out.
+    A branch's time limit counts from when it starts running. Raises
+    FanOutBusyError, without starting any, if the threads are taken.
+    """
+    acquired = 0
+    while acquired < len(branches) and _branch_slots.acquire(blocking=False):
+        acquired += 1
+    if acquired < len(branches):
+        for _ in range(acquired):
+            _branch_slots.release()
+        raise FanOutBusyError("No free fan-out workers")
+
+    started = {}
+
+    def run(name, fn):
+        started[name] = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            # Only now is the thread free again, even if the request gave up on it
+            _branch_slots.release()
+
+    start = time.perf_counter()
+    futures = {_branch_executor.submit(run, name, fn): name for name, fn in branches.items()}
+    return _collect_branches(futures, started, start)
+
+def _collect_branches(futures: dict, started: dict, start: float):
+    def deadline(future):
+        name = futures[future]
+        return started.get(name, time.perf_counter()) + BRANCH_TIMEOUTS[name]
+
+    pending = set(futures)
+    while pending:
+        next_deadline = min(deadline(f) for f in pending) - time.perf_counter()
+        done, pending = wait(pending, timeout=max(0, next_deadline), return_when=FIRST_COMPLETED)
+        now = time.perf_counter()
+        elapsed_ms = round((now - start) * 1000)
+        for future in done:
+            try:
+                yield futures[future], future.result(), None, elapsed_ms
+            except Exception as e:
+                yield futures[future], None, str(e), elapsed_ms
+        for future in list(pending):
+            if now >= deadline(future):
+                # Left running; its thread is released when it returns
+                pending.discard(future)
+                yield futures[future], None, "timed out", elapsed_ms
+
+def complete_branches(branches: dict, results: dict, report: dict) -> bool:
+    """
+    A plan needs both workouts and meals, so rerun a failed or empty workout
+    or meal branch once, in this thread, before anything is merged. False
+    if one still has no content: the caller then builds the whole plan
+    another way instead of merging a partial one. Tips are optional.
+    """
+    for name in ("workout", "meal"):
+        if _branch_has_content(name, results.get(name)):
+            continue
+        print(f"⚠️ Retrying fan-out branch '{name}'")
+        report["retried"].append(name)
+        try:
+            result = branches[name]()
+        except Exception as e:
+            print(f"⚠️ Fan-out branch '{name}' failed again: {e}")
+            return False
+        if not _branch_has_content(name, result):
+            return False
+        results[name] = result
+        if name in report["partial"]:
+            report["partial"].remove(name)
+    return True
+
+def _branch_has_content(name: str, result) -> bool:
+    if result is None:
+        return False
+    if name == "workout":
+        return any(value for day, value in result if day != "weekly_summary")
+    return result.day_meal is not None
+
+def check_plan_complete(plan):
+    """Schema-valid isn't enough for one-shot output: require actual content"""
+    workout_days = [day for day, value in plan.workout_plan if day != "weekly_summary" and value]
+    if not workout_days:
+        raise ValueError("Plan has no workout days")
+    if not plan.meal_plan.day_meal:
+        raise ValueError("Plan has no meals")
+
+
+def prompt_prefix(system_prompt: str, tools=(), output_model=None) -> str:
+    """
+    What Bedrock sends ahead of the messages: tool specs (a structured output
+    schema is one) and the system prompt. A cache point in the prompt caches
+    these too, so prompts.cacheable_prompt counts them toward the minimum.
+    """
+    specs = [tool.tool_spec for tool in tools]
+    if output_model is not None:
+        specs.append(convert_pydantic_to_tool_spec(output_model))
+    return json.dumps(specs) + (system_prompt or "")
@@ -1,5 +1,18 @@
-# backend/app/utils/health_calculations.py
-from strands import tool
+# backend/app/agent/health_calculations.py
+# Pure health calculations shared by the API, the in-process agent and the
+# AgentCore runtime. Standard library only, and kept in app/agent so the
+# runtime, which is deployed from this directory alone, ships it too. The
+# Strands @tool wrappers are built in app/agent/tools.py when an agent needs them.
+import os
+from functools import lru_cache
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
 
 def imperial_to_metric(weight_lbs: float, height_feet: int, height_inches: float) -> dict:
     """Convert imperial measurements to metric system"""
@@ -8,7 +21,6 @@ def imperial_to_metric(weight_lbs: float, height_feet: int, height_inches: float
     weight_kgs = weight_lbs * 0.453592
     return {"height": height_meters, "weight": weight_kgs}
 
-@tool
 def calculate_bmi(weight_lbs: float, height_feet: int, height_inches: float) -> dict:
     """
     Calculate Body Mass Index (BMI) and health category from imperial measurements.
@@ -46,7 +58,6 @@ def calculate_bmi(weight_lbs: float, height_feet: int, height_inches: float) ->
     
     return {"bmi": bmi, "category": category}
 
-@tool
 def calculate_bmr(weight_lbs: float, height_feet: int, height_inches: float, age: int, gender: str) -> dict:
     """
     Calculate Basal Metabolic Rate (BMR) - calories burned at rest per day.
@@ -88,7 +99,6 @@ def calculate_bmr(weight_lbs: float, height_feet: int, height_inches: float, age
 
     return {"bmr": bmr}
 
-@tool
 def calculate_tdee(bmr: int, activity_level: str) -> dict:
     """
     Calculate Total Daily Energy Expenditure (TDEE) - total calories burned per day.
@@ -113,14 +123,7 @@ def calculate_tdee(bmr: int, activity_level: str) -> dict:
     Example:
         calculate_tdee(1750, 'moderate') returns {"tdee": 2712.5}
     """
-    activity_multiplier = {
-        "sedentary": 1.2,
-        "light": 1.375,
-        "moderate": 1.55,
-        "active": 1.725,
-        "very_active": 1.9
-    }
-    tdee = bmr * activity_multiplier.get(activity_level.lower(), 1.55)
+    tdee = bmr * ACTIVITY_MULTIPLIERS.get(activity_level.lower(), 1.55)
     return {"tdee": tdee}
 
 def calorie_goal(tdee: float, goal: str) -> float:
@@ -140,7 +143,6 @@ def calorie_goal(tdee: float, goal: str) -> float:
         return tdee * 1.15  # 15% surplus for lean muscle gain
     return tdee  # maintenance calories
 
-@tool
 def calculate_macros(tdee: float, goal: str, weight_lbs: float) -> dict:
     """
     Calculate optimal daily macronutrient breakdown for fitness goals.
@@ -217,3 +219,86 @@ def calculate_macros(tdee: float, goal: str, weight_lbs: float) -> dict:
         'carb_percentage': round(carbs_calories / calories * 100),
         'fat_percentage': round(fat_calories / calories * 100)
     }
+
+def normalize_goal(fitness_goal: str) -> str:
+    """Map profile goals ('lose-weight', 'gain-weight', ...) to calculate_macros goals"""
+    goal = (fitness_goal or 'maintain').strip().lower().replace('-', '_').replace(' ', '_')
+    return goal if goal in ('lose_weight', 'gain_weight', 'maintain') else 'other'
+
+def compute_health_metrics(user_profile: dict) -> dict:
+    """
+    Run BMI -> BMR -> TDEE -> macros for a profile dict (as sent to the agent).
+
+    These are pure functions, so computing them up front saves the model
+    a tool-call round trip per metric.
+
+    Raises:
+        ValueError: if a field needed for the calculations is missing
+    """
+    required = ('weight_lbs', 'height_feet', 'height_inches', 'age', 'gender')
+    missing = [key for key in required if user_profile.get(key) is None]
+    if missing:
+        raise ValueError(f"Missing profile fields for health metrics: {', '.join(missing)}")
+
+    weight_lbs = user_profile['weight_lbs']
+    activity_level = user_profile.get('activity_level') or 'moderate'
+    goal = normalize_goal(user_profile.get('fitness_goal'))
+
+    bmi = calculate_bmi(weight_lbs, user_profile['height_feet'], user_profile['height_inches'])
+    bmr = calculate_bmr(weight_lbs, user_profile['height_feet'], user_profile['height_inches'],
+                        user_profile['age'], user_profile['gender'])
+    tdee = calculate_tdee(bmr['bmr'], activity_level)
+    macros = calculate_macros(tdee['tdee'], goal, weight_lbs)
+
+    return {
+        "bmi": bmi['bmi'],
+        "bmi_category": bmi['category'],
+        "bmr": bmr['bmr'],
+        "tdee": round(tdee['tdee']),
+        "goal": goal,
+        "target_calories": macros['total_calories'],
+        "macro_targets": {
+            "protein_g": macros['protein_g'],
+            "carbs_g": macros['carbs_g'],
+            "fat_g": macros['fat_g'],
+        },
+        "macro_percentages": {
+            "protein": macros['protein_percentage'],
+            "carbs": macros['carb_percentage'],
+            "fat": macros['fat_percentage'],
+        },
+    }
+
+@lru_cache(maxsize=int(os.getenv("TOOLS_METRICS_CACHE_SIZE", "4096")))
+def _chained_metrics(weight_lbs: float, height_feet: int, height_inches: float, age: int, gender: str,
+                     activity_level: str, goal: str) -> dict:
+    bmi = calculate_bmi(weight_lbs, height_feet, height_inches)
+    bmr = calculate_bmr(weight_lbs, height_feet, height_inches, age, gender)
+    tdee = calculate_tdee(bmr['bmr'], activity_level)
+    macros = calculate_macros(tdee['tdee'], goal, weight_lbs)
+    return {"bmi": bmi, "bmr": bmr, "tdee": tdee, "macros": macros}
+
+def chained_metrics(weight_lbs: float, height_feet: int, height_inches: float, age: int, gender: str,
+                    activity_level: str = 'moderate', goal: str = 'maintain') -> dict:
+    """
+    BMI -> BMR -> TDEE -> macros in one call, each step fed into the next
+    exactly as the separate /tools endpoints chain them.
+
+    Results are memoized on the normalized inputs (numbers as floats,
+    gender and activity level lowercased - the calculators ignore case
+    there), so 170 and 170.0 share an entry. The returned dict is shared
+    by every caller with the same inputs: don't mutate it.
+    """
+    return _chained_metrics(float(weight_lbs), float(height_feet), float(height_inches), float(age),
+                            gender.lower(), activity_level.lower(), goal)
+
+def metrics_cache_stats() -> dict:
+    info = _chained_metrics.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
@@ -1,4 +1,43 @@
 # backend/app/agent/prompts.py
+import json
+import os
+
+# Bedrock prompt caching: every plan prompt starts with the same static
+# PLAN_GUIDE, per-user details (profile, metrics) come after it. A cache
+# point caches everything before it - tool specs, system prompt and message
+# text - but Bedrock ignores it unless that prefix reaches the model's
+# minimum (1024 tokens for Claude Sonnet, 2048 for Haiku), so one is only
+# emitted when the estimated prefix qualifies. Turn off for models without
+# prompt caching support.
+PROMPT_CACHING = os.getenv("BEDROCK_PROMPT_CACHING", "true").lower() == "true"
+CACHE_MIN_TOKENS = int(os.getenv("BEDROCK_CACHE_MIN_TOKENS", "1024"))
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token; errs low, so a prefix counted as long enough is"""
+    return len(text) // 4
+
+def cacheable_prompt(*parts, prefix: str = ""):
+    """
+    Prompt content from most to least shared part, with a cache point after
+    a part once prefix (what the model sees before the message, see
+    generation.prompt_prefix) plus the parts so far reach CACHE_MIN_TOKENS.
+    Plain text when caching is off or no prefix qualifies.
+    """
+    if not PROMPT_CACHING:
+        return "".join(parts)
+    content = []
+    cached = prefix
+    for part in parts[:-1]:
+        content.append({"text": part})
+        cached += part
+        if estimate_tokens(cached) >= CACHE_MIN_TOKENS:
+            content.append(CACHE_POINT)
+    if CACHE_POINT not in content:
+        return "".join(parts)
+    content.append({"text": parts[-1]})
+    return content
+
 def get_fitness_system_prompt():
     return """
     You are FitAgent, an expert fitness trainer and nutritionist with 10+ years of experience.
@@ -30,22 +69,41 @@ def get_fitness_system_prompt():
     - Key Tips & Motivation
     """
 
-def get_plan_generation_prompt(user_profile: dict):
+# Static instructions shared by every plan, section and edit prompt, merged
+# into one prefix so they can reach the cache minimum together
+PLAN_GUIDE = """
+    FITNESS PLAN GUIDE (applies to every plan, section and edit below):
+
+    HEALTH METRICS:
+    - When metrics are given as precomputed, treat them as fixed facts and do NOT recalculate them
+    - Otherwise use the calculation tools: BMI, BMR, TDEE, then macro targets
+
+    WORKOUT PLAN:
+    - Use DAYS OF THE WEEK as keys: "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
+    - Never use generic labels like "day_1_upper"
+    - Schedule exactly as many workout days as the profile asks for; set rest days to null
+    - For each workout day include workout_type (e.g. "Upper Body", "Lower Body", "Full Body", "Cardio"),
+      duration_minutes and exercises
+    - For each exercise include name, sets, reps, rest_seconds and notes
+    - Only use the available equipment and fit the session length
+    - Don't give neighbouring days the same focus unless asked to
+    - Add a weekly_summary describing the split
+
+    MEAL PLAN:
+    - In day_meal include breakfast, lunch, dinner and optional snacks
+    - For each meal include name, calories, protein_g, carbs_g, fat_g, ingredients and preparation
+    - The day must add up to the calorie and macro targets; copy them into daily_targets
+    - Respect every dietary preference
+    - Add a weekly_summary
+
+    TIPS:
+    - 3-5 short, actionable tips for success with the user's fitness goal
+    """
+
+def get_plan_generation_prompt(user_profile: dict, prefix: str = ""):
     """Step 1: Analysis and planning with tools"""
-    return f"""
-    Analyze this user's fitness profile and create a comprehensive plan using your calculation tools:
-    
-    USER PROFILE:
-    - Age: {user_profile.get('age', 'Not provided')}
-    - Weight: {user_profile.get('weight_lbs', 'Not provided')} lbs
-    - Height: {user_profile.get('height_feet', 'Not provided')}'{user_profile.get('height_inches', 0)}"
-    - Gender: {user_profile.get('gender', 'Not provided')}
-    - Fitness Goal: {user_profile.get('fitness_goal', 'Not provided')}
-    - Activity Level: {user_profile.get('activity_level', 'moderate')}
-    - Workout Days/Week: {user_profile.get('workout_days_per_week', 3)}
-    - Workout Duration: {user_profile.get('workout_duration_minutes', 45)} minutes
-    - Available Equipment: {user_profile.get('available_equipment', [])}
-    - Dietary Preferences: {user_profile.get('dietary_preferences', [])}
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Analyze the user's fitness profile below and create a comprehensive plan using your calculation tools.
     
     ANALYSIS STEPS:
     1. Calculate BMI and assess health status
@@ -57,7 +115,8 @@ def get_plan_generation_prompt(user_profile: dict):
     7. Identify key success strategies and potential challenges
     
     Provide a thorough analysis with all calculations, specific workout details, meal suggestions, and practical advice. Be comprehensive - this analysis will be structured later.
-    """
+    
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
 
 def get_structure_prompt():
     """Step 2: Structure the analysis into the required format"""
@@ -84,3 +143,177 @@ def get_structure_prompt():
     
     IMPORTANT: Always use day names (monday, tuesday, etc.) not generic labels like "day_1_upper"
     """
+
+def format_health_metrics(metrics: dict):
+    """Render precomputed metrics as fixed facts for the prompt"""
+    macros = metrics.get('macro_targets', {})
+    return f"""
+    - BMI: {metrics.get('bmi')} ({metrics.get('bmi_category')})
+    - BMR: {metrics.get('bmr')} kcal/day
+    - TDEE: {metrics.get('tdee')} kcal/day
+    - Daily Calorie Target: {metrics.get('target_calories')} kcal
+    - Daily Macro Targets: {macros.get('protein_g')}g protein, {macros.get('carbs_g')}g carbs, {macros.get('fat_g')}g fat
+    """
+
+def get_precomputed_plan_prompt(user_profile: dict, metrics: dict, prefix: str = ""):
+    """Step 1 without tools: metrics are already calculated server-side"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Create a comprehensive fitness plan for the user below. Their health metrics have
+    already been calculated - treat them as fixed facts and do NOT recalculate them.
+    
+    PLANNING STEPS:
+    1. Design specific workout routines for their goals and equipment
+    2. Create detailed meal planning recommendations that hit the calorie and macro targets
+    3. Identify key success strategies and potential challenges
+    
+    Provide specific workout details, meal suggestions, and practical advice. Be comprehensive - this analysis will be structured later.
+    
+    HEALTH METRICS (precomputed):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def get_single_pass_prompt(user_profile: dict, metrics: dict, prefix: str = ""):
+    """One-shot: plan and structure in a single call, metrics supplied up front"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Create a comprehensive fitness plan and respond DIRECTLY in the required structure.
+    There is no separate analysis step - put every workout, meal and tip into the fields,
+    following the guide above. Use the precomputed health metrics as fixed facts.
+    
+    HEALTH METRICS (precomputed):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def format_user_profile(user_profile: dict):
+    return f"""
+    - Age: {user_profile.get('age', 'Not provided')}
+    - Weight: {user_profile.get('weight_lbs', 'Not provided')} lbs
+    - Height: {user_profile.get('height_feet', 'Not provided')}'{user_profile.get('height_inches', 0)}"
+    - Gender: {user_profile.get('gender', 'Not provided')}
+    - Fitness Goal: {user_profile.get('fitness_goal', 'Not provided')}
+    - Activity Level: {user_profile.get('activity_level', 'moderate')}
+    - Workout Days/Week: {user_profile.get('workout_days_per_week', 3)}
+    - Workout Duration: {user_profile.get('workout_duration_minutes', 45)} minutes
+    - Available Equipment: {user_profile.get('available_equipment', [])}
+    - Dietary Preferences: {user_profile.get('dietary_preferences', [])}
+    """
+
+def get_workout_branch_prompt(user_profile: dict, metrics: dict, prefix: str = ""):
+    """Fan-out branch: weekly workout plan only"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Design this user's weekly WORKOUT PLAN only (no meals, no tips), following the guide above.
+    
+    HEALTH METRICS (precomputed):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def get_meal_branch_prompt(user_profile: dict, metrics: dict, prefix: str = ""):
+    """Fan-out branch: daily meal plan only"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Design this user's MEAL PLAN only (no workouts, no tips), following the guide above.
+    
+    HEALTH METRICS (precomputed):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def get_tips_branch_prompt(user_profile: dict, metrics: dict, prefix: str = ""):
+    """Fan-out branch: a few short tips"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Give this user TIPS only (no workouts, no meals), following the guide above.
+    
+    HEALTH METRICS (precomputed):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def get_personalize_prompt(user_profile: dict, metrics: dict, archetype: dict, prefix: str = ""):
+    """Adapt a proven plan for a similar profile instead of planning from scratch"""
+    starting_plan = {key: value for key, value in archetype.items() if key != "health_metrics"}
+    # Guide, then the archetype (shared by every user it's served to), then the user
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    STARTING PLAN (JSON):
+    {json.dumps(starting_plan, separators=(",", ":"))}
+    """, f"""
+    Personalize the STARTING PLAN above for the user below and respond DIRECTLY in the required structure.
+    It was built for a very similar profile and its meals are already scaled to this user's targets.
+    Change only what this user needs, keep everything else as it is:
+    - Schedule exactly the workout days per week and session length their profile asks for
+    - Replace exercises that need equipment the user doesn't have
+    - Replace meals or ingredients that conflict with their dietary preferences, keeping calories and macros
+    
+    HEALTH METRICS (precomputed, do NOT recalculate):{format_health_metrics(metrics)}
+    USER PROFILE:{format_user_profile(user_profile)}""", prefix=prefix)
+
+def get_chat_system_prompt():
+    """Chat: the same coach, answering follow-up questions about the user's plan"""
+    return """
+    You are FitAgent, an expert fitness trainer and nutritionist with 10+ years of experience,
+    chatting with a user about the fitness plan you made for them.
+    
+    PERSONALITY:
+    - Encouraging and motivational
+    - Evidence-based recommendations
+    - Practical and realistic advice
+    - Supportive but honest about challenges
+    
+    CONTEXT YOU GET EACH TURN:
+    - PLAN DIGEST: a compact summary of the user's current plan and targets
+    - RECAP: a summary of the older part of the conversation
+    - The most recent turns are in the conversation itself
+    
+    RESPONSE STYLE:
+    - Answer conversationally and concisely; don't restate the whole plan
+    - If asked to change the plan, describe the change clearly (day, exercise or meal)
+    """
+
+def get_chat_prompt(plan_digest: str, summary: str, message: str):
+    """One chat turn: compact plan digest and rolling recap instead of the full plan and history"""
+    return f"""
+    PLAN DIGEST:
+    {plan_digest or "The user has no plan yet."}
+    RECAP OF EARLIER CONVERSATION:
+    {summary or "None."}
+
+    USER MESSAGE:
+    {message}
+    """
+
+def get_summary_prompt(summary: str, turns: list):
+    """Fold older chat turns into the rolling recap"""
+    transcript = "\n".join(f"User: {message}\nCoach: {response}" for message, response in turns)
+    return f"""
+    Update the recap of a fitness coaching chat with the turns below.
+    Keep facts that matter for future answers: the user's preferences, constraints,
+    injuries, requested plan changes and decisions made. Drop greetings and small talk.
+    Reply with the updated recap only, at most 150 words.
+
+    CURRENT RECAP:
+    {summary or "None."}
+
+    NEW TURNS:
+    {transcript}
+    """
+
+def get_day_workout_prompt(user_profile: dict, day: str, current: dict, week: dict, instruction: str, prefix: str = ""):
+    """Partial edit: one day's workout, with the rest of the week as one-line context"""
+    other_days = "\n    ".join(f"- {name}: {workout_type}" for name, workout_type in week.items() if name != day) or "- none"
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Rewrite ONE DAY of the user's weekly workout plan and respond DIRECTLY in the required structure,
+    following the guide above. Follow the user's request; if there is none, give a fresh
+    alternative to the current workout.
+    
+    DAY: {day}
+    CURRENT WORKOUT (JSON): {json.dumps(current, separators=(",", ":")) if current else "rest day"}
+    REST OF THE WEEK:
+    {other_days}
+    AVAILABLE EQUIPMENT: {user_profile.get('available_equipment', [])}
+    SESSION LENGTH: {user_profile.get('workout_duration_minutes', 45)} minutes
+    FITNESS GOAL: {user_profile.get('fitness_goal', 'Not provided')}
+    USER REQUEST: {instruction or "None"}""", prefix=prefix)
+
+def get_meal_prompt(user_profile: dict, slot: str, current: dict, budget: dict, instruction: str, prefix: str = ""):
+    """Partial edit: one meal, sized to what the rest of the day leaves over"""
+    return cacheable_prompt(PLAN_GUIDE, f"""
+    Replace ONE MEAL of the user's daily meal plan and respond DIRECTLY in the required structure,
+    following the guide above. Hit the calorie and macro budget below as closely as you can
+    (the rest of the day is fixed). Follow the user's request; if there is none, give a fresh
+    alternative to the current meal.
+    
+    MEAL: {slot}
+    CURRENT MEAL (JSON): {json.dumps(current, separators=(",", ":")) if current else "none"}
+    BUDGET FOR THIS MEAL: {budget['calories']} kcal, {budget['protein_g']}g protein, {budget['carbs_g']}g carbs, {budget['fat_g']}g fat
+    DIETARY PREFERENCES: {user_profile.get('dietary_preferences', [])}
+    USER REQUEST: {instruction or "None"}""", prefix=prefix)
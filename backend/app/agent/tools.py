@@ -1,4 +1,16 @@
-from app.utils.health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros
+# backend/app/agent/tools.py
+# Strands tool wrappers around the calculation core. Strands is imported
+# only when the first agent asks for its tools, so the API can use the
+# plain calculators without loading the agent stack.
+from app.agent.health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros
+
+AGENT_TOOL_FUNCTIONS = (calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros)
+_agent_tools = None
 
 def get_agent_tools():
-    return [calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros]
+    """The calculators as Strands tools (name, docstring and signature become the tool spec), built once"""
+    global _agent_tools
+    if _agent_tools is None:
+        from strands import tool
+        _agent_tools = [tool(fn) for fn in AGENT_TOOL_FUNCTIONS]
+    return list(_agent_tools)
@@ -1,7 +1,7 @@
 # backend/app/api/agent.py (create new file)
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.agent_schemas import PlanGenerationResponse, ChatRequest
-from app.agent.fitness_agent import FitnessAgent as FitnessAgent
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.schemas.agent_schemas import PlanGenerationResponse, ChatRequest, PlanJobStatus, PlanEditRequest, PlanChangeResponse, PlanHistoryPage
 from app.api.auth import get_current_user
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -10,9 +10,15 @@ import uuid
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import ValidationError
 from app.schemas.agent_schemas import WorkoutPlan, MealPlan
-import boto3
-import json
-import os
+from app.services.plan_generation import generate_plan_for_user, load_profile_dict, stream_plan_events, fallback_stats, ProfileNotFoundError
+from app.services.circuit_breaker import agentcore_breaker, CircuitOpenError
+from app.services.chat import stream_chat_events
+from app.services.plan_versions import store_plan, plan_document, get_version, list_versions
+from app.services.plan_edits import regenerate_workout_day, regenerate_meal, PlanNotFoundError, InvalidTargetError
+from app.services.plan_jobs import plan_jobs, JobQueueFullError
+from app.services.plan_cache import plan_cache
+from app.services.plan_archetypes import plan_archetypes
+from app.services.single_flight import single_flight, profile_fingerprint, FlightSupersededError
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -62,118 +68,20 @@ def generate_plan(
 ):
     """Generate personalized fitness plan using AI agent and save to DB"""
     try:
-        # Get user profile
-        user_profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-        if not user_profile:
-            raise HTTPException(status_code=404, detail="Profile not found. Please complete your profile first.")
-
-        # Convert SQLAlchemy object to dict for agent
-        profile_dict = {
-            "age": user_profile.age,
-            "weight_lbs": user_profile.weight,
-            "height_feet": user_profile.height_feet,
-            "height_inches": user_profile.height_inches,
-            "gender": user_profile.gender,
-            "fitness_goal": user_profile.fitness_goal,
-            "activity_level": getattr(user_profile, 'activity_level', 'moderate'),
-            "workout_days_per_week": getattr(user_profile, 'workout_days_per_week', 3),
-            "workout_duration_minutes": getattr(user_profile, 'workout_duration_minutes', 45),
-            "available_equipment": getattr(user_profile, 'available_equipment', []),
-            "dietary_preferences": getattr(user_profile, 'dietary_preferences', [])
-        }
-        
         # ORIGINAL STRANDS CODE (commented out)
         # fitness_agent = FitnessAgent()
         # plan = fitness_agent.generate_fitness_plan(profile_dict)
-        
-        # NEW AGENTCORE RUNTIME CODE
-        # Initialize the Bedrock AgentCore client with increased timeout
-        from botocore.config import Config
-        config = Config(
-            read_timeout=300,  # 5 minutes
-            connect_timeout=60,  # 1 minute
-            retries={'max_attempts': 3}
-        )
-        agent_core_client = boto3.client('bedrock-agentcore', 
-                                       region_name='us-east-1',
-                                       config=config)
-        
-        # Prepare the payload with user profile
-        payload = json.dumps({"user_profile": profile_dict}).encode()
-        
-        # AgentCore Runtime ARN (placeholder - replace with your actual ARN)
-        agent_arn = os.getenv('AGENTCORE_AGENT_ARN')
-        session_id = f"fitness-session-{current_user.id}"
-        
-        print(f"🚀 Calling AgentCore Runtime: {agent_arn}")
-        print(f"📦 Payload: {json.dumps(profile_dict, indent=2)}")
-        print("⏳ This may take 2-3 minutes for comprehensive fitness plan generation...")
-        
-        # Invoke the agent
-        response = agent_core_client.invoke_agent_runtime(
-            agentRuntimeArn=agent_arn,
-            runtimeSessionId=session_id,
-            payload=payload
-        )
-        
-        # Process the response based on content type
-        if "text/event-stream" in response.get("contentType", ""):
-            # Handle streaming response
-            content = []
-            for line in response["response"].iter_lines(chunk_size=10):
-                if line:
-                    line = line.decode("utf-8")
-                    if line.startswith("data: "):
-                        line = line[6:]
-                    content.append(line)
-            plan_text = "\n".join(content)
-            plan = json.loads(plan_text) if plan_text.strip().startswith('{') else {"response": plan_text}
-            
-        elif response.get("contentType") == "application/json":
-            # Handle standard JSON response
-            content = []
-            for chunk in response.get("response", []):
-                content.append(chunk.decode('utf-8'))
-            plan = json.loads(''.join(content))
-            
-        else:
-            # Handle other response types
-            plan = response
-        
-        print("🎉 AgentCore Response:", plan)
-        
-        # Extract the actual fitness plan from the response
-        if isinstance(plan, dict) and 'response' in plan:
-            fitness_plan_data = plan['response']
-            print("✅ Extracted fitness plan data:", fitness_plan_data.keys())
-        else:
-            fitness_plan_data = plan
-        
-        # Save to DB
-        plan_response = PlanGenerationResponse(**fitness_plan_data)
-        # 1. Delete existing plan if any
-        existing_plan = db.query(FitnessPlan).filter(
-            FitnessPlan.user_id == current_user.id
-        ).first()
-        if existing_plan:
-            db.delete(existing_plan)
-        
-        # 2. Save new plan
-        new_plan = FitnessPlan(
-            id=str(uuid.uuid4()),
-            user_id=current_user.id,
-            workout_plan=plan_response.workout_plan.dict(),
-            meal_plan=plan_response.meal_plan.dict(),
-            health_metrics=plan_response.health_metrics,
-            tips=plan_response.tips,
-        )
-        db.add(new_plan)
-        db.commit()
-        
-        return plan_response
-        
-    except HTTPException:
-        raise
+
+        # AGENTCORE RUNTIME: invoke, validate and persist
+        return generate_plan_for_user(db, current_user.id)
+
+    except ProfileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FlightSupersededError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except CircuitOpenError as e:
+        # AgentCore is down: answer now instead of waiting out its timeouts
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"DEBUG: Error in generate_plan: {str(e)}")  # Add this for debugging
         db.rollback()
@@ -181,14 +89,154 @@ def generate_plan(
         traceback.print_exc()  # Print full stack trace
         raise HTTPException(status_code=500, detail=f"Error generating plan: {str(e)}")
 
+@router.get("/generate-plan/stream")
+def generate_plan_stream(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """
+    Generate a plan and stream progress as Server-Sent Events.
+    The final 'plan' event carries the validated PlanGenerationResponse.
+    """
+    try:
+        profile_dict = load_profile_dict(db, current_user.id)
+    except ProfileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return StreamingResponse(
+        stream_plan_events(profile_dict, current_user.id),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/plan-jobs", response_model=PlanJobStatus, status_code=status.HTTP_202_ACCEPTED)
+def submit_plan_job(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """
+    Queue plan generation in the background and return a job id to poll
+    """
+    # Fail fast on a missing profile instead of inside the worker
+    try:
+        profile_dict = load_profile_dict(db, current_user.id)
+    except ProfileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        # Repeated submits for the same profile return the existing job
+        job = plan_jobs.submit(current_user.id, profile_fingerprint(profile_dict))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return _job_status(job)
+
+@router.get("/plan-jobs/{job_id}", response_model=PlanJobStatus)
+def get_plan_job(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Report the status of a plan generation job (and its plan once done)
+    """
+    job = plan_jobs.get(job_id)
+    # Don't reveal other users' jobs
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Plan job not found")
+    return _job_status(job)
+
+def _job_status(job) -> PlanJobStatus:
+    return PlanJobStatus(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        result=job.result,
+    )
+
+@router.get("/plan-cache/stats")
+def get_plan_cache_stats(current_user = Depends(get_current_user)):
+    """
+    Hit/miss counters and occupancy of the generated plan cache
+    """
+    return plan_cache.stats()
+
+@router.get("/stats")
+def get_generation_stats(current_user = Depends(get_current_user)):
+    """
+    Plan generation counters: cache, in-flight coalescing, archetypes and
+    the AgentCore circuit breaker (state, transitions, fallbacks)
+    """
+    return {
+        "plan_cache": plan_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "archetypes": plan_archetypes.stats(),
+        "agentcore_breaker": agentcore_breaker.stats(),
+        "agentcore_fallback": fallback_stats(),
+    }
+
 @router.post("/chat")
 def chat_with_agent(
     request: ChatRequest,
     current_user = Depends(get_current_user)
 ):
-    """Chat with fitness agent"""
-    # YOUR TASK: Implement chat functionality
-    pass
+    """
+    Chat with fitness agent. The reply streams back as Server-Sent Events
+    ('delta' chunks, then 'done'); the plan and earlier turns come from
+    the server, so clients only send the new message.
+    """
+    return StreamingResponse(
+        stream_chat_events(current_user.id, request.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/plan/workouts/{day}", response_model=PlanChangeResponse)
+def regenerate_plan_workout(day: str, request: PlanEditRequest, db: Session = Depends(get_db),
+                            current_user = Depends(get_current_user)):
+    """
+    Regenerate one day's workout (e.g. 'thursday') and patch it into the saved plan
+    """
+    try:
+        return regenerate_workout_day(db, current_user.id, day, request.instruction)
+    except (PlanNotFoundError, ProfileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidTargetError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error regenerating workout: {str(e)}")
+
+@router.post("/plan/meals/{slot}", response_model=PlanChangeResponse)
+def regenerate_plan_meal(slot: str, request: PlanEditRequest, db: Session = Depends(get_db),
+                         current_user = Depends(get_current_user)):
+    """
+    Replace one meal ('breakfast', 'lunch', 'dinner' or 'snack_<n>') and patch it into the saved plan
+    """
+    try:
+        return regenerate_meal(db, current_user.id, slot, request.instruction)
+    except (PlanNotFoundError, ProfileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidTargetError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error regenerating meal: {str(e)}")
+
+@router.get("/plan/history", response_model=PlanHistoryPage)
+def get_plan_history(before: int = None, limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db),
+                     current_user = Depends(get_current_user)):
+    """
+    The user's plan versions, newest first; pass next_before as ?before= for the next page
+    """
+    try:
+        items, next_before = list_versions(db, current_user.id, before=before, limit=limit)
+        return PlanHistoryPage(items=items, next_before=next_before)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching plan history: {str(e)}")
+
+@router.get("/plan/versions/{version}", response_model=PlanGenerationResponse)
+def get_plan_version(version: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """
+    The plan exactly as it was at one version
+    """
+    try:
+        return PlanGenerationResponse(**get_version(db, current_user.id, version))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching plan version: {str(e)}")
 
 @router.post("/save-plan", response_model = PlanGenerationResponse)
 def save_plan(plan: PlanGenerationResponse, db:Session = Depends(get_db), current_user = Depends(get_current_user)):
@@ -196,26 +244,8 @@ def save_plan(plan: PlanGenerationResponse, db:Session = Depends(get_db), curren
     Save the "Accepted" User plan to the database
     """
     try:
-        # 1. Check if user already has a plan
-        exisiting_plan = db.query(FitnessPlan).filter(
-            FitnessPlan.user_id == current_user.id
-        ).first()
-
-        if exisiting_plan:
-            db.delete(exisiting_plan)
-
-        # 2. create Model instance to add with 
-        new_plan = FitnessPlan(
-            id = str(uuid.uuid4()),
-            user_id = current_user.id,
-            workout_plan = plan.workout_plan.dict(),
-            meal_plan = plan.meal_plan.dict(),
-            health_metrics = plan.health_metrics,
-            tips = plan.tips,  
-        )
-        db.add(new_plan)
-        db.commit()
-        db.refresh(new_plan)
+        # 1. Store as a new version of the user's plan (history is kept)
+        store_plan(db, current_user.id, plan_document(plan), source="save")
         return plan
 
     except SQLAlchemyError as e:
@@ -8,12 +8,15 @@ import uuid
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import jwt
 from jwt.exceptions import InvalidTokenError
-# handles password hashing 
-from pwdlib import PasswordHash
+# handles password hashing (in a process pool, off the request threads)
+from app.services.password_pool import PasswordPoolBusyError, password_pool
+from starlette.concurrency import run_in_threadpool
 # Data Models and DB Session
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.models import User as UserModel
+from app.services.auth_cache import Principal, auth_cache
 # Environment Variables
 from dotenv import load_dotenv
 import os
@@ -26,15 +29,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 # Extract Token from request to auth/token endpoint
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-# Hash plaintext password 
-password_hash = PasswordHash.recommended()
-def hash_password(password:str):
-    return password_hash.hash(password)
-
-# Verify hashed password 
-def verify_password(password:str, hashed_password:str):
-    return password_hash.verify(password, hashed_password)
-
 ### Models ###
 # User creation and login endpoint
 class UserCreate(BaseModel):
@@ -68,17 +62,52 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm = ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db, user_name:str, password:str):
+def find_user(db, user_name:str):
+    return db.query(UserModel).filter(UserModel.user_name == user_name).first()
+
+def find_user_detached(db, user_name:str):
+    """
+    find_user, then end the transaction so the DB connection goes back to
+    the pool instead of being held through the (slow) password hashing
+    """
+    user = find_user(db, user_name)
+    if user is not None:
+        # Keep its loaded attributes usable after the session lets go of it
+        db.expunge(user)
+    db.rollback()
+    return user
+
+def save_new_user(db, new_user:UserModel):
+    """
+    Insert the user; 409 if the name was taken since the check
+    """
+    db.add(new_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Registered by a concurrent request since the check (user_name is unique)
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+        detail="Username already taken. Please choose a different username.")
+    db.refresh(new_user)
+
+def password_pool_busy(e:PasswordPoolBusyError):
+    """503 telling the client when to retry, for a shed hashing request"""
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after)})
+
+async def authenticate_user(db, user_name:str, password:str):
     """
-    Verify user credentials against DB entry
+    Verify user credentials against DB entry.
+    Raises PasswordPoolBusyError when the hashing pool sheds the request.
     """
-    # Locate user in table 
-    user = db.query(UserModel).filter(UserModel.user_name == user_name).first()
+    # Locate user in table (sync DB call, kept off the event loop)
+    user = await run_in_threadpool(find_user_detached, db, user_name)
     if not user:
         return False
     
     # Verify hashed password
-    if not verify_password(password, user.password):
+    if not await password_pool.verify(password, user.password):
         return False 
     
     # Return User DB Instance 
@@ -86,10 +115,15 @@ def authenticate_user(db, user_name:str, password:str):
 
 def get_current_user(token:str = Depends(oauth2_scheme), db:Session = Depends(get_db)):
     """
-    Extract + Verify JWT token and return current user
+    Extract + Verify JWT token and return current user.
+    Tokens already verified are answered from auth_cache without decoding
+    the JWT or querying the DB.
     """
-    # Make sure we are receiving token properly
-    print(f"🔍 DEBUG: Received token: {token[:50]}...")  # Show first 50 chars
+    # Token seen before (and not expired or invalidated since)
+    principal = auth_cache.get(token)
+    if principal is not None:
+        return principal
+
     # Build Credentials Exception
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -100,31 +134,22 @@ def get_current_user(token:str = Depends(oauth2_scheme), db:Session = Depends(ge
     try:
         # Decode JWT and get username 
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"🔍 DEBUG: Decoded payload: {payload}")
         # Extract subscriber (user name) to identify user
         user_name: str = payload.get("sub")
-        print(f"🔍 DEBUG: Extracted username: '{user_name}'")
-        
         if user_name is None: 
-            print("❌ DEBUG: user_name is None!")
             raise credentials_exception
             
-    except InvalidTokenError as e:
-        print(f"❌ DEBUG: Token decode error: {e}")
+    except InvalidTokenError:
         raise credentials_exception
     
-    # Query Database for user
-    print(f"🔍 DEBUG: Querying DB for user_name: '{user_name}'")
     # Verify that the user exists in the DB
-    user = db.query(UserModel).filter(UserModel.user_name == user_name).first()
-    print(f"🔍 DEBUG: Found user: {user}")
-    
+    user = find_user(db, user_name)
     if user is None:
-        print("❌ DEBUG: User not found in database!")
         raise credentials_exception
-        
-    print(f"✅ DEBUG: Successfully found user: {user.user_name}")
-    return user
+
+    principal = Principal.from_user(user)
+    auth_cache.put(token, principal, expires=payload.get("exp"))
+    return principal
 
 
 ### API Routes ###
@@ -138,18 +163,21 @@ def test():
     return {'message': 'test'}
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data:UserCreate, db:Session = Depends(get_db)):
+async def register(user_data:UserCreate, db:Session = Depends(get_db)):
     """
     Register a new user by verifying and storing information 
     """
     # Check if user exists
-    user = db.query(UserModel).filter(UserModel.user_name == user_data.username).first()
+    user = await run_in_threadpool(find_user_detached, db, user_data.username)
     if user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, 
         detail="Username already taken. Please choose a different username.")
     
     # Hash password
-    hashed_password = hash_password(user_data.password)
+    try:
+        hashed_password = await password_pool.hash(user_data.password)
+    except PasswordPoolBusyError as e:
+        raise password_pool_busy(e)
     # Create the new user python object
     new_user = UserModel(
         id=str(uuid.uuid4()),
@@ -158,9 +186,9 @@ def register(user_data:UserCreate, db:Session = Depends(get_db)):
         created=datetime.utcnow()
     )
     # save to database
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(save_new_user, db, new_user)
+    # Tokens cached for an earlier user of this name must not resolve to them
+    auth_cache.invalidate_user(new_user.user_name)
 
     # Issue access token right way to auto login user
     
@@ -171,8 +199,6 @@ def register(user_data:UserCreate, db:Session = Depends(get_db)):
         data={"sub": new_user.user_name},
         expires_delta=access_token_expires
     )
-    print(f"🔍 DEBUG: Created token with sub: '{new_user.user_name}'")
-    print(f"🔍 DEBUG: Token starts with: {access_token[:50]}...")
     # On successful login, issue an Access Token
     return Token(access_token=access_token, token_type='bearer')
 
@@ -183,24 +209,22 @@ def register(user_data:UserCreate, db:Session = Depends(get_db)):
     # )
 
 @router.post("/token", response_model=Token, status_code=status.HTTP_200_OK)
-def login(form_data:OAuth2PasswordRequestForm = Depends(), db:Session = Depends(get_db)):
+async def login(form_data:OAuth2PasswordRequestForm = Depends(), db:Session = Depends(get_db)):
     """
     Allow user to Login w/ Form, issue a JWT token
     """
-    print(f"🔍 DEBUG: Login attempt for username: '{form_data.username}'")
-    
     # Authenticate User 
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordPoolBusyError as e:
+        raise password_pool_busy(e)
     if not user:
-        print(f"❌ DEBUG: Authentication failed for: '{form_data.username}'")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Incorrect username or password',
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    print(f"✅ DEBUG: Authentication successful for: '{user.user_name}'")
-    
     # Create token expiration time
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     # Create JWT token
@@ -208,13 +232,11 @@ def login(form_data:OAuth2PasswordRequestForm = Depends(), db:Session = Depends(
         data={"sub": user.user_name},
         expires_delta=access_token_expires
     )
-    print(f"🔍 DEBUG: Created token with sub: '{user.user_name}'")
-    print(f"🔍 DEBUG: Token starts with: {access_token[:50]}...")
     # On successful login, issue an Access Token
     return Token(access_token=access_token, token_type='bearer')
 
 @router.get("/me", response_model=UserCreateResponse)
-def get_me(current_user:UserModel = Depends(get_current_user)):
+def get_me(current_user:Principal = Depends(get_current_user)):
     """
     Get current user info - requires authentication
     """
@@ -224,3 +246,17 @@ def get_me(current_user:UserModel = Depends(get_current_user)):
         created=current_user.created
     )
 
+
+@router.get("/cache/stats")
+def get_auth_cache_stats(current_user:Principal = Depends(get_current_user)):
+    """
+    Hit/miss counters and occupancy of the authenticated-user cache
+    """
+    return auth_cache.stats()
+
+@router.get("/password-pool/stats")
+def get_password_pool_stats(current_user:Principal = Depends(get_current_user)):
+    """
+    Load on the password hashing pool: in flight, completed, shed requests
+    """
+    return password_pool.stats()
@@ -5,6 +5,7 @@ import uuid
 from typing import Optional, List
 from app.api.auth import get_current_user
 from app.database import get_db
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.models import User, UserProfile
 
@@ -88,7 +89,13 @@ def create_or_update_profile(profile_data:ProfileCreate, current_user:User=Depen
             dietary_preferences=profile_data.dietary_preferences
         )
         db.add(new_profile)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request created the profile first (one per user)
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Profile was created by another request. Please try again.")
         db.refresh(new_profile)
         return new_profile
 
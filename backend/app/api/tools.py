@@ -1,7 +1,16 @@
-from fastapi import APIRouter
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 from typing import Literal
-from app.utils.health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros
+from app.agent.health_calculations import calculate_bmi, calculate_bmr, calculate_tdee, calculate_macros, chained_metrics, metrics_cache_stats
+
+BATCH_MAX_ROWS = int(os.getenv("TOOLS_BATCH_MAX_ROWS", "100000"))
+# Body size cap, checked before parsing (~200 bytes per NDJSON profile)
+BATCH_MAX_BYTES = int(os.getenv("TOOLS_BATCH_MAX_BYTES", str(32 * 1024 * 1024)))
+BATCH_CHUNK_ROWS = int(os.getenv("TOOLS_BATCH_CHUNK_ROWS", "1000"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
 ### Tool Models ###
 class BMIRequest(BaseModel):
@@ -53,6 +62,36 @@ class MacrosResponse(BaseModel):
     carb_percentage : float
     fat_percentage : float
 
+class MetricsRequest(BaseModel):
+    weight_lbs: float
+    height_feet: int
+    height_inches: float
+    age: int
+    gender: str
+    activity_level: Literal["sedentary", "light", "moderate", "active", "very_active"] = "moderate"
+    goal: Literal['lose_weight',  'gain_weight', 'maintain', 'other'] = "maintain"
+
+    @validator('gender')
+    def validate_gender(cls, v):
+        if v.lower() not in ['male', 'female', 'other']:
+            raise ValueError('Gender must be male, female, or other')
+        return v.lower()
+
+class MetricsResponse(BaseModel):
+    bmi: BMIResponse
+    bmr: int
+    tdee: float
+    macros: MacrosResponse
+
+
+def macros_response(result: dict) -> MacrosResponse:
+    return MacrosResponse(
+        protein=result['protein_g'],
+        carbs=result['carbs_g'], 
+        fat=result['fat_g'],
+        **{k: v for k, v in result.items() if k.endswith('_calories') or k.endswith('_percentage') or k == 'total_calories'}
+    )
+
 
 ### Routes ###
 router = APIRouter(prefix='/tools', tags=['tools'])
@@ -81,9 +120,84 @@ def tdee_endpoint(request: TDEERequest):
 @router.post('/macros', response_model=MacrosResponse)
 def macros_endpoint(request: MacrosRequest):
     result = calculate_macros(request.tdee, request.goal, request.weight_lbs)
-    return MacrosResponse(
-        protein=result['protein_g'],
-        carbs=result['carbs_g'], 
-        fat=result['fat_g'],
-        **{k: v for k, v in result.items() if k.endswith('_calories') or k.endswith('_percentage') or k == 'total_calories'}
+    return macros_response(result)
+
+@router.post('/metrics', response_model=MetricsResponse)
+async def metrics_endpoint(request: MetricsRequest):
+    """
+    BMI, BMR, TDEE and macros for one profile in a single call - the same
+    results as chaining /bmi -> /bmr -> /tdee -> /macros. Pure CPU work of a
+    few microseconds (and memoized), so it runs on the event loop.
+    """
+    result = chained_metrics(
+        request.weight_lbs,
+        request.height_feet,
+        request.height_inches,
+        request.age,
+        request.gender,
+        request.activity_level,
+        request.goal,
+    )
+    return MetricsResponse(
+        bmi=BMIResponse(**result['bmi']),
+        bmr=result['bmr']['bmr'],
+        tdee=result['tdee']['tdee'],
+        macros=macros_response(result['macros']),
+    )
+
+@router.get('/metrics/stats')
+def metrics_stats_endpoint():
+    """Hit rate of the /metrics memo cache"""
+    return metrics_cache_stats()
+
+async def read_body_capped(request: Request, max_bytes: int) -> bytes:
+    """The request body, or 413 as soon as Content-Length or the bytes read exceed max_bytes"""
+    too_large = HTTPException(status_code=413, detail=f"Batch body is larger than {max_bytes} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post('/batch')
+async def batch_endpoint(request: Request):
+    """
+    BMI, BMR, TDEE and macros for many profiles in one request. Send either
+    NDJSON (one profile per line, Content-Type: application/x-ndjson) or a
+    JSON object of columns ({"weight_lbs": [...], "height_feet": [...], ...}).
+    Results stream back as NDJSON: one object per profile for NDJSON input,
+    one {"start", "columns"} chunk per TOOLS_BATCH_CHUNK_ROWS for columns.
+    An optional 'id' field is echoed back.
+    """
+    # NumPy is only loaded once a batch comes in, not at API startup
+    from app.utils.health_batch import BatchInputError, compute_batch, iter_ndjson, parse_columns, parse_ndjson
+
+    # 1. Refuse oversized bodies before (or while) reading them
+    body = await read_body_capped(request, BATCH_MAX_BYTES)
+    columnar = request.headers.get("content-type", "").split(";")[0].strip().lower() not in NDJSON_TYPES
+
+    def parse_and_compute():
+        columns = parse_columns(body) if columnar else parse_ndjson(body)
+        rows = len(columns.get("weight_lbs") or [])
+        if rows > BATCH_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ROWS} profiles per batch (got {rows})")
+        return compute_batch(columns)
+
+    try:
+        # 2. Parse, validate and compute in one vectorized pass, all off the
+        # event loop and before the response starts
+        result = await asyncio.to_thread(parse_and_compute)
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # 3. Stream the rows back in chunks
+    return StreamingResponse(
+        iter_ndjson(result, BATCH_CHUNK_ROWS, columnar=columnar),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Rows": str(len(result["bmi"]))},
     )
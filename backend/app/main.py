@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -5,10 +6,25 @@ from app.api.auth import router as auth_router
 from app.api.profile import router as profile_router
 from app.api.tools import router as tools_router
 from app.api.agent import router as agent_router
+from app.services.plan_jobs import plan_jobs
+from app.services.aws_clients import aws_clients
+from app.services.password_pool import password_pool
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Fitness Agent API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the shared AgentCore client before serving traffic
+    aws_clients.warm([("bedrock-agentcore", "us-east-1")])
+    # Start the password hashing workers so the first logins don't wait for them
+    password_pool.start()
+    yield
+    password_pool.shutdown(wait=False)
+    # Release plan job workers; in-flight AgentCore calls are not awaited
+    plan_jobs.shutdown(wait=False)
+    aws_clients.close()
+
+app = FastAPI(title="Fitness Agent API", version="1.0.0", lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(profile_router)
 app.include_router(tools_router)
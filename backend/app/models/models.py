@@ -1,6 +1,6 @@
 # Define Database Models (structure and rules for tables)
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, JSON, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 
@@ -8,6 +8,8 @@ from app.database import Base
 ### User Data Models ###
 class User(Base):
     __tablename__ = 'users'
+    # Login, register and get_current_user look users up by name
+    __table_args__ = (Index('ix_users_user_name', 'user_name', unique=True),)
     # ID
     id = Column(String, primary_key = True, nullable=False)
     user_name = Column(String, nullable=False)
@@ -17,6 +19,8 @@ class User(Base):
 
 class UserProfile(Base):
     __tablename__ = 'user_profiles'
+    # One profile per user
+    __table_args__ = (Index('ix_user_profiles_user_id', 'user_id', unique=True),)
     # user ID
     id = Column(String, primary_key = True)
     user_id = Column(String, ForeignKey('users.id'), nullable=False)
@@ -36,6 +40,8 @@ class UserProfile(Base):
 ### Fitness Plan Data Models ###
 class FitnessPlan(Base):
     __tablename__ = "fitness_plans"
+    # One current plan per user (history is in plan_versions)
+    __table_args__ = (Index('ix_fitness_plans_user_id', 'user_id', unique=True),)
     
     id = Column(String, primary_key = True)
     user_id = Column(String, ForeignKey('users.id'), nullable=False)
@@ -44,34 +50,66 @@ class FitnessPlan(Base):
     health_metrics = Column(JSON)
     tips = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
-    # last_modified = Column(DateTime, default=datetime.utcnow)
+    last_modified = Column(DateTime, default=datetime.utcnow)
     
     # status = Column(String, default='active')  # 'active', 'archived', 'draft'
-    # version = Column(Integer, default=1)
+    version = Column(Integer, default=1)  # latest PlanVersion; the row is updated in place
     # need to add tips
-    
 
-# class ConversationHistory(Base):
-#     __tablename__ = "conversation_history"
+class PlanVersion(Base):
+    __tablename__ = "plan_versions"
+    # History pages walk a user's versions newest first
+    __table_args__ = (Index('ix_plan_versions_user_version', 'user_id', 'version', unique=True),)
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey('users.id'), nullable=False)
+    version = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # 'snapshot' (whole plan) or 'patch' (JSON patch from version - 1)
+    base_version = Column(Integer, nullable=False)  # snapshot this version is rebuilt from
+    data = Column(JSON, nullable=False)
+    size_bytes = Column(Integer)  # size of data as stored
+    source = Column(String)  # 'generate', 'save', 'regenerate', 'edit:<target>'
+    created_at = Column(DateTime, default=datetime.utcnow)
     
-#     id = Column(String, primary_key=True)
-#     user_id = Column(String, ForeignKey('users.id'), nullable=False)
-#     plan_id = Column(String, nullable=False)
-#     message = Column(String, nullable=False)
-#     response = Column(String, nullable=False)
-#     timestamp = Column(DateTime, default=datetime.utcnow)
-#     plan_changes = Column(JSON)  # any plan modifications made
 
-# class PlanChange(Base):
-#     __tablename__ = "plan_changes"
+### Chat Data Models ###
+class ConversationHistory(Base):
+    __tablename__ = "conversation_history"
+    # Chat context reads a user's most recent turns
+    __table_args__ = (Index('ix_conversation_history_user_timestamp', 'user_id', 'timestamp'),)
     
-#     id = Column(String, primary_key=True)
-#     plan_id = Column(String, nullable=False)
-#     change_type = Column(String)  # 'workout', 'meal', 'schedule'
-#     description = Column(String)
-#     before_data = Column(JSON)
-#     after_data = Column(JSON)
-#     reason = Column(String)
-#     timestamp = Column(DateTime, default=datetime.utcnow)
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey('users.id'), nullable=False)
+    plan_id = Column(String)  # plan the user had at the time (may be none yet)
+    message = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    plan_changes = Column(JSON)  # any plan modifications made
+
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
 
+    # One rolling summary per user, covering every turn up to and including
+    # the last folded one: (summarized_until, summarized_through_id), in
+    # (timestamp, id) order so turns sharing a timestamp are not skipped
+    user_id = Column(String, ForeignKey('users.id'), primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    summarized_until = Column(DateTime)
+    summarized_through_id = Column(String)
+    turn_count = Column(Integer, default=0)  # turns folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
+class PlanChange(Base):
+    __tablename__ = "plan_changes"
+    
+    id = Column(String, primary_key=True)
+    plan_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, ForeignKey('users.id'), nullable=False)
+    change_type = Column(String)  # 'workout', 'meal', 'schedule'
+    target = Column(String)  # 'thursday', 'lunch', 'snack_1'
+    description = Column(String)
+    before_data = Column(JSON)
+    after_data = Column(JSON)
+    reason = Column(String)  # the user's request
+    version = Column(Integer)  # PlanVersion the change produced
+    timestamp = Column(DateTime, default=datetime.utcnow)
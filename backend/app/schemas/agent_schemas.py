@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
+from datetime import datetime
 
 class Exercise(BaseModel):
     name: str
@@ -52,6 +53,44 @@ class PlanGenerationResponse(BaseModel):
     meal_plan: MealPlan = Field(default_factory=MealPlan)
     tips: List[str] = []
 
+# Tips on their own (fan-out generation branch)
+class PlanTips(BaseModel):
+    tips: List[str] = []
+
 class ChatRequest(BaseModel):
-    message: str
-    plan_context: Dict = {}
\ No newline at end of file
+    # The server supplies the plan and conversation context
+    message: str = Field(min_length=1, max_length=4000)
+
+# Partial plan edits (one day's workout or one meal)
+class PlanEditRequest(BaseModel):
+    instruction: str = Field(default="", max_length=1000, description="e.g. 'no jumping, my knees hurt'")
+
+class PlanChangeResponse(BaseModel):
+    change_id: str
+    change_type: str  # 'workout' or 'meal'
+    target: str       # day name, 'breakfast', 'lunch', 'dinner' or 'snack_<n>'
+    before: Optional[Dict] = None
+    after: Dict
+    plan: PlanGenerationResponse
+    latency_ms: int
+    usage: Dict = {}
+
+class PlanVersionSummary(BaseModel):
+    version: int
+    kind: str    # 'snapshot' or 'patch'
+    source: Optional[str] = None
+    size_bytes: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class PlanHistoryPage(BaseModel):
+    items: List[PlanVersionSummary]
+    next_before: Optional[int] = None  # pass as ?before= for the next page; None on the last one
+
+class PlanJobStatus(BaseModel):
+    job_id: str
+    status: str  # 'queued', 'running', 'done', 'failed'
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[PlanGenerationResponse] = None
@@ -0,0 +1 @@
+# Application services (plan generation, background jobs)
\ No newline at end of file
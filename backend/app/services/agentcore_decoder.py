@@ -0,0 +1,322 @@
+# backend/app/services/agentcore_decoder.py
+# Decode AgentCore Runtime response bodies without the per-line overhead
+# of iter_lines(): read large buffers, split SSE frames incrementally and
+# pick the plan JSON apart section by section while it is still arriving,
+# validating each section as soon as its closing bracket is read.
+import codecs
+import json
+import re
+
+from pydantic import TypeAdapter
+
+from app.schemas.agent_schemas import PlanGenerationResponse
+
+READ_SIZE = 64 * 1024
+
+# One validator per plan section, built once (health_metrics, workout_plan, ...)
+SECTION_VALIDATORS = {
+    name: TypeAdapter(field.annotation)
+    for name, field in PlanGenerationResponse.model_fields.items()
+}
+
+_JSON = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+_NON_WHITESPACE = re.compile(r'\S')
+_COLON = re.compile(r'\s*:\s*')
+_RESPONSE_OBJECT = object()  # marker: entering the envelope's "response" object
+_IGNORED_FIELDS = (b"event:", b"id:", b"retry:", b":")
+
+
+class PlanDecodeError(ValueError):
+    """The runtime response is not a well-formed plan"""
+
+
+def validate_section(name: str, value):
+    """
+    Validate one plan section; returns the parsed model (or list/dict).
+    Unknown names are passed through untouched.
+    """
+    validator = SECTION_VALIDATORS.get(name)
+    if validator is None:
+        return value
+    try:
+        return validator.validate_python(value)
+    except ValueError as e:
+        raise PlanDecodeError(f"Invalid '{name}' section in agent response: {e}") from e
+
+
+def iter_body_chunks(body, size: int = READ_SIZE, low_latency: bool = False):
+    """
+    Read a botocore StreamingBody in chunks of up to size bytes.
+    With low_latency, return whatever has arrived instead of waiting for a
+    full buffer (urllib3 read1), so streamed events aren't held back.
+    """
+    read1 = getattr(getattr(body, "_raw_stream", None), "read1", None) if low_latency else None
+    if read1 is not None:
+        while True:
+            chunk = read1(size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from body.iter_chunks(size)
+
+
+class SSEDecoder:
+    """
+    Incremental Server-Sent Events framing: feed() raw bytes, get back the
+    data payload of every event completed so far. Multi-line data fields
+    are joined with newlines as the SSE spec says; event/id/retry fields and
+    comments are dropped, and bare lines are kept as data like the old
+    line reader did.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._scan_from = 0
+        self._separator = None  # b"\n\n", or b"\r\n\r\n" for CRLF servers
+
+    def feed(self, chunk: bytes) -> list:
+        self._buf += chunk
+        if self._separator is None:
+            newline = self._buf.find(b"\n")
+            if newline == -1:
+                return []
+            self._separator = b"\r\n\r\n" if self._buf[newline - 1:newline] == b"\r" else b"\n\n"
+        events = []
+        start = 0
+        while True:
+            end = self._buf.find(self._separator, max(start, self._scan_from))
+            if end == -1:
+                break
+            data = self._event_data(self._buf[start:end])
+            if data is not None:
+                events.append(data)
+            start = end + len(self._separator)
+        if start:
+            del self._buf[:start]
+        # A separator may straddle this chunk and the next
+        self._scan_from = max(0, len(self._buf) - len(self._separator) + 1)
+        return events
+
+    def close(self) -> list:
+        """Flush an event left unterminated at the end of the stream"""
+        data = self._event_data(self._buf)
+        self._buf = bytearray()
+        self._scan_from = 0
+        return [data] if data is not None else []
+
+    @staticmethod
+    def _event_data(block):
+        lines = []
+        for line in block.splitlines():
+            if line.startswith(b"data:"):
+                line = line[5:]
+                lines.append(line[1:] if line.startswith(b" ") else line)
+            elif line and not line.startswith(_IGNORED_FIELDS):
+                lines.append(line)
+        if not lines:
+            return None
+        return b"\n".join(lines)
+
+
+class PlanBodyDecoder:
+    """
+    Incremental decoder for a plan JSON document, either the runtime
+    envelope ({"response": {...plan...}, "status": ..., ...}) or a bare plan.
+
+    Members of the envelope and of its "response" object are parsed one at
+    a time with the C JSON scanner as soon as they are complete, and plan
+    sections are validated right then. A running bracket count skips
+    attempts on members that are still arriving (brackets inside strings
+    can fool it, which only defers validation to a later chunk), and a
+    failed attempt waits for the buffer to double, so a large section
+    isn't re-parsed on every chunk.
+    result() assembles the document without a second full parse.
+    """
+
+    def __init__(self, on_section=None):
+        self.on_section = on_section  # called as on_section(name, validated_value)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._parts = []       # decoded text not yet joined onto _text
+        self._text = ""
+        self._pos = 0          # start of the first unparsed member in _text
+        self._pending = 0      # characters buffered past _pos
+        self._retry_at = 0     # wait for this many pending characters before retrying
+        self._balance = 0      # brackets opened minus closed in everything fed so far
+        self._level = 0        # 0: before the root '{', 1: envelope members, 2: inside "response"
+        self._after_member = False
+        self._done = False
+        self._is_json = None
+        self.values = {}  # top-level members
+        self.plan = {}    # members of "response" in an envelope
+
+    def feed(self, chunk: bytes):
+        if self._done or not chunk:
+            return
+        text = self._utf8.decode(chunk)
+        self._parts.append(text)
+        self._pending += len(text)
+        self._balance += text.count("{") + text.count("[") - text.count("}") - text.count("]")
+        if self._is_json is None:
+            first = _NON_WHITESPACE.search("".join(self._parts))
+            if first is None:
+                return
+            self._is_json = first.group() == "{"
+        if self._is_json and self._pending >= self._retry_at:
+            self._advance(final=False)
+
+    def _advance(self, final: bool):
+        if self._parts:
+            self._text = self._text[self._pos:] + "".join(self._parts)
+            self._parts = []
+            self._pos = 0
+        text = self._text
+        pos = self._pos
+        while True:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos >= len(text):
+                break
+            char = text[pos]
+            if self._level == 0:
+                if char != "{":
+                    raise PlanDecodeError("Agent response is not a JSON object")
+                self._level, pos = 1, pos + 1
+                continue
+            if char == "}":
+                pos += 1
+                if self._level == 2:
+                    self.values["response"] = self.plan  # built from its members
+                    self._level, self._after_member = 1, True
+                    continue
+                self._done = True
+                break
+            if self._after_member:
+                if char != ",":
+                    raise PlanDecodeError(f"Malformed JSON in agent response at character {pos}")
+                self._after_member, pos = False, pos + 1
+                continue
+
+            member = self._read_member(text, pos, final)
+            if member is None:
+                break  # still arriving
+            key, value, pos = member
+            if key is _RESPONSE_OBJECT:
+                self._level = 2
+                continue
+            if key in SECTION_VALIDATORS:
+                value = validate_section(key, value)
+                if self.on_section is not None:
+                    self.on_section(key, value)
+            (self.plan if self._level == 2 else self.values)[key] = value
+            self._after_member = True
+
+        self._pos = pos
+        self._pending = len(text) - pos
+
+    def _read_member(self, text: str, pos: int, final: bool):
+        """
+        Parse '"key": value' at pos -> (key, value, end), or None if the
+        member isn't complete yet. The envelope's "response" object is
+        entered rather than parsed whole, so its sections come out one by one.
+        """
+        try:
+            key, end = _JSON.raw_decode(text, pos)
+            colon = _COLON.match(text, end)
+            if colon is None:
+                if _WHITESPACE.match(text, end).end() < len(text):
+                    raise PlanDecodeError(f"Malformed JSON in agent response at character {end}")
+                return self._incomplete(text, pos)
+            value_start = colon.end()
+            if value_start >= len(text):
+                return self._incomplete(text, pos)
+            if self._level == 1 and key == "response" and text[value_start] == "{":
+                return _RESPONSE_OBJECT, None, value_start + 1
+            if not final and self._balance > self._level and text[value_start] in "{[":
+                # Everything before this member is closed except the levels
+                # we're inside, so extra open brackets mean it's still arriving
+                return self._incomplete(text, pos, backoff=False)
+            value, end = _JSON.raw_decode(text, value_start)
+        except json.JSONDecodeError as e:
+            if final and e.pos >= len(text):
+                raise PlanDecodeError("Agent response ended before the plan was complete") from e
+            if final:
+                raise PlanDecodeError(f"Malformed JSON in agent response: {e}") from e
+            return self._incomplete(text, pos)
+        if end >= len(text) and not final:
+            # A number or literal at the very end may still have digits coming
+            return self._incomplete(text, pos, backoff=False)
+        return key, value, end
+
+    def _incomplete(self, text: str, pos: int, backoff: bool = True):
+        pending = len(text) - pos
+        self._retry_at = 2 * pending if backoff else pending + 1
+        return None
+
+    def result(self) -> dict:
+        """The decoded document; plan sections are already-validated models"""
+        if not self._is_json:
+            # Not JSON (e.g. an agent error message); same shape as before
+            return {"response": "".join(self._parts) + self._utf8.decode(b"", final=True)}
+        if not self._done:
+            self._advance(final=True)
+        if not self._done:
+            raise PlanDecodeError("Agent response ended before the plan was complete")
+        return self.values
+
+
+def decode_plan_response(response: dict, on_section=None) -> dict:
+    """
+    Decode a non-streaming invoke_agent_runtime response into the runtime's
+    JSON document. Works for application/json bodies and for runtimes that
+    send the same document as SSE data lines.
+    """
+    content_type = response.get("contentType", "")
+    if "text/event-stream" in content_type:
+        decoder = PlanBodyDecoder(on_section)
+        sse = SSEDecoder()
+        separator = b""
+        for chunk in iter_body_chunks(response["response"]):
+            for data in sse.feed(chunk):
+                # Consecutive data lines form one document (joined by newlines)
+                decoder.feed(separator)
+                decoder.feed(data)
+                separator = b"\n"
+        for data in sse.close():
+            decoder.feed(separator)
+            decoder.feed(data)
+        return decoder.result()
+    if content_type == "application/json":
+        decoder = PlanBodyDecoder(on_section)
+        for chunk in iter_body_chunks(response["response"]):
+            decoder.feed(chunk)
+        return decoder.result()
+    # Handle other response types
+    return response
+
+
+def iter_runtime_events(response: dict):
+    """
+    Yield decoded event dicts from a streaming AgentCore response as they
+    arrive. Section events are validated on the way through. Runtimes that
+    don't stream return one JSON body, yielded as a single event.
+    """
+    if "text/event-stream" not in response.get("contentType", ""):
+        yield decode_plan_response(response)
+        return
+    sse = SSEDecoder()
+    for chunk in iter_body_chunks(response["response"], low_latency=True):
+        for data in sse.feed(chunk):
+            yield _parse_event(data)
+    for data in sse.close():
+        yield _parse_event(data)
+
+
+def _parse_event(data: bytes):
+    try:
+        event = json.loads(data)
+    except ValueError as e:
+        raise PlanDecodeError(f"Malformed event from agent runtime: {e}") from e
+    if isinstance(event, dict) and event.get("event") == "section":
+        validate_section(event.get("name"), event.get("data"))
+    return event
@@ -0,0 +1,256 @@
+# backend/app/services/auth_cache.py
+# Cache of verified principals keyed by access token, so get_current_user
+# doesn't decode the JWT and query users on every authenticated request.
+#
+# Entries live until the sooner of the cache TTL and the token's own expiry.
+# Anything that changes a user row (rename, delete, re-register) must call
+# auth_cache.invalidate_user(user_name); the TTL bounds how stale a missed
+# invalidation can get.
+#
+# Stores are pluggable: any object with get/put/invalidate_user/clear/size
+# works. MemoryPrincipalStore is per process; RedisPrincipalStore is shared
+# by every worker, so an invalidation on one worker applies to all of them.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as route handlers see it (the users row fields they read)"""
+    id: str
+    user_name: str
+    created: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, user_name=user.user_name, created=user.created)
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.id, "user_name": self.user_name,
+                           "created": self.created.isoformat() if self.created else None})
+
+    @classmethod
+    def from_json(cls, data) -> "Principal":
+        fields = json.loads(data)
+        created = fields.get("created")
+        return cls(id=fields["id"], user_name=fields["user_name"],
+                   created=datetime.fromisoformat(created) if created else None)
+
+
+### Stores ###
+
+class MemoryPrincipalStore:
+    """
+    Thread-safe LRU of token -> principal with per-entry expiry, plus a
+    user_name -> tokens index for invalidation
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (expires_at, principal)
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _drop(self, token: str):
+        _, principal = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.user_name)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.user_name]
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if time.monotonic() >= expires_at:
+                self._drop(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, ttl_seconds: float):
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (time.monotonic() + ttl_seconds, principal)
+            self._tokens_by_user.setdefault(principal.user_name, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_name: str) -> int:
+        with self._lock:
+            tokens = list(self._tokens_by_user.get(user_name, ()))
+            for token in tokens:
+                self._drop(token)
+            return len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisPrincipalStore:
+    """
+    Principals in Redis, shared by every worker. Tokens are stored hashed;
+    a set per user lists that user's cached tokens for invalidation.
+    Needs the redis package (pip install redis).
+    """
+
+    def __init__(self, url: str, prefix: str = "auth:", max_ttl_seconds: float = 3600):
+        import redis  # only needed when this backend is configured
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.max_ttl_seconds = max_ttl_seconds
+        self.errors = 0
+        self._redis_error = redis.RedisError
+
+    def _token_key(self, token: str) -> str:
+        return f"{self.prefix}token:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+    def _user_key(self, user_name: str) -> str:
+        return f"{self.prefix}user:{user_name}"
+
+    def get(self, token: str) -> Optional[Principal]:
+        try:
+            data = self.client.get(self._token_key(token))
+        except self._redis_error as e:
+            # An unreachable cache is a miss: the caller falls back to the database
+            self.errors += 1
+            print(f"⚠️ Auth cache read failed: {e}")
+            return None
+        return Principal.from_json(data) if data else None
+
+    def put(self, token: str, principal: Principal, ttl_seconds: float):
+        key = self._token_key(token)
+        user_key = self._user_key(principal.user_name)
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(key, principal.to_json(), px=max(1, int(ttl_seconds * 1000)))
+            pipe.sadd(user_key, key)
+            pipe.expire(user_key, int(self.max_ttl_seconds) + 1)
+            pipe.execute()
+        except self._redis_error as e:
+            self.errors += 1
+            print(f"⚠️ Auth cache write failed: {e}")
+
+    def invalidate_user(self, user_name: str) -> int:
+        # Not swallowed: a failed invalidation must not pass silently
+        user_key = self._user_key(user_name)
+        keys = self.client.smembers(user_key)
+        pipe = self.client.pipeline()
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(user_key)
+        pipe.execute()
+        return len(keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self) -> int:
+        try:
+            return sum(1 for _ in self.client.scan_iter(f"{self.prefix}token:*"))
+        except self._redis_error:
+            return -1
+
+
+### Cache ###
+
+class AuthCache:
+    """
+    Principal lookups by token over a store, with the TTL policy and
+    hit/miss counters. A store of None disables caching.
+    """
+
+    def __init__(self, store=None, ttl_seconds: float = 300):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None and self.ttl_seconds > 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        if not self.enabled:
+            return None
+        principal = self.store.get(token)
+        if principal is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return principal
+
+    def put(self, token: str, principal: Principal, expires: Optional[float] = None):
+        """Cache principal for token; expires is the token's exp claim (epoch seconds)"""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if expires is not None:
+            ttl = min(ttl, float(expires) - time.time())
+        if ttl > 0:
+            self.store.put(token, principal, ttl)
+
+    def invalidate_user(self, user_name: str) -> int:
+        """Drop every cached token of user_name; returns how many were cached"""
+        if self.store is None:
+            return 0
+        self.invalidations += 1
+        return self.store.invalidate_user(user_name)
+
+    def clear(self):
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.store).__name__ if self.store is not None else None,
+            "size": self.store.size() if self.store is not None else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_auth_cache() -> AuthCache:
+    """AuthCache configured from AUTH_CACHE_* environment variables"""
+    backend = os.getenv("AUTH_CACHE_BACKEND", "memory").lower()
+    ttl_seconds = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+    if backend == "redis":
+        store = RedisPrincipalStore(os.getenv("AUTH_CACHE_REDIS_URL", "redis://localhost:6379/0"),
+                                    prefix=os.getenv("AUTH_CACHE_REDIS_PREFIX", "auth:"),
+                                    max_ttl_seconds=ttl_seconds)
+    elif backend == "memory":
+        store = MemoryPrincipalStore(max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")))
+    elif backend == "off":
+        store = None
+    else:
+        raise ValueError(f"AUTH_CACHE_BACKEND must be 'memory', 'redis' or 'off', not '{backend}'")
+    return AuthCache(store, ttl_seconds=ttl_seconds)
+
+
+auth_cache = build_auth_cache()
@@ -0,0 +1,116 @@
+# backend/app/services/aws_clients.py
+# Process-wide boto3 clients. Building a client loads the service model and
+# a fresh HTTPS connection pool, so every AgentCore/Bedrock caller shares
+# one client per (service, region) for the life of the app.
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
+
+# Settings shared by every client: pooled, kept-alive connections
+BASE_CONFIG = Config(
+    max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+)
+
+# Per-service overrides layered on top of BASE_CONFIG
+SERVICE_CONFIGS = {
+    # Plan generation takes minutes, so allow long reads. Worst case is
+    # read_timeout x max_attempts per call until the circuit breaker opens
+    # (app/services/circuit_breaker.py), so these are tunable per deployment.
+    "bedrock-agentcore": Config(
+        read_timeout=int(os.getenv("AGENTCORE_READ_TIMEOUT", "300")),  # 5 minutes
+        connect_timeout=int(os.getenv("AGENTCORE_CONNECT_TIMEOUT", "60")),  # 1 minute
+        retries={'max_attempts': int(os.getenv("AGENTCORE_MAX_ATTEMPTS", "3"))}
+    ),
+    # Structured plan output streams for a while (Strands' own default is 120s)
+    "bedrock-runtime": Config(read_timeout=int(os.getenv("BEDROCK_READ_TIMEOUT", "120"))),
+}
+
+
+def client_config(service_name: str) -> Config:
+    """BASE_CONFIG with the service's overrides"""
+    config = BASE_CONFIG
+    if service_name in SERVICE_CONFIGS:
+        config = config.merge(SERVICE_CONFIGS[service_name])
+    return config
+
+
+class AWSClientRegistry:
+    """Lazily creates and caches one boto3 client per (service, region)"""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._session = None
+
+    def build(self, factory):
+        """
+        factory(session) with the shared session, for clients built by a
+        library (e.g. Strands' BedrockModel); serialized like get() since
+        creating clients from one session isn't thread-safe
+        """
+        with self._lock:
+            return factory(self._get_session())
+
+    def _get_session(self):
+        # Lock held. The region only applies where a caller doesn't pass one
+        if self._session is None:
+            self._session = boto3.session.Session(region_name=DEFAULT_REGION)
+        return self._session
+
+    def get(self, service_name: str, region_name: str = None):
+        region_name = region_name or DEFAULT_REGION
+        key = (service_name, region_name)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        # boto3 sessions are not thread-safe, so creation is serialized
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._get_session().client(service_name, region_name=region_name,
+                                                    config=client_config(service_name))
+                self._clients[key] = client
+        return client
+
+    def register(self, service_name: str, client, region_name: str = None):
+        """Install a prebuilt client (e.g. the local benchmark stand-in)"""
+        with self._lock:
+            self._clients[(service_name, region_name or DEFAULT_REGION)] = client
+
+    def warm(self, services):
+        """Build clients up front so the first request doesn't pay for it"""
+        for service_name, region_name in services:
+            self.get(service_name, region_name)
+
+    def close(self):
+        """Close pooled connections; later get() calls build new clients"""
+        with self._lock:
+            for client in self._clients.values():
+                if hasattr(client, "close"):
+                    client.close()
+            self._clients.clear()
+            self._session = None
+
+
+aws_clients = AWSClientRegistry()
+
+
+def get_agentcore_client():
+    # AgentCore Runtime is deployed in us-east-1
+    return aws_clients.get("bedrock-agentcore", "us-east-1")
+
+
+def build_bedrock_model(**model_config):
+    """
+    Strands BedrockModel whose bedrock-runtime client comes from the shared
+    session with the pooled connection settings (it builds its own client)
+    """
+    from strands.models.bedrock import BedrockModel  # only where an agent runs
+
+    return aws_clients.build(lambda session: BedrockModel(
+        boto_session=session, boto_client_config=client_config("bedrock-runtime"), **model_config))
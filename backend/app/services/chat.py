@@ -0,0 +1,228 @@
+# backend/app/services/chat.py
+# Plan chat with bounded context. Each turn the model gets a compact digest
+# of the user's plan, a rolling recap of older turns and only the most
+# recent turns, so prompt size stays flat however long the conversation
+# gets. Replies stream back as SSE; turns are stored in conversation_history
+# and folded into conversation_summaries in the background.
+import asyncio
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from app.database import SessionLocal
+from app.models.models import ConversationHistory, ConversationSummary, FitnessPlan
+from app.services.plan_archetypes import WEEK_DAYS
+from app.services.plan_generation import format_sse, get_local_agent
+
+# Recent turns sent verbatim; once WINDOW + BATCH turns are unsummarized the
+# oldest BATCH are folded into the recap (at most BATCH per summarizer call)
+CHAT_WINDOW_TURNS = int(os.getenv("CHAT_WINDOW_TURNS", "6"))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "4"))
+DIGEST_CACHE_SIZE = 1024
+
+_digests = OrderedDict()  # (plan id, version) -> digest
+_digest_lock = threading.Lock()
+_summarizing = set()      # user ids with a recap update in flight
+_summarize_lock = threading.Lock()
+_summary_executor = ThreadPoolExecutor(max_workers=int(os.getenv("CHAT_SUMMARY_WORKERS", "2")),
+                                       thread_name_prefix="chat-summary")
+
+
+### Context ###
+
+def unsummarized_turns(db, user_id: str, summary):
+    """Turns after the recap's last folded turn, by (timestamp, id) so ties at the boundary are kept"""
+    query = db.query(ConversationHistory).filter(ConversationHistory.user_id == user_id)
+    if summary is None or summary.summarized_until is None:
+        return query
+    if summary.summarized_through_id is None:
+        # Recap written before turn ids were recorded
+        return query.filter(ConversationHistory.timestamp > summary.summarized_until)
+    return query.filter(or_(
+        ConversationHistory.timestamp > summary.summarized_until,
+        and_(ConversationHistory.timestamp == summary.summarized_until,
+             ConversationHistory.id > summary.summarized_through_id),
+    ))
+
+
+def plan_digest(plan: FitnessPlan) -> str:
+    """A few lines covering targets, the weekly split and the meals - not the whole plan"""
+    metrics = plan.health_metrics or {}
+    macros = metrics.get("macro_targets") or (plan.meal_plan or {}).get("daily_targets") or {}
+    lines = [
+        f"Targets: {metrics.get('target_calories', macros.get('calories', '?'))} kcal, "
+        f"{macros.get('protein_g', '?')}g protein / {macros.get('carbs_g', '?')}g carbs / {macros.get('fat_g', '?')}g fat"
+    ]
+    workout_plan = plan.workout_plan or {}
+    for day in WEEK_DAYS:
+        workout = workout_plan.get(day)
+        if workout:
+            exercises = ", ".join(exercise.get("name", "") for exercise in (workout.get("exercises") or [])[:6])
+            lines.append(f"{day.title()}: {workout.get('workout_type')} {workout.get('duration_minutes') or ''}min ({exercises})")
+    day_meal = (plan.meal_plan or {}).get("day_meal") or {}
+    meals = [(name, day_meal.get(name)) for name in ("breakfast", "lunch", "dinner")]
+    meals += [("snack", snack) for snack in day_meal.get("snacks") or []]
+    lines += [f"{name.title()}: {meal.get('name')} ({meal.get('calories') or '?'} kcal)" for name, meal in meals if meal]
+    if plan.tips:
+        lines.append("Tips: " + "; ".join(plan.tips[:3]))
+    return "\n    ".join(lines)
+
+
+def cached_plan_digest(plan: FitnessPlan) -> str:
+    """Every change to a plan bumps its version, so a digest is valid for (id, version)"""
+    key = (plan.id, plan.version)
+    with _digest_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+            return digest
+    digest = plan_digest(plan)
+    with _digest_lock:
+        _digests[key] = digest
+        if len(_digests) > DIGEST_CACHE_SIZE:
+            _digests.popitem(last=False)
+    return digest
+
+
+def load_chat_context(user_id: str) -> dict:
+    """Plan digest, recap and the unsummarized recent turns (oldest first)"""
+    db = SessionLocal()
+    try:
+        plan = db.query(FitnessPlan).filter(FitnessPlan.user_id == user_id).first()
+        summary = db.get(ConversationSummary, user_id)
+        # Bounded even if the recap falls behind
+        turns = (unsummarized_turns(db, user_id, summary)
+                 .order_by(ConversationHistory.timestamp.desc(), ConversationHistory.id.desc())
+                 .limit(CHAT_WINDOW_TURNS + CHAT_SUMMARY_BATCH).all())
+        return {
+            "plan_id": plan.id if plan else None,
+            "plan_digest": cached_plan_digest(plan) if plan else "",
+            "summary": summary.summary if summary else "",
+            "turns": [(turn.message, turn.response) for turn in reversed(turns)],
+        }
+    finally:
+        db.close()
+
+
+def history_messages(turns: list) -> list:
+    """(message, response) pairs as Strands conversation messages"""
+    messages = []
+    for message, response in turns:
+        messages.append({"role": "user", "content": [{"text": message}]})
+        messages.append({"role": "assistant", "content": [{"text": response}]})
+    return messages
+
+
+### Persistence ###
+
+def save_turn(user_id: str, plan_id: str, message: str, response: str) -> str:
+    db = SessionLocal()
+    try:
+        turn = ConversationHistory(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            plan_id=plan_id,
+            message=message,
+            response=response,
+            timestamp=datetime.utcnow(),
+        )
+        db.add(turn)
+        db.commit()
+        return turn.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def roll_summary(user_id: str):
+    """
+    Fold the oldest BATCH unsummarized turns into the recap once a full
+    batch is waiting past the window. A larger backlog is worked off one
+    batch per call (every chat turn schedules one), so the summarizer
+    prompt stays bounded.
+    """
+    db = SessionLocal()
+    try:
+        summary = db.get(ConversationSummary, user_id)
+        pending = (unsummarized_turns(db, user_id, summary)
+                   .order_by(ConversationHistory.timestamp, ConversationHistory.id)
+                   .limit(CHAT_WINDOW_TURNS + CHAT_SUMMARY_BATCH).all())
+        if len(pending) < CHAT_WINDOW_TURNS + CHAT_SUMMARY_BATCH:
+            return
+        folded = pending[:CHAT_SUMMARY_BATCH]
+        text = get_local_agent().summarize_chat(summary.summary if summary else "",
+                                                [(turn.message, turn.response) for turn in folded])
+        if summary is None:
+            summary = ConversationSummary(user_id=user_id, turn_count=0)
+            db.add(summary)
+        summary.summary = text
+        summary.summarized_until = folded[-1].timestamp
+        summary.summarized_through_id = folded[-1].id
+        summary.turn_count = (summary.turn_count or 0) + len(folded)
+        summary.updated_at = datetime.utcnow()
+        db.commit()
+        print(f"🧾 Folded {len(folded)} chat turn(s) into the recap for user {user_id}")
+    except Exception:
+        db.rollback()
+        traceback.print_exc()
+    finally:
+        db.close()
+        with _summarize_lock:
+            _summarizing.discard(user_id)
+
+
+def schedule_summary(user_id: str, pending_turns: int) -> bool:
+    """Update the recap off the request path, at most once at a time per user"""
+    if pending_turns < CHAT_WINDOW_TURNS + CHAT_SUMMARY_BATCH:
+        return False
+    with _summarize_lock:
+        if user_id in _summarizing:
+            return False
+        _summarizing.add(user_id)
+    _summary_executor.submit(roll_summary, user_id)
+    return True
+
+
+### Streaming ###
+
+async def stream_chat_events(user_id: str, message: str):
+    """
+    Stream one chat turn as SSE: a 'delta' event per reply chunk, then
+    'done' with the stored turn id and token usage. Errors are reported
+    as an 'error' event since headers are already sent.
+    """
+    try:
+        # 1. Bounded context: digest + recap + recent turns
+        context = await asyncio.to_thread(load_chat_context, user_id)
+
+        # 2. Stream the reply
+        chunks, usage = [], {}
+        async for kind, value in get_local_agent().stream_chat(
+                message, history_messages(context["turns"]),
+                plan_digest=context["plan_digest"], summary=context["summary"]):
+            if kind == "delta":
+                chunks.append(value)
+                yield format_sse("delta", {"text": value})
+            else:
+                usage = value
+
+        # 3. Store the turn, then update the recap if the window overflowed
+        turn_id = await asyncio.to_thread(save_turn, user_id, context["plan_id"], message, "".join(chunks))
+        summarizing = schedule_summary(user_id, len(context["turns"]) + 1)
+        yield format_sse("done", {
+            "turn_id": turn_id,
+            "context_turns": len(context["turns"]),
+            "summarizing": summarizing,
+            "usage": usage,
+        })
+    except Exception as e:
+        traceback.print_exc()
+        yield format_sse("error", {"detail": f"Error chatting with agent: {str(e)}"})
@@ -0,0 +1,144 @@
+# backend/app/services/circuit_breaker.py
+# Circuit breaker for slow or failing dependencies (the AgentCore Runtime).
+#
+# The breaker watches the outcome of the last N calls. When enough of them
+# failed or were slow it opens, and callers are rejected immediately with
+# CircuitOpenError instead of each waiting out the full read timeout and
+# retries. After a cool-down a few probe calls are let through (half-open);
+# a successful probe closes the circuit again, a failed one re-opens it.
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# States
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is unavailable right now. Please try again in {retry_after} seconds.")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker over a rolling window of call outcomes.
+    Opens when, with at least min_calls in the window, the failure rate
+    or the slow-call rate reaches its threshold. slow_call_seconds = 0
+    turns the slow-call rule off; when set, it must sit above the p95
+    latency of healthy calls or normal traffic opens the circuit.
+    """
+
+    def __init__(self, name: str, window_size: int = 20, min_calls: int = 5,
+                 failure_rate_threshold: float = 0.5, slow_call_seconds: float = 0,
+                 slow_call_rate_threshold: float = 0.5, open_seconds: float = 30,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._window = deque(maxlen=window_size)  # (failed, slow) per call
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.counters = Counter()     # calls, successes, failures, slow_calls, rejected
+        self.transitions = Counter()  # "closed->open", ...
+
+    def _transition(self, state: str):
+        print(f"🔌 Circuit '{self.name}': {self.state} -> {state}")
+        self.transitions[f"{self.state}->{state}"] += 1
+        self.state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._window.clear()
+
+    def retry_after(self) -> int:
+        if self.state != OPEN:
+            return 0
+        return max(1, round(self.open_seconds - (time.monotonic() - self._opened_at)))
+
+    def allow(self):
+        """Reserve a call, or raise CircuitOpenError while the circuit is open"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(self.name, self.retry_after() or int(self.open_seconds))
+            if self.state == HALF_OPEN:
+                self._probes += 1
+            self.counters["calls"] += 1
+
+    def is_closed(self) -> bool:
+        with self._lock:
+            return self.state == CLOSED
+
+    def record(self, success: bool, duration_seconds: float):
+        """Report the outcome of a call reserved with allow()"""
+        slow = 0 < self.slow_call_seconds <= duration_seconds
+        with self._lock:
+            self.counters["successes" if success else "failures"] += 1
+            if slow:
+                self.counters["slow_calls"] += 1
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED if success and not slow else OPEN)
+                return
+            if self.state == OPEN:
+                return  # a call that started before the circuit opened
+            self._window.append((not success, slow))
+            if len(self._window) < self.min_calls:
+                return
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._transition(OPEN)
+
+    def release(self):
+        """Give back a call reserved with allow() whose outcome is unknown (client went away)"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def _rates(self):
+        calls = len(self._window) or 1
+        return (sum(failed for failed, _ in self._window) / calls,
+                sum(slow for _, slow in self._window) / calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                "state": self.state,
+                "retry_after": self.retry_after(),
+                "window_calls": len(self._window),
+                "failure_rate": round(failure_rate, 3),
+                "slow_call_rate": round(slow_rate, 3),
+                **self.counters,
+                "transitions": dict(self.transitions),
+            }
+
+
+agentcore_breaker = CircuitBreaker(
+    "AgentCore",
+    window_size=int(os.getenv("AGENTCORE_BREAKER_WINDOW", "20")),
+    min_calls=int(os.getenv("AGENTCORE_BREAKER_MIN_CALLS", "5")),
+    failure_rate_threshold=float(os.getenv("AGENTCORE_BREAKER_FAILURE_RATE", "0.5")),
+    # Off by default: healthy plan generation takes 2-3 minutes, and calls
+    # that hang until AGENTCORE_READ_TIMEOUT already count as failures
+    slow_call_seconds=float(os.getenv("AGENTCORE_BREAKER_SLOW_CALL_SECONDS", "0")),
+    slow_call_rate_threshold=float(os.getenv("AGENTCORE_BREAKER_SLOW_CALL_RATE", "0.5")),
+    open_seconds=float(os.getenv("AGENTCORE_BREAKER_OPEN_SECONDS", "30")),
+    half_open_max_calls=int(os.getenv("AGENTCORE_BREAKER_HALF_OPEN_CALLS", "1")),
+)
@@ -0,0 +1,189 @@
+# backend/app/services/password_pool.py
+# Password hashing (Argon2, deliberately slow and memory hungry) in a
+# dedicated process pool, so a burst of logins neither competes for the
+# GIL nor ties up the threadpool every other sync endpoint runs on.
+#
+# Admission is bounded: with every worker busy and max_pending requests
+# already queued, new requests are shed at once with PasswordPoolBusyError
+# (503 + Retry-After) rather than queueing past any useful response time.
+# A request that still waits longer than timeout_seconds is shed the same
+# way. PASSWORD_HASH_WORKERS=0 hashes in the app's threadpool instead.
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pwdlib import PasswordHash
+from starlette.concurrency import run_in_threadpool
+
+_password_hash = None
+
+
+### Worker side ###
+
+def _hasher() -> PasswordHash:
+    """The process's PasswordHash, built on first use (in each worker)"""
+    global _password_hash
+    if _password_hash is None:
+        _password_hash = PasswordHash.recommended()
+    return _password_hash
+
+
+def hash_password(password: str) -> str:
+    return _hasher().hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return _hasher().verify(password, hashed_password)
+
+
+def _warm_worker():
+    _hasher()
+
+
+def _timed(fn, *args):
+    """fn(*args) and how long it ran, measured in the worker"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+### Pool ###
+
+class PasswordPoolBusyError(Exception):
+    """Raised when a password hash can't be admitted or doesn't finish in time"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHashPool:
+    """
+    Bounded process pool for hash_password/verify_password. The executor
+    (and its worker processes) is created on first use or by start().
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, timeout_seconds: float = 5):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_seconds = 0.25  # running average of one hash (excluding queueing), for Retry-After
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        """Requests admitted at once: one running per worker plus the queue"""
+        return max(1, self.workers) + self.max_pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers don't inherit the server's threads and connections
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def start(self):
+        """Start the worker processes now rather than on the first login"""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_warm_worker)
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        return max(1, math.ceil(self._in_flight * self._avg_seconds / max(1, self.workers)))
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                raise PasswordPoolBusyError("Too many sign-ins right now. Please try again shortly.",
+                                            self.retry_after())
+            self._in_flight += 1
+        future = None
+        try:
+            # A hash we stop waiting for may still be running: it keeps its
+            # slot until it is done (or is cancelled while still queued)
+            if self.workers <= 0:
+                future = asyncio.ensure_future(run_in_threadpool(_timed, fn, *args))
+                future.add_done_callback(self._release)
+                result, seconds = await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+            else:
+                future = self._get_executor().submit(_timed, fn, *args)
+                future.add_done_callback(self._release)
+                try:
+                    # shield: on timeout cancel the pool future ourselves (drops it if still queued)
+                    result, seconds = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                                             self.timeout_seconds)
+                except asyncio.TimeoutError:
+                    future.cancel()
+                    raise
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordPoolBusyError("Sign-in is taking too long right now. Please try again shortly.",
+                                        self.retry_after())
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): start a fresh pool for the next request
+            with self._lock:
+                self.restarts += 1
+            self.shutdown()
+            raise PasswordPoolBusyError("Sign-in is temporarily unavailable. Please try again shortly.", 1)
+        finally:
+            if future is None:
+                self._release()
+        with self._lock:
+            self.completed += 1
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * seconds
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout_seconds,
+                "in_flight": self._in_flight,
+                "avg_seconds": round(self._avg_seconds, 4),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+            }
+
+
+_workers = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+password_pool = PasswordHashPool(
+    workers=_workers,
+    # Default: about 8 hashes' wait per worker, well inside the timeout
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(8 * max(1, _workers)))),
+    timeout_seconds=float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "5")),
+)
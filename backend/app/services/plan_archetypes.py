@@ -0,0 +1,353 @@
+# backend/app/services/plan_archetypes.py
+# Library of validated plans for common profiles (goal x activity level x
+# equipment x workout days). Built offline from stored plans; at request
+# time the nearest archetype is either served directly, with the meals
+# rescaled to the user's deterministic macro targets, or handed to the
+# agent as a starting point for a short "personalize this plan" call.
+# Only archetypes whose dietary preferences include all of the user's are
+# served; any other near match is personalized.
+#
+# Build the library from the plans in the database:
+#   python -m app.services.plan_archetypes --out plan_archetypes.json
+import argparse
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.agent.health_calculations import compute_health_metrics
+
+# How archetypes are used: 'off', 'serve' (no LLM call when close enough)
+# or 'personalize' (closest archetype + short adaptation prompt)
+ARCHETYPE_MODE = os.getenv("PLAN_ARCHETYPE_MODE", "off")
+SERVE = "serve"
+PERSONALIZE = "personalize"
+
+ACTIVITY_LEVELS = ["sedentary", "light", "moderate", "active", "very_active"]
+WEEK_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Distance weights: a different goal is never "near"
+GOAL_WEIGHT = 100.0
+ACTIVITY_WEIGHT = 1.0   # per activity level step
+DAYS_WEIGHT = 2.0       # per workout day
+EQUIPMENT_WEIGHT = 4.0  # times Jaccard distance of the equipment sets
+DURATION_WEIGHT = 0.5   # per 15 minutes
+
+
+def normalize_token(value: str) -> str:
+    return str(value).strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def profile_features(profile_dict: dict) -> dict:
+    """The profile fields archetypes are indexed by"""
+    activity = normalize_token(profile_dict.get("activity_level") or "moderate")
+    return {
+        "goal": normalize_token(profile_dict.get("fitness_goal") or ""),
+        "activity_level": activity,
+        "equipment": sorted({normalize_token(item) for item in profile_dict.get("available_equipment") or []}),
+        "workout_days": int(profile_dict.get("workout_days_per_week") or 3),
+        "duration_minutes": int(profile_dict.get("workout_duration_minutes") or 45),
+        "dietary": sorted({normalize_token(item) for item in profile_dict.get("dietary_preferences") or []}),
+    }
+
+
+def feature_key(features: dict) -> str:
+    """Bucket an archetype represents (duration is adjusted, not bucketed)"""
+    return "|".join([
+        features["goal"], features["activity_level"],
+        ",".join(features["equipment"]) or "bodyweight", str(features["workout_days"]),
+        ",".join(features.get("dietary") or []) or "any",
+    ])
+
+
+def _activity_index(level: str) -> int:
+    return ACTIVITY_LEVELS.index(level) if level in ACTIVITY_LEVELS else ACTIVITY_LEVELS.index("moderate")
+
+
+def _vector(features: dict) -> tuple:
+    """Features in the form the distance needs, computed once per archetype"""
+    return (
+        features["goal"], _activity_index(features["activity_level"]), features["workout_days"],
+        frozenset(features["equipment"]), features["duration_minutes"],
+    )
+
+
+def _vector_distance(a: tuple, b: tuple) -> float:
+    union = a[3] | b[3]
+    jaccard = 1 - len(a[3] & b[3]) / len(union) if union else 0.0
+    return (
+        GOAL_WEIGHT * (a[0] != b[0])
+        + ACTIVITY_WEIGHT * abs(a[1] - b[1])
+        + DAYS_WEIGHT * abs(a[2] - b[2])
+        + EQUIPMENT_WEIGHT * jaccard
+        + DURATION_WEIGHT * abs(a[4] - b[4]) / 15
+    )
+
+
+def feature_distance(a: dict, b: dict) -> float:
+    return _vector_distance(_vector(a), _vector(b))
+
+
+def covers_diet(archetype_dietary, user_dietary) -> bool:
+    """
+    Whether a plan built for archetype_dietary respects every one of the
+    user's preferences (e.g. a vegan, gluten-free plan covers a vegan user).
+    Archetypes from libraries built before preferences were recorded
+    (None) cover nobody.
+    """
+    return archetype_dietary is not None and set(user_dietary) <= archetype_dietary
+
+
+def is_complete(plan: PlanGenerationResponse) -> bool:
+    """Only plans with real workouts and meals are worth keeping"""
+    workout_days = [day for day in WEEK_DAYS if getattr(plan.workout_plan, day)]
+    return bool(workout_days) and plan.meal_plan.day_meal is not None
+
+
+class Archetype:
+    def __init__(self, key: str, features: dict, plan: PlanGenerationResponse, source_count: int = 1):
+        self.key = key
+        self.features = features
+        self.plan = plan
+        self.source_count = source_count
+        self.vector = _vector(features)
+        dietary = features.get("dietary")
+        self.dietary = frozenset(dietary) if dietary is not None else None
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "features": self.features,
+            "source_count": self.source_count,
+            "plan": self.plan.model_dump(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Archetype":
+        return cls(data["key"], data["features"], PlanGenerationResponse(**data["plan"]), data.get("source_count", 1))
+
+
+class ArchetypeLibrary:
+    """
+    In-memory archetype index. An exact bucket match is a dict lookup;
+    otherwise only the archetypes for the same goal are scanned.
+    """
+
+    def __init__(self, archetypes: List[Archetype] = None, serve_distance: float = 0.5,
+                 personalize_distance: float = 6.0):
+        self.serve_distance = serve_distance
+        self.personalize_distance = personalize_distance
+        self._by_goal = defaultdict(list)
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self.stats_counters = {"served": 0, "personalized": 0, "misses": 0}
+        for archetype in archetypes or []:
+            self._by_goal[archetype.features["goal"]].append(archetype)
+            self._by_key[archetype.key] = archetype
+
+    def __len__(self):
+        return sum(len(archetypes) for archetypes in self._by_goal.values())
+
+    def nearest(self, profile_dict: dict, diet_covered: bool = False):
+        """
+        Closest archetype for the profile -> (archetype, distance), or (None, inf).
+        With diet_covered, only archetypes that respect all of the user's
+        dietary preferences are considered.
+        """
+        features = profile_features(profile_dict)
+        vector = _vector(features)
+        exact = self._by_key.get(feature_key(features))
+        if exact is not None and exact.vector == vector and covers_diet(exact.dietary, features["dietary"]):
+            return exact, 0.0
+        best, best_distance = None, float("inf")
+        for archetype in self._by_goal.get(features["goal"], []):
+            if diet_covered and not covers_diet(archetype.dietary, features["dietary"]):
+                continue
+            distance = _vector_distance(vector, archetype.vector)
+            if distance < best_distance:
+                best, best_distance = archetype, distance
+        return best, best_distance
+
+    def match(self, profile_dict: dict, mode: str = None):
+        """
+        Decide how to use the library for this profile.
+        Returns (SERVE, plan), (PERSONALIZE, archetype plan) or (None, None).
+        """
+        mode = mode or ARCHETYPE_MODE
+        if mode not in (SERVE, PERSONALIZE) or not len(self):
+            return None, None
+        try:
+            metrics = compute_health_metrics(profile_dict)
+        except ValueError:
+            return None, None
+        if mode == SERVE:
+            # Served as is, so the archetype must already respect the user's diet
+            archetype, distance = self.nearest(profile_dict, diet_covered=True)
+            if archetype is not None and distance <= self.serve_distance:
+                self._count("served")
+                return SERVE, adjust_to_profile(archetype.plan, profile_dict, metrics)
+        archetype, distance = self.nearest(profile_dict)
+        if archetype is not None and distance <= self.personalize_distance:
+            self._count("personalized")
+            # Meals are pre-scaled so the model only has to adapt, not re-plan
+            return PERSONALIZE, adjust_to_profile(archetype.plan, profile_dict, metrics)
+        self._count("misses")
+        return None, None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats_counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": ARCHETYPE_MODE, "archetypes": len(self), **self.stats_counters}
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "ArchetypeLibrary":
+        """Load a library file; a missing file gives an empty library"""
+        if not path or not os.path.exists(path):
+            return cls([], **kwargs)
+        with open(path) as f:
+            data = json.load(f)
+        return cls([Archetype.from_dict(item) for item in data["archetypes"]], **kwargs)
+
+    def save(self, path: str):
+        archetypes = [a for goal in sorted(self._by_goal) for a in self._by_goal[goal]]
+        with open(path, "w") as f:
+            json.dump({"archetypes": [a.to_dict() for a in archetypes]}, f, indent=2)
+
+
+def _scale(value, factor: float, digits: int = 1):
+    if value is None:
+        return None
+    return round(value * factor) if digits == 0 else round(value * factor, digits)
+
+
+def adjust_to_profile(plan: PlanGenerationResponse, profile_dict: dict, metrics: dict) -> PlanGenerationResponse:
+    """
+    Deterministic adaptation of an archetype: exact health metrics, meals
+    rescaled to the user's calorie/macro targets and session length set
+    to the user's workout duration.
+    """
+    plan = plan.model_copy(deep=True)
+    source = plan.health_metrics or {}
+    source_targets = source.get("macro_targets") or {}
+    targets = metrics["macro_targets"]
+
+    def ratio(new, old):
+        return new / old if old else 1.0
+
+    calorie_factor = ratio(metrics["target_calories"], source.get("target_calories"))
+    macro_factors = {macro: ratio(targets[macro], source_targets.get(macro)) for macro in targets}
+
+    def scale_meal(meal):
+        if meal is None:
+            return
+        meal.calories = _scale(meal.calories, calorie_factor, digits=0)
+        meal.protein_g = _scale(meal.protein_g, macro_factors["protein_g"])
+        meal.carbs_g = _scale(meal.carbs_g, macro_factors["carbs_g"])
+        meal.fat_g = _scale(meal.fat_g, macro_factors["fat_g"])
+
+    day_meal = plan.meal_plan.day_meal
+    if day_meal is not None:
+        for meal in (day_meal.breakfast, day_meal.lunch, day_meal.dinner, *(day_meal.snacks or [])):
+            scale_meal(meal)
+    plan.meal_plan.daily_targets = dict(targets, calories=metrics["target_calories"])
+
+    duration = profile_dict.get("workout_duration_minutes")
+    if duration:
+        for day in WEEK_DAYS:
+            workout = getattr(plan.workout_plan, day)
+            if workout is not None:
+                workout.duration_minutes = duration
+
+    plan.health_metrics = metrics
+    return plan
+
+
+def build_library(rows, min_sources: int = 1) -> ArchetypeLibrary:
+    """
+    Group (profile_dict, PlanGenerationResponse) rows by feature bucket and
+    keep one representative per bucket: the complete plan whose profile is
+    closest to the bucket's typical profile.
+    """
+    buckets = defaultdict(list)
+    for profile_dict, plan in rows:
+        if not is_complete(plan):
+            continue
+        features = profile_features(profile_dict)
+        buckets[feature_key(features)].append((features, plan))
+
+    archetypes = []
+    for key, members in buckets.items():
+        if len(members) < min_sources:
+            continue
+        durations = Counter(features["duration_minutes"] for features, _ in members)
+        centre = dict(members[0][0], duration_minutes=durations.most_common(1)[0][0])
+        features, plan = min(members, key=lambda member: feature_distance(member[0], centre))
+        archetypes.append(Archetype(key, features, plan, source_count=len(members)))
+    return ArchetypeLibrary(archetypes)
+
+
+# Plan versions written by the model; saved and edited plans reflect one user's changes
+GENERATED_SOURCES = ("generate", "regenerate")
+
+
+def load_rows_from_db(db):
+    """
+    Stored plans joined with the profiles they were generated for. Only
+    plans whose latest version came straight from the model, and that are
+    complete, are used.
+    """
+    from app.models.models import FitnessPlan, PlanVersion, UserProfile
+    from app.services.plan_generation import build_profile_dict
+
+    query = (
+        db.query(UserProfile, FitnessPlan)
+        .join(FitnessPlan, FitnessPlan.user_id == UserProfile.user_id)
+        .join(PlanVersion, (PlanVersion.user_id == FitnessPlan.user_id) & (PlanVersion.version == FitnessPlan.version))
+        .filter(PlanVersion.source.in_(GENERATED_SOURCES))
+    )
+    for profile, stored in query.yield_per(500):
+        try:
+            plan = PlanGenerationResponse(
+                health_metrics=stored.health_metrics or {},
+                workout_plan=stored.workout_plan or {},
+                meal_plan=stored.meal_plan or {},
+                tips=stored.tips or [],
+            )
+        except ValueError:
+            continue
+        if not is_complete(plan):
+            continue
+        yield build_profile_dict(profile), plan
+
+
+plan_archetypes = ArchetypeLibrary.load(
+    os.getenv("PLAN_ARCHETYPES_PATH", "plan_archetypes.json"),
+    serve_distance=float(os.getenv("PLAN_ARCHETYPE_SERVE_DISTANCE", "0.5")),
+    personalize_distance=float(os.getenv("PLAN_ARCHETYPE_PERSONALIZE_DISTANCE", "6")),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the plan archetype library from stored plans")
+    parser.add_argument("--out", default=os.getenv("PLAN_ARCHETYPES_PATH", "plan_archetypes.json"))
+    parser.add_argument("--min-sources", type=int, default=1, help="skip buckets with fewer plans than this")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        library = build_library(load_rows_from_db(db), min_sources=args.min_sources)
+    finally:
+        db.close()
+    library.save(args.out)
+    print(f"📚 Wrote {len(library)} archetypes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# backend/app/services/plan_cache.py
+# Content-addressed cache of generated plans. Profiles are normalized and
+# bucketed (weight/age/height) before hashing, so users with near-identical
+# profiles share one AgentCore run.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.services.plan_archetypes import is_complete
+
+
+def _quantize(value, step: float):
+    """Round value down to its bucket; a step of 0 keeps the exact value"""
+    if value is None:
+        return None
+    if not step:
+        return float(value)
+    return float(int(float(value) // step) * step)
+
+
+def _normalize_text(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def _normalize_list(values):
+    return sorted({_normalize_text(v) for v in (values or []) if v})
+
+
+class PlanCache:
+    """
+    Thread-safe LRU cache with TTL expiry, keyed by normalized profile hash
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 86400,
+                 weight_step: float = 5, age_step: float = 5, height_step: float = 1):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.weight_step = weight_step
+        self.age_step = age_step
+        self.height_step = height_step
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, plan)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def normalize(self, profile_dict: dict) -> dict:
+        """Canonical, bucketed view of the profile fields that shape a plan"""
+        total_inches = None
+        if profile_dict.get("height_feet") is not None:
+            total_inches = profile_dict["height_feet"] * 12 + (profile_dict.get("height_inches") or 0)
+        return {
+            "age": _quantize(profile_dict.get("age"), self.age_step),
+            "weight_lbs": _quantize(profile_dict.get("weight_lbs"), self.weight_step),
+            "height_inches": _quantize(total_inches, self.height_step),
+            "gender": _normalize_text(profile_dict.get("gender")),
+            "fitness_goal": _normalize_text(profile_dict.get("fitness_goal")),
+            "activity_level": _normalize_text(profile_dict.get("activity_level")),
+            "workout_days_per_week": profile_dict.get("workout_days_per_week"),
+            "workout_duration_minutes": profile_dict.get("workout_duration_minutes"),
+            "available_equipment": _normalize_list(profile_dict.get("available_equipment")),
+            "dietary_preferences": _normalize_list(profile_dict.get("dietary_preferences")),
+        }
+
+    def key_for(self, profile_dict: dict) -> str:
+        """sha256 of the normalized profile serialized with sorted keys"""
+        canonical = json.dumps(self.normalize(profile_dict), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[PlanGenerationResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, plan = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may mutate the plan before saving it
+        return plan.model_copy(deep=True)
+
+    def put(self, key: str, plan: PlanGenerationResponse):
+        if not self.enabled:
+            return
+        if not is_complete(plan):
+            # An empty plan (e.g. from an agent error) must never be served to other users
+            with self._lock:
+                self.rejected += 1
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), plan.model_copy(deep=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+            }
+
+
+plan_cache = PlanCache(
+    max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=int(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400")),
+    weight_step=float(os.getenv("PLAN_CACHE_WEIGHT_STEP", "5")),
+    age_step=float(os.getenv("PLAN_CACHE_AGE_STEP", "5")),
+    height_step=float(os.getenv("PLAN_CACHE_HEIGHT_STEP", "1")),
+)
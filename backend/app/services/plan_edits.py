@@ -0,0 +1,192 @@
+# backend/app/services/plan_edits.py
+# Partial plan regeneration: rewrite one day's workout or one meal instead
+# of the whole plan. The model only sees that slice plus the fixed targets
+# (session length and equipment, or the calories/macros the rest of the
+# day leaves over), the result is validated against DayWorkout / Meal and
+# patched into the stored plan as a new version (a small JSON patch, see
+# app/services/plan_versions.py). Every edit is recorded as a PlanChange.
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.agent.prompts import get_day_workout_prompt, get_meal_prompt
+from app.models.models import FitnessPlan, PlanChange
+from app.schemas.agent_schemas import DayWorkout, Meal, PlanChangeResponse, PlanGenerationResponse
+from app.services.plan_archetypes import WEEK_DAYS
+from app.services.plan_generation import get_local_agent, load_profile_dict
+from app.services.plan_versions import store_plan
+from app.agent.health_calculations import compute_health_metrics
+
+MEAL_SLOTS = ("breakfast", "lunch", "dinner")
+MACROS = ("protein_g", "carbs_g", "fat_g")
+
+
+class PlanNotFoundError(LookupError):
+    """Raised when a user edits a plan they don't have"""
+
+
+class InvalidTargetError(ValueError):
+    """Raised for a day or meal slot that doesn't exist"""
+
+
+def load_plan(db: Session, user_id: str) -> FitnessPlan:
+    plan = db.query(FitnessPlan).filter(FitnessPlan.user_id == user_id).first()
+    if not plan:
+        raise PlanNotFoundError("No plan exists for this user")
+    return plan
+
+
+def plan_response(plan: FitnessPlan) -> PlanGenerationResponse:
+    return PlanGenerationResponse(
+        health_metrics=plan.health_metrics or {},
+        workout_plan=plan.workout_plan or {},
+        meal_plan=plan.meal_plan or {},
+        tips=plan.tips or [],
+    )
+
+
+def fixed_targets(plan: FitnessPlan, profile_dict: dict) -> dict:
+    """The plan's own targets; recomputed only for plans stored without them"""
+    metrics = plan.health_metrics or {}
+    if metrics.get("target_calories") and metrics.get("macro_targets"):
+        return metrics
+    return compute_health_metrics(profile_dict)
+
+
+### Meal slots ###
+
+def parse_meal_slot(slot: str):
+    """'breakfast' | 'lunch' | 'dinner' | 'snack_<n>' (1-based) -> (name, snack index or None)"""
+    if slot in MEAL_SLOTS:
+        return slot, None
+    if slot.startswith("snack_") and slot[len("snack_"):].isdigit() and int(slot[len("snack_"):]) >= 1:
+        return "snacks", int(slot[len("snack_"):]) - 1
+    raise InvalidTargetError(f"Unknown meal '{slot}'. Use breakfast, lunch, dinner or snack_<n>.")
+
+
+def get_meal(day_meal: dict, name: str, index: int = None):
+    if index is None:
+        return day_meal.get(name)
+    snacks = day_meal.get("snacks") or []
+    return snacks[index] if index < len(snacks) else None
+
+
+def set_meal(day_meal: dict, name: str, index: int, meal: dict):
+    if index is None:
+        day_meal[name] = meal
+    else:
+        day_meal["snacks"][index] = meal
+
+
+def meal_budget(day_meal: dict, name: str, index: int, metrics: dict) -> dict:
+    """Calories and macros left for this meal once every other meal is counted"""
+    others = [day_meal.get(slot) for slot in MEAL_SLOTS if slot != name]
+    others += [snack for i, snack in enumerate(day_meal.get("snacks") or []) if name != "snacks" or i != index]
+    targets = dict(metrics["macro_targets"], calories=metrics["target_calories"])
+    return {
+        key: max(0, round(targets[key] - sum((meal or {}).get(key) or 0 for meal in others)))
+        for key in ("calories", *MACROS)
+    }
+
+
+### Edits ###
+
+def regenerate_workout_day(db: Session, user_id: str, day: str, instruction: str = "") -> PlanChangeResponse:
+    """Rewrite one day's workout and patch it into the stored plan"""
+    day = day.strip().lower()
+    if day not in WEEK_DAYS:
+        raise InvalidTargetError(f"Unknown day '{day}'")
+    start = time.perf_counter()
+
+    # 1. Only this day, the shape of the week and the session constraints
+    plan = load_plan(db, user_id)
+    profile_dict = load_profile_dict(db, user_id)
+    workout_plan = plan.workout_plan or {}
+    week = {name: (workout_plan.get(name) or {}).get("workout_type") or "rest" for name in WEEK_DAYS}
+    before = workout_plan.get(day)
+
+    # 2. One structured call for a DayWorkout
+    workout, usage = get_local_agent().regenerate_section(
+        DayWorkout, lambda prefix: get_day_workout_prompt(profile_dict, day, before, week, instruction, prefix=prefix))
+    if not workout.exercises:
+        raise RuntimeError("Agent returned a workout without exercises")
+    after = workout.model_dump()
+
+    # 3. Patch the stored plan and record the change
+    def patch(document: dict) -> dict:
+        document["workout_plan"][day] = after
+        return document
+
+    return _apply_change(db, user_id, plan.id, "workout", day, before, after, instruction, patch, start, usage)
+
+
+def regenerate_meal(db: Session, user_id: str, slot: str, instruction: str = "") -> PlanChangeResponse:
+    """Replace one meal, sized to the day's remaining calories and macros"""
+    slot = slot.strip().lower()
+    name, index = parse_meal_slot(slot)
+    start = time.perf_counter()
+
+    # 1. Only this meal and its share of the fixed daily targets
+    plan = load_plan(db, user_id)
+    profile_dict = load_profile_dict(db, user_id)
+    day_meal = (plan.meal_plan or {}).get("day_meal") or {}
+    before = get_meal(day_meal, name, index)
+    if index is not None and before is None:
+        raise InvalidTargetError(f"The plan has no {slot}")
+    budget = meal_budget(day_meal, name, index, fixed_targets(plan, profile_dict))
+
+    # 2. One structured call for a Meal
+    meal, usage = get_local_agent().regenerate_section(
+        Meal, lambda prefix: get_meal_prompt(profile_dict, slot, before, budget, instruction, prefix=prefix))
+    after = meal.model_dump()
+
+    # 3. Patch the stored plan and record the change
+    def patch(document: dict) -> dict:
+        stored_day_meal = document["meal_plan"].get("day_meal") or {}
+        if index is not None and get_meal(stored_day_meal, name, index) is None:
+            raise PlanNotFoundError(f"The plan no longer has a {slot}")
+        set_meal(stored_day_meal, name, index, after)
+        document["meal_plan"]["day_meal"] = stored_day_meal
+        return document
+
+    return _apply_change(db, user_id, plan.id, "meal", slot, before, after, instruction, patch, start, usage)
+
+
+def _apply_change(db: Session, user_id: str, plan_id: str, change_type: str, target: str, before, after: dict,
+                  instruction: str, patch, start: float, usage: dict) -> PlanChangeResponse:
+    """Patch the plan as it is now (locked, after the model call) as a new version and log a PlanChange"""
+    def update(document: dict) -> dict:
+        if document is None:
+            raise PlanNotFoundError("The plan was deleted while editing. Please try again.")
+        return patch(document)
+
+    description = f"Regenerated {target} {change_type}" if change_type == "workout" else f"Replaced {target}"
+    try:
+        stored = store_plan(db, user_id, source=f"edit:{target}", update=update, commit=False)
+        change = PlanChange(
+            id=str(uuid.uuid4()),
+            plan_id=plan_id,
+            user_id=user_id,
+            change_type=change_type,
+            target=target,
+            description=description,
+            before_data=before,
+            after_data=after,
+            reason=instruction or None,
+            version=stored.version,
+            timestamp=datetime.utcnow(),
+        )
+        db.add(change)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    latency_ms = round((time.perf_counter() - start) * 1000)
+    print(f"✏️ {description} for user {user_id} (version {stored.version}) in {latency_ms}ms")
+    return PlanChangeResponse(
+        change_id=change.id, change_type=change_type, target=target, before=before, after=after,
+        plan=plan_response(stored), latency_ms=latency_ms, usage=usage,
+    )
@@ -0,0 +1,443 @@
+# backend/app/services/plan_generation.py
+# Plan generation through the AgentCore Runtime, shared by the sync
+# endpoint and the background job workers. AgentCore calls go through a
+# circuit breaker (app/services/circuit_breaker.py); while it is open the
+# request fails fast or falls back to the in-process FitnessAgent.
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.models import UserProfile, FitnessPlan
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.services.agentcore_decoder import decode_plan_response, iter_runtime_events
+from app.services.aws_clients import get_agentcore_client
+from app.services.circuit_breaker import agentcore_breaker, CircuitOpenError
+from app.services.plan_archetypes import plan_archetypes, adjust_to_profile, is_complete, SERVE, PERSONALIZE
+from app.services.plan_cache import plan_cache
+from app.services.plan_versions import plan_document, store_plan
+from app.services.single_flight import single_flight, profile_fingerprint
+from app.agent.health_calculations import compute_health_metrics
+
+
+# 'tools' lets the model call the calculators; 'precomputed' computes the
+# health metrics before the LLM runs (fewer Bedrock round trips);
+# 'single_pass' also asks for the schema in one call (two-step on failure);
+# 'fan_out' builds workout, meal and tips with concurrent sub-agents
+PLAN_GENERATION_MODE = os.getenv("PLAN_GENERATION_MODE", "tools")
+
+# What to do while the AgentCore circuit is open: 'fail_fast' (503 with
+# Retry-After), 'local' (in-process FitnessAgent calling Bedrock directly)
+# or 'hedge' (local when open, and also race the local agent against
+# AgentCore calls that take longer than AGENTCORE_HEDGE_AFTER_SECONDS)
+AGENTCORE_FALLBACK = os.getenv("AGENTCORE_FALLBACK", "fail_fast")
+FAIL_FAST = "fail_fast"
+LOCAL = "local"
+HEDGE = "hedge"
+HEDGE_AFTER_SECONDS = float(os.getenv("AGENTCORE_HEDGE_AFTER_SECONDS", "90"))
+
+# failed_fast, local, local_failed, hedged, hedge_won
+fallback_counters = Counter()
+_fallback_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AGENTCORE_HEDGE_WORKERS", "16")),
+                                 thread_name_prefix="plan-hedge")
+_local_agent = None
+
+
+class ProfileNotFoundError(LookupError):
+    """Raised when a user asks for a plan before completing their profile"""
+
+
+class IncompletePlanError(RuntimeError):
+    """Raised instead of caching or saving a plan without workouts or meals"""
+
+
+def require_complete(plan_response: PlanGenerationResponse) -> PlanGenerationResponse:
+    """plan_response, if it has real workouts and meals"""
+    if not is_complete(plan_response):
+        raise IncompletePlanError("The agent returned an incomplete plan. Please try again.")
+    return plan_response
+
+
+def build_profile_dict(user_profile: UserProfile) -> dict:
+    """Convert SQLAlchemy UserProfile to the dict the agent expects"""
+    return {
+        "age": user_profile.age,
+        "weight_lbs": user_profile.weight,
+        "height_feet": user_profile.height_feet,
+        "height_inches": user_profile.height_inches,
+        "gender": user_profile.gender,
+        "fitness_goal": user_profile.fitness_goal,
+        "activity_level": getattr(user_profile, 'activity_level', 'moderate'),
+        "workout_days_per_week": getattr(user_profile, 'workout_days_per_week', 3),
+        "workout_duration_minutes": getattr(user_profile, 'workout_duration_minutes', 45),
+        "available_equipment": getattr(user_profile, 'available_equipment', []),
+        "dietary_preferences": getattr(user_profile, 'dietary_preferences', [])
+    }
+
+
+def load_profile_dict(db: Session, user_id: str) -> dict:
+    """Fetch the user's profile and convert it for the agent"""
+    user_profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).first()
+    if not user_profile:
+        raise ProfileNotFoundError("Profile not found. Please complete your profile first.")
+    return build_profile_dict(user_profile)
+
+
+def cached_plan_for(cache_key: str, profile_dict: dict):
+    """
+    The cached plan for this profile's bucket, with health metrics and meal
+    targets recomputed for this profile (the plan was generated for another
+    user whose weight, age and height only fall in the same buckets)
+    """
+    plan_response = plan_cache.get(cache_key)
+    if plan_response is None:
+        return None
+    try:
+        metrics = compute_health_metrics(profile_dict)
+    except ValueError:
+        return None
+    return adjust_to_profile(plan_response, profile_dict, metrics)
+
+
+def _invoke_agent_runtime(profile_dict: dict, user_id: str, stream: bool = False,
+                          archetype: PlanGenerationResponse = None, verbose: bool = True) -> dict:
+    """Send the user profile to the AgentCore Runtime and return the raw boto response"""
+    # Shared, pooled client (see app/services/aws_clients.py)
+    agent_core_client = get_agentcore_client()
+
+    # Prepare the payload with user profile
+    body = {"user_profile": profile_dict, "mode": PLAN_GENERATION_MODE}
+    if archetype is not None:
+        # Adapt the closest library plan instead of planning from scratch
+        body["mode"] = PERSONALIZE
+        body["archetype"] = archetype.model_dump()
+    if stream:
+        # Ask the runtime to emit progress/section events as it goes
+        body["stream"] = True
+    payload = json.dumps(body).encode()
+
+    agent_arn = os.getenv('AGENTCORE_AGENT_ARN')
+    session_id = f"fitness-session-{user_id}"
+
+    if verbose:
+        print(f"🚀 Calling AgentCore Runtime: {agent_arn}")
+        print(f"📦 Payload: {json.dumps(profile_dict, indent=2)}")
+        print("⏳ This may take 2-3 minutes for comprehensive fitness plan generation...")
+
+    # Invoke the agent
+    return agent_core_client.invoke_agent_runtime(
+        agentRuntimeArn=agent_arn,
+        runtimeSessionId=session_id,
+        payload=payload
+    )
+
+
+def plan_from_document(document) -> PlanGenerationResponse:
+    """
+    The validated, complete plan in a runtime response document. Raises on
+    an error document and on an empty plan (the runtime returns one with
+    status 'success' when the agent swallows an exception).
+    """
+    if isinstance(document, dict) and document.get("status") == "error":
+        raise RuntimeError((document.get("response") or {}).get("error", "Agent error"))
+    if isinstance(document, dict) and 'response' in document:
+        document = document['response']
+    return require_complete(PlanGenerationResponse(**document))
+
+
+def invoke_agentcore_document(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None,
+                              verbose: bool = True) -> dict:
+    """
+    Call the AgentCore Runtime and return its whole decoded response
+    document (plan under 'response', plus 'usage' and 'timings').
+    Raises if the document is an error or holds an incomplete plan, and
+    CircuitOpenError without calling AgentCore while the circuit is open.
+    """
+    agentcore_breaker.allow()
+    start = time.perf_counter()
+    try:
+        response = _invoke_agent_runtime(profile_dict, user_id, archetype=archetype, verbose=verbose)
+
+        # Read in large buffers and validate the plan section by section
+        plan = decode_plan_response(response)
+        if verbose:
+            print("🎉 AgentCore Response:", plan)
+        # Error documents and empty plans count against AgentCore's health
+        plan_from_document(plan)
+    except Exception:
+        agentcore_breaker.record(False, time.perf_counter() - start)
+        raise
+    agentcore_breaker.record(True, time.perf_counter() - start)
+    if not verbose:
+        return plan
+
+    if isinstance(plan, dict) and plan.get("timings"):
+        print(f"⏱️ Runtime timings: {plan['timings']}")
+    if isinstance(plan, dict) and plan.get("usage"):
+        print(f"📊 Runtime usage: {plan['usage']}")
+    return plan
+
+
+def invoke_agentcore(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None) -> PlanGenerationResponse:
+    """
+    Call the AgentCore Runtime with the user profile and return the complete plan
+    """
+    return plan_from_document(invoke_agentcore_document(profile_dict, user_id, archetype=archetype))
+
+
+def _count_fallback(name: str):
+    with _fallback_lock:
+        fallback_counters[name] += 1
+
+
+def fallback_stats() -> dict:
+    with _fallback_lock:
+        return {"mode": AGENTCORE_FALLBACK, "hedge_after_seconds": HEDGE_AFTER_SECONDS, **fallback_counters}
+
+
+def get_local_agent():
+    """
+    Shared in-process FitnessAgent (Bedrock directly). Only for calls that
+    start a fresh conversation (chat, partial edits); full plans get their
+    own agent on the same model.
+    """
+    global _local_agent
+    if _local_agent is None:
+        # Strands is only loaded once something runs locally
+        from app.agent.fitness_agent import FitnessAgent
+        _local_agent = FitnessAgent()
+    return _local_agent
+
+
+def generate_locally(profile_dict: dict, archetype: PlanGenerationResponse = None) -> PlanGenerationResponse:
+    """Generate the plan with the in-process FitnessAgent instead of AgentCore"""
+    from app.agent.fitness_agent import FitnessAgent
+
+    # A fresh agent per call (no shared conversation); the model is shared
+    agent = FitnessAgent(model=get_local_agent().model)
+    mode = PERSONALIZE if archetype is not None else PLAN_GENERATION_MODE
+    plan_response = PlanGenerationResponse(**agent.generate_fitness_plan(
+        profile_dict, mode=mode, archetype=archetype.model_dump() if archetype is not None else None))
+    if not is_complete(plan_response):
+        # generate_fitness_plan returns an empty plan instead of raising
+        _count_fallback("local_failed")
+        raise RuntimeError("Local agent could not generate a plan")
+    return plan_response
+
+
+def _generate_hedged(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None) -> PlanGenerationResponse:
+    """
+    Call AgentCore; if it hasn't answered after HEDGE_AFTER_SECONDS, start
+    the local agent as well and return whichever plan arrives first. The
+    slower call keeps running in the background and its result is dropped.
+    """
+    primary = _hedge_pool.submit(invoke_agentcore, profile_dict, user_id, archetype)
+    try:
+        return primary.result(timeout=HEDGE_AFTER_SECONDS)
+    except FutureTimeoutError:
+        pass
+
+    print(f"🏁 AgentCore slower than {HEDGE_AFTER_SECONDS}s for user {user_id}, hedging with the local agent")
+    _count_fallback("hedged")
+    hedge = _hedge_pool.submit(generate_locally, profile_dict, archetype)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is hedge:
+                _count_fallback("hedge_won")
+            return result
+    raise error
+
+
+def generate_plan_response(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None) -> PlanGenerationResponse:
+    """Plan from AgentCore, with the configured fallback when its circuit is open"""
+    if AGENTCORE_FALLBACK == HEDGE and agentcore_breaker.is_closed():
+        try:
+            return _generate_hedged(profile_dict, user_id, archetype)
+        except CircuitOpenError:
+            pass  # opened by a concurrent call in the meantime
+    try:
+        return invoke_agentcore(profile_dict, user_id, archetype=archetype)
+    except CircuitOpenError:
+        if AGENTCORE_FALLBACK not in (LOCAL, HEDGE):
+            _count_fallback("failed_fast")
+            raise
+    print(f"🔌 AgentCore circuit open, generating locally for user {user_id}")
+    _count_fallback("local")
+    return generate_locally(profile_dict, archetype)
+
+
+def save_plan_for_user(db: Session, user_id: str, plan_response: PlanGenerationResponse,
+                       source: str = "generate") -> FitnessPlan:
+    """Make plan_response the user's current plan (a new version) and commit"""
+    return store_plan(db, user_id, plan_document(plan_response), source=source)
+
+
+def generate_plan_for_user(db: Session, user_id: str) -> PlanGenerationResponse:
+    """
+    Load profile, run the agent, validate and persist the plan.
+    Concurrent calls for the same user and profile share one generation.
+    """
+    profile_dict = load_profile_dict(db, user_id)
+
+    def generate_and_save(flight):
+        # Near-identical profiles reuse an earlier plan instead of a new LLM run
+        cache_key = plan_cache.key_for(profile_dict)
+        plan_response = cached_plan_for(cache_key, profile_dict)
+        if plan_response is not None:
+            print(f"⚡ Plan cache hit for user {user_id}")
+        else:
+            use, archetype = plan_archetypes.match(profile_dict)
+            if use == SERVE:
+                print(f"📚 Serving archetype plan for user {user_id}")
+                plan_response = archetype
+            else:
+                plan_response = generate_plan_response(profile_dict, user_id, archetype=archetype)
+            # Never save or share an empty plan
+            require_complete(plan_response)
+            plan_cache.put(cache_key, plan_response)
+
+        with single_flight.persist_guard(flight):
+            save_plan_for_user(db, user_id, plan_response)
+        return plan_response
+
+    return single_flight.do(user_id, profile_fingerprint(profile_dict), generate_and_save)
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_plan_events(profile_dict: dict, user_id: str):
+    """
+    Generate a plan while forwarding AgentCore progress to the client as SSE.
+
+    Emits 'progress', 'delta' and 'section' events as the runtime produces
+    them, then a validated 'plan' event once the plan has been saved.
+    Errors are reported as an 'error' event since headers are already sent.
+    """
+    yield format_sse("progress", {"stage": "started", "message": "Generating your plan..."})
+    flight, leader = single_flight.acquire(user_id, profile_fingerprint(profile_dict))
+    try:
+        if not leader:
+            # Same plan is already being generated (double-click, refresh)
+            yield format_sse("progress", {"stage": "joined", "message": "Your plan is already being generated..."})
+            plan_response = flight.future.result()
+        else:
+            flight.wait_turn()
+            cache_key = plan_cache.key_for(profile_dict)
+            plan_response = cached_plan_for(cache_key, profile_dict)
+            if plan_response is None:
+                use, archetype = plan_archetypes.match(profile_dict)
+                if use == SERVE:
+                    plan_response = archetype
+                else:
+                    plan_response = yield from _stream_with_fallback(profile_dict, user_id, archetype)
+                require_complete(plan_response)
+                plan_cache.put(cache_key, plan_response)
+
+            yield format_sse("progress", {"stage": "saving"})
+
+            # The request's session may already be closed while streaming
+            db = SessionLocal()
+            try:
+                with single_flight.persist_guard(flight):
+                    save_plan_for_user(db, user_id, plan_response)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            single_flight.finish(flight, result=plan_response)
+
+        yield format_sse("plan", plan_response.dict())
+    except BaseException as e:
+        if not isinstance(e, Exception):
+            # Client disconnected (GeneratorExit); don't leak that to joiners
+            if leader:
+                single_flight.finish(flight, error=RuntimeError("Plan generation was interrupted"))
+            raise
+        if leader:
+            single_flight.finish(flight, error=e)
+        traceback.print_exc()
+        error = {"detail": f"Error generating plan: {str(e)}"}
+        if isinstance(e, CircuitOpenError):
+            error["retry_after"] = e.retry_after
+        yield format_sse("error", error)
+
+
+def _stream_with_fallback(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None):
+    """
+    Stream from AgentCore; while its circuit is open, fail fast or generate
+    locally (no section events, just a 'fallback' progress event).
+    """
+    try:
+        return (yield from _stream_from_runtime(profile_dict, user_id, archetype))
+    except CircuitOpenError:
+        if AGENTCORE_FALLBACK not in (LOCAL, HEDGE):
+            _count_fallback("failed_fast")
+            raise
+    _count_fallback("local")
+    yield format_sse("progress", {"stage": "fallback", "message": "Generating your plan with the backup planner..."})
+    return generate_locally(profile_dict, archetype)
+
+
+def _stream_from_runtime(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse = None):
+    """
+    Forward runtime events as SSE frames and return the validated plan.
+    Streams take minutes by design, so the breaker judges latency by the
+    time to the first event rather than the whole stream.
+    """
+    agentcore_breaker.allow()
+    start = time.perf_counter()
+    try:
+        first_event_seconds, plan_response = yield from _forward_runtime_events(profile_dict, user_id, archetype, start)
+    except GeneratorExit:
+        # Client disconnected: says nothing about AgentCore's health
+        agentcore_breaker.release()
+        raise
+    except Exception:
+        agentcore_breaker.record(False, time.perf_counter() - start)
+        raise
+    agentcore_breaker.record(True, first_event_seconds)
+    return plan_response
+
+
+def _forward_runtime_events(profile_dict: dict, user_id: str, archetype: PlanGenerationResponse, start: float):
+    """Yield SSE frames for the runtime's events; returns (seconds to first event, plan)"""
+    response = _invoke_agent_runtime(profile_dict, user_id, stream=True, archetype=archetype)
+    fitness_plan_data = None
+    first_event_seconds = None
+    for event in iter_runtime_events(response):
+        if first_event_seconds is None:
+            first_event_seconds = time.perf_counter() - start
+        if not isinstance(event, dict):
+            continue
+        event_type = event.get("event")
+        if event_type in ("progress", "delta", "section"):
+            yield format_sse(event_type, {k: v for k, v in event.items() if k != "event"})
+        elif event_type == "error" or event.get("status") == "error":
+            raise RuntimeError(event.get("response", {}).get("error") or event.get("message", "Agent error"))
+        elif "response" in event:
+            # Final plan ('plan' event, or the whole non-streaming body)
+            fitness_plan_data = event["response"]
+
+    if fitness_plan_data is None:
+        raise RuntimeError("AgentCore stream ended without a plan")
+    # An empty plan is a failure for the breaker too
+    return first_event_seconds, require_complete(PlanGenerationResponse(**fitness_plan_data))
@@ -0,0 +1,132 @@
+# backend/app/services/plan_jobs.py
+# Background plan generation: requests submit a job and return right away,
+# a bounded worker pool runs the AgentCore call and persists the plan.
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.database import SessionLocal
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.services.plan_generation import generate_plan_for_user
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already waiting for a worker"""
+
+
+@dataclass
+class PlanJob:
+    user_id: str
+    fingerprint: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = QUEUED
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[PlanGenerationResponse] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class PlanJobManager:
+    """
+    In-process job registry backed by a fixed-size thread pool.
+    Job state lives in memory, so status is only visible on the worker
+    process that accepted the job.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, retention_seconds: int = 3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-job")
+        self._jobs: Dict[str, PlanJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: str, fingerprint: str = None) -> PlanJob:
+        """
+        Queue a plan generation for user_id and return the job record.
+        An unfinished job for the same user and profile fingerprint is
+        returned instead of queueing a duplicate.
+        """
+        with self._lock:
+            self._prune()
+            if fingerprint is not None:
+                for job in self._jobs.values():
+                    if job.user_id == user_id and job.fingerprint == fingerprint and not job.is_finished:
+                        return job
+            pending = sum(1 for job in self._jobs.values() if not job.is_finished)
+            if pending >= self.max_pending:
+                raise JobQueueFullError("Too many plans are being generated. Please try again shortly.")
+            job = PlanJob(user_id=user_id, fingerprint=fingerprint)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[PlanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; queued jobs that have not started are dropped"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: PlanJob):
+        with self._lock:
+            job.started_at = datetime.utcnow()
+            job.status = RUNNING
+        start = time.perf_counter()
+        # Workers run outside the request, so they need their own session
+        db = SessionLocal()
+        try:
+            self._finish(job, DONE, result=generate_plan_for_user(db, job.user_id))
+        except Exception as e:
+            db.rollback()
+            traceback.print_exc()
+            self._finish(job, FAILED, error=str(e))
+        finally:
+            db.close()
+            print(f"🧵 Plan job {job.id} {job.status} in {time.perf_counter() - start:.1f}s")
+
+    def _finish(self, job: PlanJob, status: str, result: PlanGenerationResponse = None, error: str = None):
+        """
+        Record the outcome in one step under the lock; status goes last, so
+        a finished job always has finished_at (which _prune relies on)
+        """
+        with self._lock:
+            job.finished_at = datetime.utcnow()
+            job.result = result
+            job.error = error
+            job.status = status
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window (lock held)"""
+        now = datetime.utcnow()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and (now - job.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+plan_jobs = PlanJobManager(
+    max_workers=int(os.getenv("PLAN_JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("PLAN_JOB_MAX_PENDING", "100")),
+    retention_seconds=int(os.getenv("PLAN_JOB_RETENTION_SECONDS", "3600")),
+)
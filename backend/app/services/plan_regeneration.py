@@ -0,0 +1,406 @@
+# backend/app/services/plan_regeneration.py
+# Regenerate every user's plan after a prompt or schema change.
+#
+# Profiles are streamed from user_profiles in user_id order with a
+# server-side cursor, generated through a bounded async pool under a
+# tokens-per-minute budget, and written to fitness_plans in batches.
+# A checkpoint file records the last user_id below which everything is
+# written (plus the users that failed), so a stopped run resumes where it
+# left off; plans still in flight when it stopped are simply regenerated.
+#
+#   python -m app.services.plan_regeneration --concurrency 8 --tokens-per-minute 400000
+#   python -m app.services.plan_regeneration --retry-failed
+#   python -m app.services.plan_regeneration --restart
+#
+# The plan cache and archetype library are bypassed on purpose: the point
+# is to get fresh output from the current prompts.
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models.models import UserProfile
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.plan_generation import build_profile_dict, invoke_agentcore_document, plan_from_document
+from app.services.plan_versions import plan_document, store_plan
+from app.services.single_flight import FlightSupersededError, profile_fingerprint, single_flight
+
+REGEN_CONCURRENCY = int(os.getenv("REGEN_CONCURRENCY", "8"))
+REGEN_TOKENS_PER_MINUTE = int(os.getenv("REGEN_TOKENS_PER_MINUTE", "0"))  # 0 = no budget
+REGEN_TOKENS_PER_PLAN = int(os.getenv("REGEN_TOKENS_PER_PLAN", "8000"))   # estimate until real usage is seen
+REGEN_BATCH_SIZE = int(os.getenv("REGEN_BATCH_SIZE", "50"))
+REGEN_CHECKPOINT_PATH = os.getenv("REGEN_CHECKPOINT_PATH", "plan_regeneration.checkpoint.json")
+
+READ_BATCH = 500          # profiles fetched per round trip of the cursor
+FLUSH_SECONDS = 5         # write a partial batch after this long without new results
+RETRY_BASE_SECONDS = 2.0  # backoff after a throttled call, doubled per attempt
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+
+
+class TokenBucket:
+    """
+    Tokens-per-minute budget shared by all workers. acquire() waits until
+    a call's estimated tokens fit; settle() corrects the balance once the
+    call's real usage is known. A rate of 0 disables the budget.
+    """
+
+    def __init__(self, tokens_per_minute: int, burst_seconds: float = 10):
+        # Bursts are capped at a few seconds' worth so calls are paced
+        # across the minute instead of all landing at its start
+        self.rate = tokens_per_minute / 60
+        self.capacity = self.rate * burst_seconds
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: int):
+        if not self.rate:
+            return
+        amount = min(amount, self.capacity)
+        # One waiter at a time, so large calls aren't starved by small ones
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def settle(self, estimated: int, actual: int):
+        if self.rate:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + estimated - actual)
+
+
+class Checkpoint:
+    """Resume point of a regeneration run, saved as JSON after every batch"""
+
+    def __init__(self, path: str, last_user_id: str = None, written: int = 0, failed: dict = None):
+        self.path = path
+        self.last_user_id = last_user_id  # every user up to here is written or in failed
+        self.written = written
+        self.failed = failed or {}        # user_id -> error
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        if not path or not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(path, data.get("last_user_id"), data.get("written", 0), data.get("failed", {}))
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"last_user_id": self.last_user_id, "written": self.written, "failed": self.failed}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def usage_tokens(usage: dict) -> int:
+    """Tokens a runtime call counted against the budget (cache reads are not billed as input)"""
+    return sum(usage.get(key) or 0 for key in ("input_tokens", "output_tokens", "cache_write_input_tokens"))
+
+
+class PlanRegenerator:
+    """
+    One regeneration run. At most `concurrency` runtime calls are in
+    flight, and profiles are only read from the cursor as slots free up.
+    Results go through a single writer that stores a new version of each
+    batch of users' plans in one transaction, then advances the checkpoint.
+    Each user's generation is a single-flight flight like a live request's,
+    so in this process the two never both write the same user's plan.
+    """
+
+    def __init__(self, concurrency: int = REGEN_CONCURRENCY, tokens_per_minute: int = REGEN_TOKENS_PER_MINUTE,
+                 tokens_per_plan: int = REGEN_TOKENS_PER_PLAN, batch_size: int = REGEN_BATCH_SIZE,
+                 checkpoint: Checkpoint = None, retries: int = 3, report_every: float = 10, limit: int = None):
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(tokens_per_minute)
+        self.tokens_per_plan = tokens_per_plan
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.retries = retries
+        self.report_every = report_every
+        self.limit = limit
+        self.stats = {"written": 0, "failed": 0, "throttled": 0, "in_flight": 0, "tokens": 0, "batches": 0,
+                      "joined": 0}
+        self._order = deque()  # dispatched user_ids, oldest first
+        self._finished = set()
+        self._advance_checkpoint = True
+        self._results = None
+        self._start = None
+
+    ### Reading ###
+
+    async def _profiles(self, user_ids: list = None):
+        """Yield (user_id, profile_dict) in user_id order, READ_BATCH rows per fetch"""
+        query = select(UserProfile).order_by(UserProfile.user_id)
+        if user_ids is not None:
+            query = query.where(UserProfile.user_id.in_(user_ids))
+        elif self.checkpoint.last_user_id:
+            query = query.where(UserProfile.user_id > self.checkpoint.last_user_id)
+        if self.limit:
+            query = query.limit(self.limit)
+
+        db = SessionLocal()
+        try:
+            # stream_results: a server-side (named) cursor on Postgres, so the
+            # table is never loaded into memory at once
+            result = db.execute(query.execution_options(stream_results=True, yield_per=READ_BATCH))
+            partitions = result.scalars().partitions()
+            while (rows := await asyncio.to_thread(next, partitions, None)) is not None:
+                for profile in rows:
+                    yield profile.user_id, build_profile_dict(profile)
+        finally:
+            db.close()
+
+    ### Generation ###
+
+    def _estimate(self) -> int:
+        """Mean tokens per plan so far, or the configured guess before the first result"""
+        if self.stats["written"]:
+            return max(1, self.stats["tokens"] // self.stats["written"])
+        return self.tokens_per_plan
+
+    async def _generate(self, user_id: str, profile_dict: dict):
+        flight, leader = single_flight.acquire(user_id, profile_fingerprint(profile_dict))
+        if not leader:
+            # A request is already generating this exact profile and will store it
+            self.stats["joined"] += 1
+            self._finish([user_id])
+            return
+        await asyncio.to_thread(flight.wait_turn)
+        error = None
+        for attempt in range(self.retries + 1):
+            estimate = self._estimate()
+            await self.bucket.acquire(estimate)
+            try:
+                document = await asyncio.to_thread(invoke_agentcore_document, profile_dict, user_id, None, False)
+            except ClientError as e:
+                self.bucket.settle(estimate, 0)
+                if e.response.get("Error", {}).get("Code") in THROTTLING_CODES and attempt < self.retries:
+                    self.stats["throttled"] += 1
+                    await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** attempt)
+                    continue
+                error = e
+                break
+            except CircuitOpenError as e:
+                # AgentCore is down: wait for the breaker's probe instead of failing the user
+                self.bucket.settle(estimate, 0)
+                if attempt < self.retries:
+                    self.stats["throttled"] += 1
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                error = e
+                break
+            except Exception as e:
+                self.bucket.settle(estimate, 0)
+                error = e
+                break
+
+            tokens = usage_tokens(document.get("usage") or {}) or estimate
+            self.bucket.settle(estimate, tokens)
+            # Error documents and empty plans were already raised (and counted by the breaker)
+            await self._results.put((user_id, plan_from_document(document), tokens, flight))
+            return
+
+        single_flight.finish(flight, error=error)
+        self.stats["failed"] += 1
+        self.checkpoint.failed[user_id] = str(error)
+        self._finish([user_id])
+
+    ### Writing ###
+
+    def _write_batch(self, plans: dict) -> dict:
+        """
+        Store a new version of every user's plan in the batch in one
+        transaction, each through store_plan under the user's persist guard.
+        A user whose write fails is skipped (savepoint) without failing the
+        rest; returns {user_id: error} for them.
+        """
+        db = SessionLocal()
+        skipped = {}
+        try:
+            # Sorted, so batches and live saves lock rows in the same order
+            for user_id in sorted(plans):
+                plan, flight = plans[user_id]
+                try:
+                    with single_flight.persist_guard(flight), db.begin_nested():
+                        store_plan(db, user_id, plan_document(plan), "regenerate", commit=False)
+                except (IntegrityError, FlightSupersededError) as e:
+                    skipped[user_id] = str(e)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return skipped
+
+    async def _flush(self, batch: dict):
+        if not batch:
+            return
+        plans = {user_id: (plan, flight) for user_id, (plan, _, flight) in batch.items()}
+        try:
+            skipped = await asyncio.to_thread(self._write_batch, plans)
+        except Exception as e:
+            print(f"❌ Writing {len(plans)} plans failed: {e}")
+            skipped = {user_id: f"write failed: {e}" for user_id in plans}
+        else:
+            self.stats["batches"] += 1
+        for user_id, (plan, flight) in plans.items():
+            if user_id in skipped:
+                single_flight.finish(flight, error=RuntimeError(skipped[user_id]))
+                self.stats["failed"] += 1
+                self.checkpoint.failed[user_id] = skipped[user_id]
+            else:
+                single_flight.finish(flight, result=plan)
+                self.stats["written"] += 1
+                self.stats["tokens"] += batch[user_id][1]
+                self.checkpoint.written += 1
+                self.checkpoint.failed.pop(user_id, None)
+        if len(skipped) < len(plans) and skipped:
+            print(f"⚠️ Skipped {len(skipped)} of {len(plans)} plans in a batch: {skipped}")
+        self._finish(list(plans))
+        self.checkpoint.save()
+        batch.clear()
+
+    async def _writer(self):
+        batch = {}
+        while True:
+            try:
+                item = await asyncio.wait_for(self._results.get(), timeout=FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                await self._flush(batch)
+                continue
+            if item is None:
+                await self._flush(batch)
+                self.checkpoint.save()  # failures since the last batch
+                return
+            user_id, plan, tokens, flight = item
+            batch[user_id] = (plan, tokens, flight)
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+
+    def _finish(self, user_ids: list):
+        """Mark users done (written or failed) and move the resume point past them"""
+        self._finished.update(user_ids)
+        while self._order and self._order[0] in self._finished:
+            user_id = self._order.popleft()
+            self._finished.discard(user_id)
+            if self._advance_checkpoint:
+                self.checkpoint.last_user_id = user_id
+
+    ### Reporting ###
+
+    def report(self) -> dict:
+        elapsed = max(time.perf_counter() - self._start, 1e-9)
+        return {
+            **self.stats,
+            "elapsed_s": round(elapsed, 1),
+            "plans_per_minute": round(self.stats["written"] / elapsed * 60, 1),
+            "tokens_per_minute": round(self.stats["tokens"] / elapsed * 60),
+            "last_user_id": self.checkpoint.last_user_id,
+        }
+
+    def _print_report(self, label: str = "📈 Regeneration"):
+        r = self.report()
+        print(f"{label}: {r['written']} written, {r['failed']} failed, {r['in_flight']} in flight, "
+              f"{r['throttled']} throttled | {r['plans_per_minute']} plans/min, "
+              f"{r['tokens_per_minute']} tokens/min | {r['elapsed_s']}s", flush=True)
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(self.report_every)
+            self._print_report()
+
+    ### Run ###
+
+    async def run(self, user_ids: list = None) -> dict:
+        """
+        Regenerate every profile after the checkpoint, or only user_ids
+        (e.g. the checkpoint's failures) without moving the resume point
+        """
+        self._start = time.perf_counter()
+        self._results = asyncio.Queue()
+        self._advance_checkpoint = user_ids is None
+        # Runtime calls block on boto; give each slot its own thread
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency + 2, thread_name_prefix="plan-regen"))
+
+        writer = asyncio.create_task(self._writer())
+        reporter = asyncio.create_task(self._reporter())
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        def release(task):
+            tasks.discard(task)
+            self.stats["in_flight"] -= 1
+            slots.release()
+
+        try:
+            async for user_id, profile_dict in self._profiles(user_ids):
+                await slots.acquire()
+                self._order.append(user_id)
+                self.stats["in_flight"] += 1
+                task = asyncio.create_task(self._generate(user_id, profile_dict))
+                tasks.add(task)
+                task.add_done_callback(release)
+            await asyncio.gather(*tasks)
+        finally:
+            await self._results.put(None)
+            await writer
+            reporter.cancel()
+        self._print_report("✅ Regeneration finished")
+        return self.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate stored plans for every user profile")
+    parser.add_argument("--concurrency", type=int, default=REGEN_CONCURRENCY, help="runtime calls in flight")
+    parser.add_argument("--tokens-per-minute", type=int, default=REGEN_TOKENS_PER_MINUTE,
+                        help="model token budget (0 = unlimited)")
+    parser.add_argument("--tokens-per-plan", type=int, default=REGEN_TOKENS_PER_PLAN,
+                        help="token estimate per plan until real usage is known")
+    parser.add_argument("--batch-size", type=int, default=REGEN_BATCH_SIZE, help="plans written per transaction")
+    parser.add_argument("--checkpoint", default=REGEN_CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first user")
+    parser.add_argument("--retry-failed", action="store_true", help="only regenerate the checkpoint's failed users")
+    parser.add_argument("--limit", type=int, help="stop after this many profiles")
+    parser.add_argument("--retries", type=int, default=3, help="retries per user after throttling")
+    parser.add_argument("--report-every", type=float, default=10, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint.load(args.checkpoint)
+    user_ids = list(checkpoint.failed) if args.retry_failed else None
+    if checkpoint.last_user_id and user_ids is None:
+        print(f"↩️ Resuming after user {checkpoint.last_user_id} ({checkpoint.written} plans already written)")
+
+    regenerator = PlanRegenerator(
+        concurrency=args.concurrency, tokens_per_minute=args.tokens_per_minute,
+        tokens_per_plan=args.tokens_per_plan, batch_size=args.batch_size, checkpoint=checkpoint,
+        retries=args.retries, report_every=args.report_every, limit=args.limit,
+    )
+    asyncio.run(regenerator.run(user_ids))
+    if checkpoint.failed:
+        print(f"⚠️ {len(checkpoint.failed)} user(s) failed; rerun with --retry-failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# backend/app/services/plan_versions.py
+# Plan versioning. The FitnessPlan row always holds the current plan and is
+# updated in place; every change also appends a PlanVersion holding either
+# a JSON patch from the previous version or, every PLAN_SNAPSHOT_EVERY
+# versions (or when the patch would be nearly as big), a full snapshot.
+# Rebuilding a version replays at most PLAN_SNAPSHOT_EVERY - 1 patches on
+# top of its snapshot.
+import copy
+import json
+import os
+import uuid
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import FitnessPlan, PlanVersion
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.utils.json_patch import apply_patch, make_patch
+
+SNAPSHOT_EVERY = int(os.getenv("PLAN_SNAPSHOT_EVERY", "20"))
+# A patch bigger than this share of a snapshot is stored as a snapshot instead
+SNAPSHOT_RATIO = float(os.getenv("PLAN_SNAPSHOT_RATIO", "0.6"))
+SNAPSHOT = "snapshot"
+PATCH = "patch"
+
+
+def plan_document(plan: PlanGenerationResponse) -> dict:
+    """The versioned JSON of a plan"""
+    return {
+        "health_metrics": plan.health_metrics,
+        "workout_plan": plan.workout_plan.model_dump(),
+        "meal_plan": plan.meal_plan.model_dump(),
+        "tips": plan.tips,
+    }
+
+
+def stored_document(plan: FitnessPlan) -> dict:
+    return {
+        "health_metrics": plan.health_metrics or {},
+        "workout_plan": plan.workout_plan or {},
+        "meal_plan": plan.meal_plan or {},
+        "tips": plan.tips or [],
+    }
+
+
+def json_size(data) -> int:
+    return len(json.dumps(data, separators=(",", ":"), default=str))
+
+
+def new_version(user_id: str, document: dict, source: str, previous: dict = None,
+                previous_version: int = 0, previous_base: int = None) -> PlanVersion:
+    """
+    The PlanVersion row that follows previous_version: a patch against the
+    previous document, or a snapshot when there is none, the chain is long
+    or the patch is not much smaller than the plan itself
+    """
+    version = previous_version + 1
+    snapshot_size = json_size(document)
+    kind, data, size, base_version = SNAPSHOT, document, snapshot_size, version
+    if previous is not None and previous_base is not None and version - previous_base < SNAPSHOT_EVERY:
+        patch = make_patch(previous, document)
+        patch_size = json_size(patch)
+        if patch_size < snapshot_size * SNAPSHOT_RATIO:
+            kind, data, size, base_version = PATCH, patch, patch_size, previous_base
+    return PlanVersion(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        version=version,
+        kind=kind,
+        base_version=base_version,
+        data=data,
+        size_bytes=size,
+        source=source,
+        created_at=datetime.utcnow(),
+    )
+
+
+def latest_base(db: Session, user_id: str, version: int):
+    """base_version of the user's given version, or None if it was never recorded"""
+    return db.query(PlanVersion.base_version).filter(
+        PlanVersion.user_id == user_id, PlanVersion.version == version
+    ).scalar()
+
+
+def lock_plan(db: Session, user_id: str):
+    """The user's plan row, locked so concurrent saves get consecutive versions"""
+    return (db.query(FitnessPlan).filter(FitnessPlan.user_id == user_id)
+            .with_for_update().populate_existing().first())
+
+
+def create_plan(db: Session, user_id: str):
+    """
+    Insert the plan row for a user's first save (it stays locked by this
+    transaction); None if a concurrent first save inserted it first
+    """
+    plan = FitnessPlan(id=str(uuid.uuid4()), user_id=user_id)
+    try:
+        # Savepoint: losing the race must not undo the caller's other rows
+        with db.begin_nested():
+            db.add(plan)
+    except IntegrityError:
+        return None
+    return plan
+
+
+def store_plan(db: Session, user_id: str, document: dict = None, source: str = "save", update=None,
+               commit: bool = True) -> FitnessPlan:
+    """
+    Make a new current plan for the user: update the row in place (or
+    create it) and append a version. Pass either the whole `document`, or
+    `update(current_document or None) -> document` to change the plan as
+    it is once locked. With commit=False the caller commits (and can add
+    rows to the same transaction) and rolls back on error, or wraps the
+    call in a savepoint; otherwise the session is rolled back on error.
+    """
+    try:
+        plan = lock_plan(db, user_id)
+        created = False
+        if plan is None:
+            # The unique user_id index lets only one first save insert;
+            # the other waits for it, then saves on top like any update
+            plan = create_plan(db, user_id)
+            created = plan is not None
+            if not created:
+                plan = lock_plan(db, user_id)
+        if created:
+            previous, previous_version, previous_base = None, 0, None
+        else:
+            previous, previous_version = stored_document(plan), plan.version or 0
+            # Plans saved before versioning have no history to patch against
+            previous_base = latest_base(db, user_id, previous_version) if previous_version else None
+        if update is not None:
+            document = update(copy.deepcopy(previous))
+
+        version = new_version(user_id, document, source, previous, previous_version, previous_base)
+        db.add(version)
+        plan.workout_plan = document["workout_plan"]
+        plan.meal_plan = document["meal_plan"]
+        plan.health_metrics = document["health_metrics"]
+        plan.tips = document["tips"]
+        plan.version = version.version
+        plan.last_modified = version.created_at
+        if commit:
+            db.commit()
+        return plan
+    except Exception:
+        if commit:
+            db.rollback()
+        raise
+
+
+def get_version(db: Session, user_id: str, version: int) -> dict:
+    """Rebuild one version: its snapshot plus the patches after it"""
+    base_version = latest_base(db, user_id, version)
+    if base_version is None:
+        raise LookupError(f"Plan version {version} not found")
+    rows = db.query(PlanVersion.kind, PlanVersion.data).filter(
+        PlanVersion.user_id == user_id,
+        PlanVersion.version >= base_version,
+        PlanVersion.version <= version,
+    ).order_by(PlanVersion.version).all()
+    document = copy.deepcopy(rows[0].data)
+    for row in rows[1:]:
+        document = apply_patch(document, row.data, in_place=True)
+    return document
+
+
+def list_versions(db: Session, user_id: str, before: int = None, limit: int = 20):
+    """
+    One page of the user's history, newest first. Keyset pagination: pass
+    the returned next_before to get the following page.
+    """
+    query = db.query(
+        PlanVersion.version, PlanVersion.kind, PlanVersion.source, PlanVersion.size_bytes, PlanVersion.created_at,
+    ).filter(PlanVersion.user_id == user_id)
+    if before is not None:
+        query = query.filter(PlanVersion.version < before)
+    rows = query.order_by(PlanVersion.version.desc()).limit(limit + 1).all()
+    items = [row._asdict() for row in rows[:limit]]
+    next_before = items[-1]["version"] if len(rows) > limit else None
+    return items, next_before
@@ -0,0 +1,152 @@
+# backend/app/services/single_flight.py
+# Coalesce concurrent plan generations per user. Requests for the same
+# user and profile join the in-flight generation and share its result;
+# a request with a changed profile either cancels (supersedes) or queues
+# behind the one already running.
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Optional
+
+# Policies for a new profile version while an older one is in flight
+QUEUE = "queue"    # wait for the running generation, then start
+CANCEL = "cancel"  # start now; the older generation is not persisted
+
+
+class FlightSupersededError(Exception):
+    """Raised to a generation (and its waiters) replaced by a newer profile"""
+
+
+def profile_fingerprint(profile_dict: dict) -> str:
+    """Exact hash of the profile the plan is generated from"""
+    canonical = json.dumps(profile_dict, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    def __init__(self, key: str, fingerprint: str, predecessor: Optional["Flight"] = None):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.predecessor = predecessor
+        self.future: Future = Future()
+        self.superseded = False
+        self.waiters = 0
+
+    def wait_turn(self):
+        """Under the queue policy, block until the previous flight is done"""
+        if self.predecessor is not None:
+            try:
+                self.predecessor.future.result()
+            except Exception:
+                pass  # its failure is reported to its own callers
+            self.predecessor = None
+
+
+class SingleFlight:
+    def __init__(self, policy: str = QUEUE):
+        if policy not in (QUEUE, CANCEL):
+            raise ValueError(f"Unknown single-flight policy: {policy}")
+        self.policy = policy
+        self._flights = {}  # key -> latest Flight
+        self._lock = threading.Lock()
+        # key -> [Lock, writers holding or waiting for it]; dropped at zero
+        self._persist_locks = {}
+        self.stats_counters = {"leaders": 0, "joined": 0, "queued": 0, "superseded": 0}
+
+    def acquire(self, key: str, fingerprint: str):
+        """
+        Join a matching in-flight generation or start a new one.
+        Returns (flight, leader); only the leader runs the generation and
+        must call finish().
+        """
+        with self._lock:
+            current = self._flights.get(key)
+            if current is not None and not current.future.done():
+                if current.fingerprint == fingerprint and not current.superseded:
+                    current.waiters += 1
+                    self.stats_counters["joined"] += 1
+                    return current, False
+                if self.policy == CANCEL:
+                    self._supersede(current)
+                    flight = Flight(key, fingerprint)
+                else:
+                    self.stats_counters["queued"] += 1
+                    flight = Flight(key, fingerprint, predecessor=current)
+            else:
+                flight = Flight(key, fingerprint)
+            self._flights[key] = flight
+            self.stats_counters["leaders"] += 1
+            return flight, True
+
+    def finish(self, flight: Flight, result=None, error: BaseException = None):
+        """Publish the leader's outcome to everyone who joined"""
+        if not flight.future.done():
+            if error is not None:
+                flight.future.set_exception(error)
+            else:
+                flight.future.set_result(result)
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def do(self, key: str, fingerprint: str, fn):
+        """Run fn(flight) once per in-flight key/fingerprint and return its result"""
+        flight, leader = self.acquire(key, fingerprint)
+        if not leader:
+            return flight.future.result()
+        try:
+            flight.wait_turn()
+            result = fn(flight)
+        except BaseException as e:
+            self.finish(flight, error=e)
+            raise
+        self.finish(flight, result=result)
+        return result
+
+    @contextmanager
+    def persist_guard(self, flight: Flight):
+        """
+        Serialize writes per key and refuse them once the flight has been
+        superseded, so an older profile's plan never overwrites a newer one
+        """
+        with self._lock:
+            entry = self._persist_locks.setdefault(flight.key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if flight.superseded:
+                    raise FlightSupersededError("Plan generation was superseded by a newer profile")
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._persist_locks[flight.key]
+
+    def _supersede(self, flight: Flight):
+        """Mark flight as replaced (lock held); waiters get FlightSupersededError"""
+        entry = self._persist_locks.get(flight.key)
+        if entry is None:
+            # No write in progress or waiting; later ones check the flag
+            flight.superseded = True
+        else:
+            with entry[0]:
+                flight.superseded = True
+        self.stats_counters["superseded"] += 1
+        if not flight.future.done():
+            flight.future.set_exception(FlightSupersededError("Plan generation was superseded by a newer profile"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "in_flight": sum(1 for flight in self._flights.values() if not flight.future.done()),
+                "persist_locks": len(self._persist_locks),
+                **self.stats_counters,
+            }
+
+
+single_flight = SingleFlight(policy=os.getenv("PLAN_SINGLE_FLIGHT_POLICY", QUEUE))
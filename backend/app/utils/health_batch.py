@@ -0,0 +1,265 @@
+# backend/app/utils/health_batch.py
+# Health metrics for many profiles at once. Each function below is the
+# NumPy version of the scalar one in health_calculations.py, working on
+# column arrays with the same floating point operations in the same order,
+# so every value (roundings and BMI categories included) matches what the
+# scalar functions return for that row.
+import json
+
+import numpy as np
+
+from app.agent.health_calculations import ACTIVITY_MULTIPLIERS, normalize_goal
+
+REQUIRED_COLUMNS = ("weight_lbs", "height_feet", "height_inches", "age", "gender")
+OPTIONAL_COLUMNS = {"activity_level": "moderate", "fitness_goal": "maintain"}
+# Output columns, in the order rows are written
+RESULT_COLUMNS = (
+    "bmi", "bmi_category", "bmr", "tdee", "goal",
+    "protein_g", "carbs_g", "fat_g", "protein_calories", "carbs_calories", "fat_calories",
+    "total_calories", "protein_percentage", "carb_percentage", "fat_percentage",
+)
+BMI_CATEGORIES = np.array(['Underweight', 'Normal weight', 'Overweight', 'Obese'], dtype=object)
+
+
+class BatchInputError(ValueError):
+    """Raised for batch input that can't be computed (missing columns, bad values)"""
+
+
+### Parsing ###
+
+def columns_from_rows(rows: list) -> dict:
+    """NDJSON-style row dicts -> columns"""
+    columns = {}
+    for name in (*REQUIRED_COLUMNS, *OPTIONAL_COLUMNS, "id"):
+        if name in REQUIRED_COLUMNS:
+            missing = next((i for i, row in enumerate(rows) if row.get(name) is None), None)
+            if missing is not None:
+                raise BatchInputError(f"Row {missing}: missing '{name}'")
+        if name in REQUIRED_COLUMNS or any(name in row for row in rows):
+            columns[name] = [row.get(name) for row in rows]
+    return columns
+
+
+def parse_ndjson(body: bytes) -> dict:
+    lines = [line for line in body.splitlines() if line.strip()]
+    try:
+        # One decode for the whole body; per line only to report where it fails
+        rows = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        rows = None
+    if rows is None or not all(isinstance(row, dict) for row in rows):
+        for number, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise BatchInputError(f"Line {number + 1}: invalid JSON ({e})")
+            if not isinstance(row, dict):
+                raise BatchInputError(f"Line {number + 1}: expected a JSON object")
+        raise BatchInputError("Invalid NDJSON")
+    return columns_from_rows(rows)
+
+
+def parse_columns(body: bytes) -> dict:
+    """{"weight_lbs": [...], "height_feet": [...], ...}, optionally wrapped in {"columns": ...}"""
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise BatchInputError(f"Invalid JSON ({e})")
+    if isinstance(data, dict) and isinstance(data.get("columns"), dict):
+        data = data["columns"]
+    if not isinstance(data, dict) or not all(isinstance(value, list) for value in data.values()):
+        raise BatchInputError("Expected an object of equal-length column arrays")
+    return data
+
+
+### Validation ###
+
+def _numeric(columns: dict, name: str, positive: bool) -> np.ndarray:
+    try:
+        values = np.asarray(columns[name], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise BatchInputError(f"Column '{name}' must contain only numbers")
+    bad = ~np.isfinite(values) | ((values <= 0) if positive else (values < 0))
+    if bad.any():
+        row = int(np.argmax(bad))
+        raise BatchInputError(f"Row {row}: invalid {name} {columns[name][row]!r}")
+    return values
+
+
+def _strings(columns: dict, name: str, size: int, default: str = None):
+    """
+    A string column as (distinct values, code per row): profiles repeat the
+    same few genders/levels/goals, so work is done once per distinct value
+    """
+    values = columns.get(name)
+    if values is None:
+        return [default], np.zeros(size, dtype=np.intp)
+    try:
+        lookup = {value: i for i, value in enumerate(dict.fromkeys(values))}
+        codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.intp, count=size)
+    except TypeError:  # unhashable, so not a string
+        lookup = None
+    distinct = [default if value is None else value for value in lookup or ()]
+    if lookup is None or not all(isinstance(value, str) for value in distinct):
+        row = next(i for i, value in enumerate(values) if not isinstance(default if value is None else value, str))
+        raise BatchInputError(f"Row {row}: {name} must be a string")
+    return distinct, codes
+
+
+def validate_columns(columns: dict) -> dict:
+    """Column lists -> float arrays and (distinct, codes) string columns, checking names, lengths and values"""
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise BatchInputError(f"Missing columns: {', '.join(missing)}")
+    size = len(columns["weight_lbs"])
+    uneven = [name for name, values in columns.items() if len(values) != size]
+    if uneven:
+        raise BatchInputError(f"Columns have different lengths: {', '.join(uneven)}")
+
+    arrays = {
+        "weight_lbs": _numeric(columns, "weight_lbs", positive=True),
+        "height_feet": _numeric(columns, "height_feet", positive=False),
+        "height_inches": _numeric(columns, "height_inches", positive=False),
+        "age": _numeric(columns, "age", positive=False),
+        "gender": _strings(columns, "gender", size),
+    }
+    no_height = arrays["height_feet"] * 12 + arrays["height_inches"] <= 0
+    if no_height.any():
+        raise BatchInputError(f"Row {int(np.argmax(no_height))}: height must be positive")
+    for name, default in OPTIONAL_COLUMNS.items():
+        arrays[name] = _strings(columns, name, size, default)
+    if "id" in columns:
+        arrays["id"] = columns["id"]
+    return arrays
+
+
+### Calculations ###
+
+def _map_strings(column, fn, dtype) -> np.ndarray:
+    """Apply a scalar string function to a (distinct, codes) column, once per distinct value"""
+    distinct, codes = column
+    return np.asarray([fn(value) for value in distinct], dtype=dtype)[codes]
+
+
+def _round_1(values: np.ndarray) -> np.ndarray:
+    """round(x, 1) as Python does it; np.round(x, 1) can differ right at a .x5 tie"""
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+
+def batch_imperial_to_metric(weight_lbs, height_feet, height_inches):
+    total_inches = (height_feet * 12) + height_inches
+    return total_inches * 0.0254, weight_lbs * 0.453592
+
+
+def batch_bmi(weight_lbs, height_feet, height_inches):
+    """(bmi, category) arrays, as calculate_bmi"""
+    height, weight = batch_imperial_to_metric(weight_lbs, height_feet, height_inches)
+    bmi = _round_1(weight / (height ** 2))
+    level = (bmi >= 18.5).astype(np.intp) + (bmi >= 25) + (bmi >= 30)
+    return bmi, BMI_CATEGORIES[level]
+
+
+def batch_bmr(weight_lbs, height_feet, height_inches, age, gender):
+    """bmr array (int64), as calculate_bmr; gender is a (distinct, codes) column"""
+    height, weight = batch_imperial_to_metric(weight_lbs, height_feet, height_inches)
+    male_bmr = (10 * weight) + (6.25 * height * 100) - (5 * age) + 5
+    female_bmr = (10 * weight) + (6.25 * height * 100) - (5 * age) - 161
+    other_bmr = (male_bmr + female_bmr) / 2
+    sex = _map_strings(gender, lambda value: {'male': 0, 'female': 1}.get(value.lower(), 2), np.int8)
+    bmr = np.where(sex == 0, male_bmr, np.where(sex == 1, female_bmr, other_bmr))
+    return np.trunc(bmr).astype(np.int64)
+
+
+def batch_tdee(bmr, activity_level):
+    """tdee array, as calculate_tdee; activity_level is a (distinct, codes) column"""
+    multiplier = _map_strings(activity_level, lambda level: ACTIVITY_MULTIPLIERS.get(level.lower(), 1.55), np.float64)
+    return bmr * multiplier
+
+
+def batch_macros(tdee, goal, weight_lbs) -> dict:
+    """calculate_macros columns; goal is a (distinct, codes) column of normalized goals"""
+    lose = _map_strings(goal, lambda value: value == 'lose_weight', bool)
+    gain = _map_strings(goal, lambda value: value == 'gain_weight', bool)
+    calories = np.where(lose, tdee * 0.8, np.where(gain, tdee * 1.15, tdee))
+    protein_per_lb = np.where(lose, 1.1, np.where(gain, 0.9, 1.0))
+    fat_ratio = np.where(gain, 0.25, 0.27)
+
+    protein_grams = weight_lbs * protein_per_lb
+    protein_calories = protein_grams * 4
+    fat_calories = calories * fat_ratio
+    fat_grams = fat_calories / 9
+    carbs_calories = calories - (protein_calories + fat_calories)
+    carbs_grams = carbs_calories / 4
+
+    rint = lambda values: np.rint(values).astype(np.int64)  # round() to an int is also half-to-even
+    return {
+        'protein_g': rint(protein_grams),
+        'carbs_g': rint(carbs_grams),
+        'fat_g': rint(fat_grams),
+        'protein_calories': rint(protein_calories),
+        'carbs_calories': rint(carbs_calories),
+        'fat_calories': rint(fat_calories),
+        'total_calories': rint(calories),
+        'protein_percentage': rint(protein_calories / calories * 100),
+        'carb_percentage': rint(carbs_calories / calories * 100),
+        'fat_percentage': rint(fat_calories / calories * 100),
+    }
+
+
+def compute_batch(columns: dict) -> dict:
+    """
+    BMI, BMR, TDEE and macros for every row of `columns` (lists or arrays
+    keyed like the profile dict). Returns RESULT_COLUMNS as arrays, plus
+    'id' when the input had one.
+
+    Raises:
+        BatchInputError: if a column is missing or holds an invalid value
+    """
+    arrays = validate_columns(columns)
+    weight, feet, inches = arrays["weight_lbs"], arrays["height_feet"], arrays["height_inches"]
+
+    bmi, category = batch_bmi(weight, feet, inches)
+    bmr = batch_bmr(weight, feet, inches, arrays["age"], arrays["gender"])
+    tdee = batch_tdee(bmr, arrays["activity_level"])
+    if (tdee == 0).any():
+        # calculate_macros divides by the calorie target
+        raise BatchInputError(f"Row {int(np.argmax(tdee == 0))}: profile gives a calorie target of 0")
+    distinct, codes = arrays["fitness_goal"]
+    goal = ([normalize_goal(value) for value in distinct], codes)
+    result = {"bmi": bmi, "bmi_category": category, "bmr": bmr, "tdee": tdee,
+              "goal": _map_strings(goal, str, object), **batch_macros(tdee, goal, weight)}
+    if "id" in arrays:
+        result["id"] = arrays["id"]
+    return result
+
+
+### Output ###
+
+def result_slice(result: dict, start: int, stop: int) -> dict:
+    """Rows start:stop of a compute_batch result as plain Python lists"""
+    columns = {"id": list(result["id"][start:stop])} if "id" in result else {}
+    for name in RESULT_COLUMNS:
+        columns[name] = result[name][start:stop].tolist()
+    return columns
+
+
+def iter_ndjson(result: dict, chunk_rows: int = 1000, columnar: bool = False):
+    """
+    NDJSON chunks of the result: one object per row, or with columnar=True
+    one {"start": i, "columns": {...}} object per chunk of rows
+    """
+    size = len(result["bmi"])
+    for start in range(0, size, chunk_rows):
+        columns = result_slice(result, start, start + chunk_rows)
+        if columnar:
+            yield json.dumps({"start": start, "columns": columns}) + "\n"
+        else:
+            names = list(columns)
+            yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in zip(*columns.values()))
@@ -0,0 +1,86 @@
+# backend/app/utils/json_patch.py
+# Minimal JSON Patch (RFC 6902) for plan versioning: make_patch() diffs two
+# JSON documents into add/remove/replace operations, apply_patch() replays
+# them. Objects are diffed key by key and lists index by index, so editing
+# one meal produces a patch about the size of that meal.
+import copy
+
+
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _diff(before, after, path: str, ops: list):
+    if type(before) is not type(after):
+        ops.append({"op": "replace", "path": path, "value": copy.deepcopy(after)})
+    elif isinstance(before, dict):
+        for key in before:
+            if key not in after:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in after.items():
+            if key not in before:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": copy.deepcopy(value)})
+            else:
+                _diff(before[key], value, f"{path}/{_escape(key)}", ops)
+    elif isinstance(before, list):
+        common = min(len(before), len(after))
+        for i in range(common):
+            _diff(before[i], after[i], f"{path}/{i}", ops)
+        # Remove from the end so earlier indexes stay valid
+        for i in range(len(before) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(common, len(after)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": copy.deepcopy(after[i])})
+    elif before != after:
+        ops.append({"op": "replace", "path": path, "value": copy.deepcopy(after)})
+
+
+def make_patch(before, after) -> list:
+    """Operations that turn `before` into `after`"""
+    ops = []
+    _diff(before, after, "", ops)
+    return ops
+
+
+def _parent(doc, path: str):
+    """(container, last token) for a JSON pointer"""
+    tokens = [_unescape(token) for token in path.split("/")[1:]]
+    target = doc
+    for token in tokens[:-1]:
+        target = target[int(token)] if isinstance(target, list) else target[token]
+    return target, tokens[-1]
+
+
+def apply_patch(doc, patch: list, in_place: bool = False):
+    """Return `doc` with the operations applied; a copy unless in_place"""
+    if not in_place:
+        doc = copy.deepcopy(doc)
+    for op in patch:
+        if op["path"] == "":
+            if op["op"] not in ("add", "replace"):
+                raise ValueError(f"Unsupported patch operation at the root: {op['op']}")
+            doc = copy.deepcopy(op["value"])
+            continue
+        parent, token = _parent(doc, op["path"])
+        if isinstance(parent, list):
+            index = len(parent) if token == "-" else int(token)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "replace":
+                parent[index] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                parent[token] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[token]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+    return doc
@@ -0,0 +1 @@
+# Benchmarks - run from backend/, e.g. python -m benchmarks.generation_modes
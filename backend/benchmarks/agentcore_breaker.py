@@ -0,0 +1,154 @@
+# backend/benchmarks/agentcore_breaker.py
+# Plan generation through an AgentCore outage, with and without the
+# circuit breaker (app/services/circuit_breaker.py). Each scenario runs
+# three phases against the AgentCore stand-in: healthy, outage (every call
+# hangs for --outage-ms and then times out, standing in for read_timeout)
+# and recovery (after the breaker's cool-down). Reports per-phase latency,
+# outcomes, breaker transitions and fallback counts. First it checks that
+# the production breaker settings stay closed under healthy traffic (calls
+# of --healthy-seconds, as measured for real plan generation) and exits
+# non-zero if they don't.
+#
+#   python -m benchmarks.agentcore_breaker --requests 40 --concurrency 8
+#   python -m benchmarks.agentcore_breaker --scenarios none fail_fast local hedge --outage-ms 3000
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app modules read their configuration (no database is used)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("AGENTCORE_AGENT_ARN", "arn:aws:bedrock-agentcore:us-east-1:000000000000:runtime/standin")
+
+from benchmarks.agentcore_standin import StandinConfig, TIMEOUT, install_agentcore_standin, build_fake_model
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.agent.fitness_agent import FitnessAgent
+from app.services import plan_generation
+from app.services.circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError, agentcore_breaker
+
+# 'none' = breaker that never opens (the behaviour before the breaker)
+SCENARIOS = ["none", plan_generation.FAIL_FAST, plan_generation.LOCAL, plan_generation.HEDGE]
+
+
+def one_request(i: int) -> tuple:
+    start = time.perf_counter()
+    try:
+        plan_generation.generate_plan_response(SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)], f"bench-{i}")
+        outcome = "ok"
+    except CircuitOpenError:
+        outcome = "rejected"
+    except Exception:
+        outcome = "error"
+    return (time.perf_counter() - start) * 1000, outcome
+
+
+def run_phase(requests: int, concurrency: int) -> tuple:
+    # generate_plan_response logs every call; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(one_request, range(requests)))
+        wall = time.perf_counter() - start
+    return [ms for ms, _ in results], Counter(outcome for _, outcome in results), wall
+
+
+def check_healthy_traffic(args) -> bool:
+    """Feed successful calls with healthy latencies to a breaker built like agentcore_breaker"""
+    breaker = CircuitBreaker(
+        "AgentCore (healthy check)", window_size=agentcore_breaker.window_size,
+        min_calls=agentcore_breaker.min_calls, failure_rate_threshold=agentcore_breaker.failure_rate_threshold,
+        slow_call_seconds=agentcore_breaker.slow_call_seconds,
+        slow_call_rate_threshold=agentcore_breaker.slow_call_rate_threshold,
+        open_seconds=agentcore_breaker.open_seconds, half_open_max_calls=agentcore_breaker.half_open_max_calls,
+    )
+    rng = random.Random(1)
+    low, high = args.healthy_seconds
+    for _ in range(args.requests):
+        try:
+            breaker.allow()
+        except CircuitOpenError:
+            break
+        breaker.record(True, rng.uniform(low, high))
+    stats = breaker.stats()
+    ok = breaker.state == CLOSED and not stats["transitions"]
+    print(f"{'✅' if ok else '❌'} Healthy traffic ({low:g}-{high:g}s calls, slow_call_seconds="
+          f"{breaker.slow_call_seconds:g}): breaker {breaker.state}, slow-call rate {stats['slow_call_rate']}")
+    return ok
+
+
+def run_scenario(scenario: str, standin, args) -> list:
+    breaker = CircuitBreaker(
+        "AgentCore", window_size=10, min_calls=4, slow_call_seconds=args.outage_ms / 1000 * 0.8,
+        open_seconds=args.open_seconds,
+        # Thresholds above 1 never trip
+        failure_rate_threshold=2.0 if scenario == "none" else 0.5,
+        slow_call_rate_threshold=2.0 if scenario == "none" else 0.5,
+    )
+    plan_generation.agentcore_breaker = breaker
+    plan_generation.AGENTCORE_FALLBACK = plan_generation.FAIL_FAST if scenario == "none" else scenario
+    plan_generation.fallback_counters.clear()
+
+    rows = []
+    phases = [
+        ("healthy", dict(latency_ms=args.latency_ms, error_rate=0.0)),
+        ("outage", dict(latency_ms=args.outage_ms, error_rate=1.0, error_kind=TIMEOUT)),
+        ("recovery", dict(latency_ms=args.latency_ms, error_rate=0.0)),
+    ]
+    for phase, settings in phases:
+        if phase == "recovery":
+            time.sleep(args.open_seconds)  # let the breaker go half-open
+        for name, value in settings.items():
+            setattr(standin.config, name, value)
+        latencies, outcomes, wall = run_phase(args.requests, args.concurrency)
+        stats = summarize(latencies)
+        rows.append({
+            "scenario": scenario, "phase": phase, "ok": outcomes["ok"], "rejected": outcomes["rejected"],
+            "error": outcomes["error"], "p50_ms": stats["p50"], "p95_ms": stats["p95"],
+            "wall_s": round(wall, 2), "state": breaker.state,
+        })
+    rows[-1]["transitions"] = breaker.stats()["transitions"]
+    rows[-1]["fallbacks"] = dict(plan_generation.fallback_counters)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=40, help="requests per phase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--outage-ms", type=float, default=2000, help="how long each call hangs before timing out")
+    parser.add_argument("--open-seconds", type=float, default=2)
+    parser.add_argument("--healthy-seconds", type=float, nargs=2, default=[120, 200], metavar=("MIN", "MAX"),
+                        help="latency range of healthy AgentCore calls for the breaker settings check")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    healthy_ok = check_healthy_traffic(args)
+    standin = install_agentcore_standin(StandinConfig(latency_ms=args.latency_ms, seed=1))
+    # The local fallback agent runs on the in-process model stand-in
+    plan_generation._local_agent = FitnessAgent(model=build_fake_model(StandinConfig(latency_ms=args.latency_ms, seed=1)))
+    plan_generation.HEDGE_AFTER_SECONDS = args.outage_ms / 1000 / 4
+
+    rows = []
+    for scenario in args.scenarios:
+        rows.extend(run_scenario(scenario, standin, args))
+    print_table(rows, ["scenario", "phase", "ok", "rejected", "error", "p50_ms", "p95_ms", "wall_s", "state"])
+    for row in rows[2::3]:
+        print(f"{row['scenario']}: transitions {row['transitions']}, fallbacks {row['fallbacks']}")
+
+    if args.out:
+        write_json(args.out, {"runs": rows, "standin": standin.stats, "healthy_check": healthy_ok})
+    if not healthy_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
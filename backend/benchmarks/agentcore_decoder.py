@@ -0,0 +1,150 @@
+# backend/benchmarks/agentcore_decoder.py
+# Micro-benchmark: the old iter_lines(chunk_size=10) ingest loop vs
+# app/services/agentcore_decoder.py on the same response bodies.
+#
+# Bodies are wrapped in botocore's real StreamingBody, so read sizes and
+# per-read overhead match production. By default plans of a few sizes are
+# synthesized from the stand-in; pass --payload with bodies recorded from a
+# real runtime (raw bytes, SSE or JSON) to measure those instead.
+#
+#   python -m benchmarks.agentcore_decoder --iterations 200
+#   python -m benchmarks.agentcore_decoder --record payloads/   # save the synthetic bodies
+#   python -m benchmarks.agentcore_decoder --payload payloads/*.sse
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botocore.response import StreamingBody
+
+from benchmarks.agentcore_standin import sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.services.agentcore_decoder import decode_plan_response
+
+
+class CountingStream(io.BytesIO):
+    """Raw stream that counts read() calls (a syscall each on a socket)"""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def legacy_decode(response: dict) -> dict:
+    """The ingest loop generate_plan used before agentcore_decoder"""
+    if "text/event-stream" in response.get("contentType", ""):
+        content = []
+        for line in response["response"].iter_lines(chunk_size=10):
+            if line:
+                line = line.decode("utf-8")
+                if line.startswith("data: "):
+                    line = line[6:]
+                content.append(line)
+        plan_text = "\n".join(content)
+        return json.loads(plan_text) if plan_text.strip().startswith('{') else {"response": plan_text}
+    content = []
+    for chunk in response.get("response", []):
+        content.append(chunk.decode('utf-8'))
+    return json.loads(''.join(content))
+
+
+def legacy_full(response: dict) -> PlanGenerationResponse:
+    return PlanGenerationResponse(**legacy_decode(response)["response"])
+
+
+def decoder_full(response: dict) -> PlanGenerationResponse:
+    return PlanGenerationResponse(**decode_plan_response(response)["response"])
+
+
+def synthetic_bodies() -> dict:
+    """Envelopes around plans of roughly 10KB, 100KB and 1MB"""
+    bodies = {}
+    for label, scale in (("small", 1), ("medium", 10), ("large", 100)):
+        plan = sample_plan(SAMPLE_PROFILES[0])
+        for day in plan["workout_plan"].values():
+            if isinstance(day, dict):
+                day["exercises"] = day["exercises"] * scale
+        plan["tips"] = plan["tips"] * scale
+        envelope = json.dumps({"response": plan, "status": "success", "usage": {"model_calls": 2}}).encode()
+        bodies[f"{label}.json"] = envelope
+        bodies[f"{label}.sse"] = b"data: " + envelope + b"\n\n"
+    return bodies
+
+
+def response_for(name: str, body: bytes):
+    content_type = "text/event-stream" if name.endswith(".sse") or body.startswith(b"data:") else "application/json"
+    stream = CountingStream(body)
+    return {"contentType": content_type, "response": StreamingBody(stream, len(body))}, stream
+
+
+def measure(fn, name: str, body: bytes, iterations: int) -> dict:
+    fn(response_for(name, body)[0])  # warm up
+    timings = []
+    reads = 0
+    for _ in range(iterations):
+        response, stream = response_for(name, body)
+        start = time.perf_counter()
+        fn(response)
+        timings.append((time.perf_counter() - start) * 1000)
+        reads = stream.reads
+    return {"reads": reads, **summarize(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--payload", nargs="+", help="recorded response bodies (.sse or .json)")
+    parser.add_argument("--record", help="write the synthetic bodies to this directory and exit")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        for name, body in synthetic_bodies().items():
+            with open(os.path.join(args.record, name), "wb") as f:
+                f.write(body)
+        return
+
+    if args.payload:
+        bodies = {}
+        for path in args.payload:
+            with open(path, "rb") as f:
+                bodies[os.path.basename(path)] = f.read()
+    else:
+        bodies = synthetic_bodies()
+
+    rows = []
+    for name, body in bodies.items():
+        # Both paths must produce the same plan before timing means anything
+        response = response_for(name, body)[0]
+        assert legacy_full(response) == decoder_full(response_for(name, body)[0]), name
+        legacy = measure(legacy_full, name, body, args.iterations)
+        decoder = measure(decoder_full, name, body, args.iterations)
+        rows.append({
+            "payload": name,
+            "kb": round(len(body) / 1024, 1),
+            "legacy_reads": legacy["reads"],
+            "decoder_reads": decoder["reads"],
+            "legacy_p50_ms": legacy["p50"],
+            "decoder_p50_ms": decoder["p50"],
+            "legacy_p95_ms": legacy["p95"],
+            "decoder_p95_ms": decoder["p95"],
+            "speedup": round(legacy["p50"] / decoder["p50"], 2) if decoder["p50"] else None,
+        })
+
+    print_table(rows, list(rows[0]))
+    if args.out:
+        write_json(args.out, rows)
+
+
+if __name__ == "__main__":
+    main()
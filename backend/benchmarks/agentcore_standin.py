@@ -0,0 +1,450 @@
+# backend/benchmarks/agentcore_standin.py
+# Offline stand-ins for AgentCore and Bedrock so plan generation can be
+# benchmarked and load tested without AWS.
+#
+# FakeAgentCoreClient implements the invoke_agent_runtime contract (both
+# text/event-stream and application/json responses) and is installed into
+# the shared client registry with install_agentcore_standin(). FakeModel
+# is a Strands model that answers with canned text and schema-valid
+# structured output. Both take a StandinConfig for latency, chunking,
+# token rate and error injection.
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+from app.services.aws_clients import aws_clients
+from app.agent.health_calculations import compute_health_metrics
+
+# Error kinds for StandinConfig.error_kind
+THROTTLE = "throttle"  # ClientError(ThrottlingException) before any bytes
+TIMEOUT = "timeout"    # ReadTimeoutError before any bytes
+STREAM = "stream"      # ReadTimeoutError halfway through the body
+RUNTIME = "runtime"    # 200 response carrying an agent error payload
+
+WEEK_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+@dataclass
+class StandinConfig:
+    latency_ms: float = 200          # time to first byte / first token
+    jitter_ms: float = 0             # uniform +/- noise on latency_ms
+    output_tokens: int = 1500        # simulated model output per response
+    tokens_per_second: float = 0     # 0 = send the body as fast as it's read
+    chunk_size: int = 1024           # body bytes per network chunk
+    content_type: str = "auto"       # 'auto' (SSE only when asked to stream), 'sse' or 'json'
+    error_rate: float = 0.0          # fraction of calls that fail
+    error_kind: str = THROTTLE
+    seed: Optional[int] = None
+
+    def first_byte_delay(self, rng: random.Random) -> float:
+        jitter = rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def generation_seconds(self) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return self.output_tokens / self.tokens_per_second
+
+
+### Canned plans ###
+
+def sample_workout_plan(user_profile: dict) -> dict:
+    days = int(user_profile.get("workout_days_per_week") or 3)
+    duration = int(user_profile.get("workout_duration_minutes") or 45)
+    types = ["Upper Body", "Lower Body", "Full Body", "Cardio"]
+    plan = {}
+    for i, day in enumerate(WEEK_DAYS[:days]):
+        plan[day] = {
+            "workout_type": types[i % len(types)],
+            "duration_minutes": duration,
+            "exercises": [
+                {"name": f"Exercise {n + 1}", "sets": 3, "reps": "8-12", "rest_seconds": 60,
+                 "notes": "Controlled tempo, stop two reps short of failure"}
+                for n in range(5)
+            ],
+        }
+    plan["weekly_summary"] = f"{days} training days of about {duration} minutes"
+    return plan
+
+
+def sample_meal_plan(metrics: dict) -> dict:
+    targets = metrics["macro_targets"]
+    calories = metrics["target_calories"]
+
+    def meal(name, share):
+        return {
+            "name": name,
+            "calories": round(calories * share),
+            "protein_g": round(targets["protein_g"] * share, 1),
+            "carbs_g": round(targets["carbs_g"] * share, 1),
+            "fat_g": round(targets["fat_g"] * share, 1),
+            "ingredients": ["ingredient a", "ingredient b", "ingredient c"],
+            "preparation": "Cook and serve",
+        }
+
+    return {
+        "day_meal": {
+            "breakfast": meal("Oats and eggs", 0.25),
+            "lunch": meal("Chicken rice bowl", 0.35),
+            "dinner": meal("Salmon and vegetables", 0.3),
+            "snacks": [meal("Greek yogurt", 0.1)],
+        },
+        "weekly_summary": f"About {calories} kcal per day",
+        "daily_targets": dict(targets, calories=calories),
+    }
+
+
+def sample_tips() -> list:
+    return [
+        "Sleep 7-9 hours a night",
+        "Drink water with every meal",
+        "Add weight or reps each week",
+        "Prep meals ahead for busy days",
+        "Take a rest day when you're sore",
+    ]
+
+
+def sample_plan(user_profile: dict) -> dict:
+    """Schema-valid PlanGenerationResponse data sized like a real plan"""
+    metrics = compute_health_metrics(user_profile)
+    return {
+        "health_metrics": metrics,
+        "workout_plan": sample_workout_plan(user_profile),
+        "meal_plan": sample_meal_plan(metrics),
+        "tips": sample_tips(),
+    }
+
+
+def sample_text(tokens: int) -> str:
+    """Filler analysis text, roughly one token per word"""
+    words = ["train", "eat", "protein", "rest", "progress", "calories", "sleep", "recover"]
+    return " ".join(words[i % len(words)] for i in range(tokens))
+
+
+### AgentCore Runtime stand-in ###
+
+class FakeStreamingBody:
+    """
+    The parts of botocore's StreamingBody the app uses: read(), iter_chunks(),
+    iter_lines() and iteration. Bytes come from a generator of network
+    chunks, so pacing and mid-stream failures happen while the caller reads.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self.closed = False
+
+    def read(self, amt: int = None) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def iter_lines(self, chunk_size: int = 1024, keepends: bool = False):
+        pending = b""
+        for chunk in self.iter_chunks(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            for line in lines[:-1]:
+                yield line.splitlines(keepends)[0]
+            pending = lines[-1]
+        if pending:
+            yield pending.splitlines(keepends)[0]
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def close(self):
+        self.closed = True
+
+
+def to_json(obj) -> str:
+    """Serialize like BedrockAgentCoreApp: pydantic models become dicts"""
+    return json.dumps(obj, default=lambda value: value.model_dump() if hasattr(value, "model_dump") else str(value))
+
+
+def sse_frame(event: dict) -> bytes:
+    return f"data: {to_json(event)}\n\n".encode("utf-8")
+
+
+def runtime_events(user_profile: dict, config: StandinConfig):
+    """The event sequence FitnessAgentCore.stream_fitness_plan emits"""
+    plan = sample_plan(user_profile)
+    yield {"event": "progress", "stage": "analysis", "message": "Analyzing your profile..."}
+    yield {"event": "section", "name": "health_metrics", "data": plan["health_metrics"]}
+    text = sample_text(config.output_tokens).split(" ")
+    for i in range(0, len(text), 20):
+        yield {"event": "delta", "text": " ".join(text[i:i + 20]) + " "}
+    yield {"event": "progress", "stage": "structuring", "message": "Building your plan..."}
+    for section in ("workout_plan", "meal_plan", "tips"):
+        yield {"event": "section", "name": section, "data": plan[section]}
+    yield {"event": "plan", "response": plan, "status": "success", "usage": standin_usage(config)}
+
+
+def standin_usage(config: StandinConfig) -> dict:
+    return {"model_calls": 2, "input_tokens": 2500, "output_tokens": config.output_tokens, "mode": "standin"}
+
+
+class FakeAgentCoreClient:
+    """
+    In-process replacement for the bedrock-agentcore boto3 client.
+
+    By default it answers with a canned plan. Pass handler to run a real
+    entry point instead: handler(payload_dict) returns either a dict (sent
+    as JSON) or an iterable/async iterable of events (sent as SSE), like
+    BedrockAgentCoreApp does.
+    """
+
+    def __init__(self, config: StandinConfig = None, handler=None):
+        self.config = config or StandinConfig()
+        self.handler = handler
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "bytes": 0}
+
+    def invoke_agent_runtime(self, agentRuntimeArn: str = None, runtimeSessionId: str = None,
+                             payload=b"", **kwargs) -> dict:
+        config = self.config
+        body = json.loads(payload)
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = config.first_byte_delay(self._rng)
+            fail = self._rng.random() < config.error_rate
+            if fail:
+                self.stats["errors"] += 1
+
+        time.sleep(delay)
+        if fail and config.error_kind == THROTTLE:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                              "InvokeAgentRuntime")
+        if fail and config.error_kind == TIMEOUT:
+            raise ReadTimeoutError(endpoint_url="https://bedrock-agentcore.us-east-1.amazonaws.com")
+
+        if self.handler is not None:
+            result = self.handler(body)
+        elif fail and config.error_kind == RUNTIME:
+            result = {"response": {"error": "Injected agent failure"}, "status": "error"}
+        elif body.get("stream"):
+            result = runtime_events(body.get("user_profile", {}), config)
+        else:
+            result = {
+                "response": sample_plan(body.get("user_profile", {})),
+                "status": "success",
+                "usage": standin_usage(config),
+            }
+
+        sse = config.content_type == "sse" or (config.content_type == "auto" and not isinstance(result, dict))
+        if sse:
+            events = [result] if isinstance(result, dict) else result
+            frames = (sse_frame(event) for event in iter_events(events))
+            content_type = "text/event-stream"
+        else:
+            if not isinstance(result, dict):
+                result = list(iter_events(result))[-1]
+            frames = iter([to_json(result).encode("utf-8")])
+            content_type = "application/json"
+
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "runtimeSessionId": runtimeSessionId or str(uuid.uuid4()),
+            "contentType": content_type,
+            "statusCode": 200,
+            "response": FakeStreamingBody(self._network_chunks(frames, fail and config.error_kind == STREAM)),
+        }
+
+    def _network_chunks(self, frames, fail_midway: bool):
+        """Re-slice frames into chunk_size pieces, paced to the token rate"""
+        config = self.config
+        data = b"".join(frames)
+        count = max(1, -(-len(data) // config.chunk_size))
+        pause = config.generation_seconds() / count
+        with self._lock:
+            self.stats["bytes"] += len(data)
+        for i in range(count):
+            if fail_midway and i >= count // 2:
+                raise ReadTimeoutError(endpoint_url="https://bedrock-agentcore.us-east-1.amazonaws.com")
+            if pause:
+                time.sleep(pause)
+            yield data[i * config.chunk_size:(i + 1) * config.chunk_size]
+
+    def close(self):
+        pass
+
+
+def iter_events(events):
+    """Iterate sync or async event sources (the runtime can return either)"""
+    if hasattr(events, "__anext__"):
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(events.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.close()
+    else:
+        yield from events
+
+
+def install_agentcore_standin(config: StandinConfig = None, handler=None) -> FakeAgentCoreClient:
+    """Route every get_agentcore_client() call to a FakeAgentCoreClient"""
+    client = FakeAgentCoreClient(config, handler)
+    aws_clients.register("bedrock-agentcore", client, "us-east-1")
+    return client
+
+
+### Bedrock model stand-in for Strands ###
+
+def build_fake_model(config: StandinConfig = None):
+    """
+    Strands model with Bedrock-like timing that never leaves the process.
+    Text turns stream sample_text; structured output returns canned plan
+    sections for the app's schemas (PlanGenerationResponse, WorkoutPlan,
+    MealPlan, PlanTips). Usage metadata follows Bedrock prompt caching: a
+    prefix (tool specs, system prompt, messages) ending in a cache point is
+    written on first use and read after, if it reaches CACHE_MIN_TOKENS.
+    """
+    # Strands is only needed when benchmarking the agent itself
+    from strands.models import Model
+    from strands.tools.structured_output import convert_pydantic_to_tool_spec
+    from strands.types._events import ModelStreamChunkEvent
+
+    config = config or StandinConfig()
+    rng = random.Random(config.seed)
+    profile_holder = {}
+    cached_prefixes = set()
+    cache_lock = threading.Lock()
+
+    class FakeModel(Model):
+        def __init__(self):
+            self.config = {"model_id": "standin"}
+            self.stats = {"calls": 0, "errors": 0}
+
+        def update_config(self, **model_config):
+            self.config.update(model_config)
+
+        def get_config(self):
+            return self.config
+
+        def use_profile(self, user_profile: dict):
+            """Profile used to size canned output (defaults to the first sample)"""
+            profile_holder["profile"] = user_profile
+
+        async def _before_first_token(self):
+            self.stats["calls"] += 1
+            await asyncio.sleep(config.first_byte_delay(rng))
+            if rng.random() < config.error_rate:
+                self.stats["errors"] += 1
+                if config.error_kind == THROTTLE:
+                    from strands.types.exceptions import ModelThrottledException
+                    raise ModelThrottledException("Rate exceeded")
+                raise RuntimeError("Injected model failure")
+
+        async def stream(self, messages, tool_specs=None, system_prompt=None, *, tool_choice=None, **kwargs):
+            await self._before_first_token()
+            words = sample_text(config.output_tokens).split(" ")
+            pause = config.generation_seconds() / max(1, len(words) // 20)
+            yield {"messageStart": {"role": "assistant"}}
+            yield {"contentBlockStart": {"start": {}}}
+            for i in range(0, len(words), 20):
+                if pause:
+                    await asyncio.sleep(pause)
+                yield {"contentBlockDelta": {"delta": {"text": " ".join(words[i:i + 20]) + " "}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+            yield self._metadata(messages, system_prompt, tool_specs)
+
+        def _metadata(self, messages, system_prompt, tool_specs=None) -> dict:
+            # Bedrock puts the tool specs, then the system prompt, ahead of the messages
+            lead = json.dumps(tool_specs or []) + (system_prompt or "")
+            usage = {"outputTokens": config.output_tokens, **cache_usage(messages, lead, cached_prefixes, cache_lock)}
+            cached = usage.get("cacheReadInputTokens", 0) + usage.get("cacheWriteInputTokens", 0)
+            usage["inputTokens"] = max(0, estimate_tokens(messages, lead) - cached)
+            usage["totalTokens"] = usage["inputTokens"] + config.output_tokens
+            return {"metadata": {
+                "usage": usage,
+                "metrics": {"latencyMs": round(config.latency_ms + config.generation_seconds() * 1000)},
+            }}
+
+        async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+            await self._before_first_token()
+            if config.generation_seconds():
+                await asyncio.sleep(config.generation_seconds())
+            # Bedrock's structured output is a streamed tool call; its usage reaches the callback handler
+            yield ModelStreamChunkEvent(self._metadata(prompt, system_prompt, [convert_pydantic_to_tool_spec(output_model)]))
+            yield {"output": output_model(**structured_sample(output_model.__name__, profile_holder.get("profile")))}
+
+    return FakeModel()
+
+
+def structured_sample(schema_name: str, user_profile: dict = None) -> dict:
+    if user_profile is None:
+        from benchmarks.common import SAMPLE_PROFILES
+        user_profile = SAMPLE_PROFILES[0]
+    plan = sample_plan(user_profile)
+    if schema_name == "WorkoutPlan":
+        return plan["workout_plan"]
+    if schema_name == "MealPlan":
+        return plan["meal_plan"]
+    if schema_name == "PlanTips":
+        return {"tips": plan["tips"]}
+    if schema_name == "DayWorkout":
+        return next(day for day in plan["workout_plan"].values() if isinstance(day, dict))
+    if schema_name == "Meal":
+        return plan["meal_plan"]["day_meal"]["lunch"]
+    return plan
+
+
+def estimate_tokens(messages, system_prompt: str = None) -> int:
+    """~4 characters per token, close enough for relative comparisons"""
+    chars = len(system_prompt or "")
+    for message in messages or []:
+        for block in message.get("content", []):
+            chars += len(block.get("text", "")) if isinstance(block, dict) else 0
+    return max(1, chars // 4)
+
+
+def cache_usage(messages, lead: str, cached_prefixes: set, lock) -> dict:
+    """
+    Cache read/write tokens for the prefix that ends at the last cache point:
+    lead (tool specs and system prompt) plus the message text before it.
+    Like Bedrock, a prefix shorter than CACHE_MIN_TOKENS isn't cached.
+    """
+    from app.agent.prompts import CACHE_MIN_TOKENS
+
+    prefix = None
+    text = [lead or ""]
+    for message in messages or []:
+        for block in message.get("content", []):
+            if "cachePoint" in block:
+                prefix = "".join(text)
+            else:
+                text.append(block.get("text", ""))
+    if prefix is None or len(prefix) // 4 < CACHE_MIN_TOKENS:
+        return {}
+    tokens = len(prefix) // 4
+    with lock:
+        hit = prefix in cached_prefixes
+        cached_prefixes.add(prefix)
+    return {"cacheReadInputTokens" if hit else "cacheWriteInputTokens": tokens}
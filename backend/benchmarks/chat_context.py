@@ -0,0 +1,104 @@
+# backend/benchmarks/chat_context.py
+# Per-turn prompt size and latency of the plan chat (app/services/chat.py)
+# as a conversation grows, with the bounded window + recap against sending
+# the whole history. Runs on the in-process model stand-in and a throwaway
+# SQLite database.
+#
+#   python -m benchmarks.chat_context --turns 40
+#   python -m benchmarks.chat_context --turns 80 --window 4 --batch 4 --reply-tokens 300
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import create_users  # also points the app at a temp database
+from benchmarks.agentcore_standin import StandinConfig, build_fake_model, sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, write_json
+from app.agent.fitness_agent import FitnessAgent
+from app.database import SessionLocal
+from app.models.models import FitnessPlan, User
+from app.services import chat, plan_generation
+
+QUESTIONS = [
+    "Can I swap squats for something easier on my knees?",
+    "What should I eat before a morning workout?",
+    "Is it okay to train two days in a row?",
+    "How much water should I drink on workout days?",
+    "Can you suggest a vegetarian lunch that fits my targets?",
+]
+
+
+def create_user_with_plan() -> str:
+    create_users(1)
+    db = SessionLocal()
+    try:
+        user = db.query(User).order_by(User.created.desc()).first()
+        plan = sample_plan(SAMPLE_PROFILES[0])
+        db.add(FitnessPlan(id=str(uuid.uuid4()), user_id=user.id, workout_plan=plan["workout_plan"],
+                           meal_plan=plan["meal_plan"], health_metrics=plan["health_metrics"], tips=plan["tips"]))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+async def one_turn(user_id: str, message: str) -> dict:
+    start = time.perf_counter()
+    first_delta_ms = None
+    done = {}
+    async for frame in chat.stream_chat_events(user_id, message):
+        event, data = frame.split("\n")[:2]
+        if event == "event: delta" and first_delta_ms is None:
+            first_delta_ms = (time.perf_counter() - start) * 1000
+        elif event in ("event: done", "event: error"):
+            done = json.loads(data[len("data: "):])
+    if "detail" in done:
+        raise RuntimeError(done["detail"])
+    return {"first_delta_ms": round(first_delta_ms or 0, 1), "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            "input_tokens": done["usage"].get("input_tokens", 0), "context_turns": done["context_turns"]}
+
+
+def run(label: str, turns: int, window: int, batch: int) -> list:
+    chat.CHAT_WINDOW_TURNS, chat.CHAT_SUMMARY_BATCH = window, batch
+    user_id = create_user_with_plan()
+    results = []
+    for i in range(turns):
+        result = asyncio.run(one_turn(user_id, QUESTIONS[i % len(QUESTIONS)]))
+        results.append(dict(result, context=label, turn=i + 1))
+        # Let the background recap land before the next turn, as it would between user messages
+        while chat._summarizing:
+            time.sleep(0.01)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    model = build_fake_model(StandinConfig(latency_ms=args.latency_ms, output_tokens=args.reply_tokens, seed=1))
+    plan_generation._local_agent = FitnessAgent(model=model)
+
+    results = run("bounded", args.turns, args.window, args.batch)
+    results += run("full_history", args.turns, args.turns + 1, 1)
+
+    checkpoints = {1, 5, 10, 20, 40, 80, args.turns}
+    rows = [row for row in results if row["turn"] in checkpoints]
+    print_table(rows, ["context", "turn", "context_turns", "input_tokens", "first_delta_ms", "total_ms"])
+
+    if args.out:
+        write_json(args.out, {"turns": results})
+
+
+if __name__ == "__main__":
+    main()
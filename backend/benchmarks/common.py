@@ -0,0 +1,60 @@
+# backend/benchmarks/common.py
+# Shared fixtures and stats helpers for the benchmark scripts
+import json
+import statistics
+
+SAMPLE_PROFILES = [
+    {
+        "age": 30, "weight_lbs": 170, "height_feet": 5, "height_inches": 9,
+        "gender": "male", "fitness_goal": "lose-weight", "activity_level": "moderate",
+        "workout_days_per_week": 3, "workout_duration_minutes": 45,
+        "available_equipment": ["dumbbells", "bench"], "dietary_preferences": [],
+    },
+    {
+        "age": 26, "weight_lbs": 135, "height_feet": 5, "height_inches": 4,
+        "gender": "female", "fitness_goal": "gain-weight", "activity_level": "light",
+        "workout_days_per_week": 4, "workout_duration_minutes": 60,
+        "available_equipment": ["barbell", "squat rack"], "dietary_preferences": ["vegetarian"],
+    },
+    {
+        "age": 52, "weight_lbs": 210, "height_feet": 6, "height_inches": 1,
+        "gender": "other", "fitness_goal": "maintain", "activity_level": "sedentary",
+        "workout_days_per_week": 2, "workout_duration_minutes": 30,
+        "available_equipment": [], "dietary_preferences": ["gluten-free"],
+    },
+]
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values) -> dict:
+    """p50/p95/p99/mean of a list of numbers"""
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": round(statistics.fmean(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+    }
+
+
+def print_table(rows: list, columns: list):
+    """Fixed-width table for terminal output"""
+    widths = {col: max(len(col), *(len(str(row.get(col, ""))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col, "")).ljust(widths[col]) for col in columns))
+
+
+def write_json(path: str, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
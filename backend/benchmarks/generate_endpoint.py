@@ -0,0 +1,217 @@
+# backend/benchmarks/generate_endpoint.py
+# Load test the plan generation endpoints against the local AgentCore
+# stand-in (benchmarks/agentcore_standin.py): no AWS, no Postgres.
+#
+# The API runs under uvicorn on a throwaway SQLite database; each request
+# belongs to a different user so single-flight coalescing and the plan
+# cache don't hide the work. Reports end-to-end p50/p95/p99, throughput
+# and our own overhead (latency minus the simulated runtime time).
+#
+#   python -m benchmarks.generate_endpoint --requests 200 --concurrency 20
+#   python -m benchmarks.generate_endpoint --endpoint stream --tokens-per-second 400
+#   python -m benchmarks.generate_endpoint --runtime agent --mode single_pass
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app modules read their configuration
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+os.environ.setdefault("AGENTCORE_AGENT_ARN", "arn:aws:bedrock-agentcore:us-east-1:000000000000:runtime/standin")
+os.environ.setdefault("PLAN_CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "standin")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "standin")
+
+import httpx
+import uvicorn
+
+from benchmarks.agentcore_standin import StandinConfig, install_agentcore_standin, build_fake_model
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.api.auth import create_access_token
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.models import User, UserProfile
+
+
+def create_users(count: int) -> list:
+    """Users with completed profiles; returns bearer tokens"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    tokens = []
+    try:
+        for i in range(count):
+            profile = SAMPLE_PROFILES[i % len(SAMPLE_PROFILES)]
+            user = User(id=str(uuid.uuid4()), user_name=f"bench-{uuid.uuid4().hex[:12]}", password="x")
+            db.add(user)
+            db.add(UserProfile(
+                id=str(uuid.uuid4()), user_id=user.id, age=profile["age"], weight=profile["weight_lbs"],
+                height_feet=profile["height_feet"], height_inches=profile["height_inches"],
+                gender=profile["gender"], fitness_goal=profile["fitness_goal"],
+                activity_level=profile["activity_level"],
+                workout_days_per_week=profile["workout_days_per_week"],
+                workout_duration_minutes=profile["workout_duration_minutes"],
+                available_equipment=profile["available_equipment"],
+                dietary_preferences=profile["dietary_preferences"],
+            ))
+            tokens.append(create_access_token({"sub": user.user_name}))
+        db.commit()
+    finally:
+        db.close()
+    return tokens
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def agent_runtime_handler(config: StandinConfig, mode: str):
+    """Run the real AgentCore entry point on the fake Strands model"""
+    from app.agent import fitness_agent_standalone as runtime
+
+    runtime.agent_pool = runtime.AgentPool(size=runtime.agent_pool.size, model=build_fake_model(config))
+    return lambda payload: runtime.invoke(dict(payload, mode=mode), None)
+
+
+### Request kinds ###
+
+def call_generate(client: httpx.Client, headers: dict) -> dict:
+    start = time.perf_counter()
+    response = client.get("/agent/generate-plan", headers=headers)
+    return {"ok": response.status_code == 200, "latency_ms": (time.perf_counter() - start) * 1000}
+
+
+def call_stream(client: httpx.Client, headers: dict) -> dict:
+    start = time.perf_counter()
+    first_event_ms = None
+    ok = False
+    with client.stream("GET", "/agent/generate-plan/stream", headers=headers) as response:
+        for line in response.iter_lines():
+            if first_event_ms is None and line.startswith("event:") and "progress" not in line:
+                first_event_ms = (time.perf_counter() - start) * 1000
+            if line == "event: plan":
+                ok = True
+            elif line == "event: error":
+                ok = False
+    return {"ok": ok, "latency_ms": (time.perf_counter() - start) * 1000, "first_event_ms": first_event_ms}
+
+
+def call_jobs(client: httpx.Client, headers: dict) -> dict:
+    start = time.perf_counter()
+    response = client.post("/agent/plan-jobs", headers=headers)
+    if response.status_code != 202:
+        return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000}
+    job_id = response.json()["job_id"]
+    while True:
+        job = client.get(f"/agent/plan-jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.02)
+    return {"ok": job["status"] == "done", "latency_ms": (time.perf_counter() - start) * 1000}
+
+
+ENDPOINTS = {"generate": call_generate, "stream": call_stream, "jobs": call_jobs}
+
+
+def run(args) -> dict:
+    config = StandinConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, output_tokens=args.output_tokens,
+        tokens_per_second=args.tokens_per_second, chunk_size=args.chunk_size,
+        content_type=args.content_type, error_rate=args.error_rate, error_kind=args.error_kind, seed=args.seed,
+    )
+    if args.runtime == "agent":
+        # Model timing lives in the fake model; the transport adds nothing
+        transport = StandinConfig(chunk_size=args.chunk_size, content_type=args.content_type, latency_ms=0)
+        standin = install_agentcore_standin(transport, handler=agent_runtime_handler(config, args.mode))
+    else:
+        standin = install_agentcore_standin(config)
+
+    tokens = create_users(args.requests + args.warmup)
+    server = start_server(args.port)
+    call = ENDPOINTS[args.endpoint]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=600, limits=limits) as client:
+            for token in tokens[:args.warmup]:
+                call(client, {"Authorization": f"Bearer {token}"})
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                results = list(pool.map(
+                    lambda token: call(client, {"Authorization": f"Bearer {token}"}),
+                    tokens[args.warmup:],
+                ))
+            wall_s = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+
+    latencies = [r["latency_ms"] for r in results if r["ok"]]
+    # What the stand-in itself spent per call; everything else is ours
+    simulated_ms = config.latency_ms + config.generation_seconds() * 1000
+    report = {
+        "endpoint": args.endpoint,
+        "runtime": args.runtime,
+        "content_type": args.content_type,
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "errors": sum(1 for r in results if not r["ok"]),
+        "throughput_rps": round(len(results) / wall_s, 2),
+        "latency_ms": summarize(latencies),
+        "overhead_ms": summarize([latency - simulated_ms for latency in latencies]) if args.runtime == "canned" else None,
+        "standin": standin.stats,
+        "config": vars(config),
+    }
+    first_events = [r["first_event_ms"] for r in results if r.get("first_event_ms") is not None]
+    if first_events:
+        report["first_event_ms"] = summarize(first_events)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="generate")
+    parser.add_argument("--runtime", choices=["canned", "agent"], default="canned",
+                        help="canned plans, or the real AgentCore entry point on a fake model")
+    parser.add_argument("--mode", default="precomputed", help="generation mode for --runtime agent")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--output-tokens", type=int, default=1500)
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--content-type", choices=["auto", "sse", "json"], default="auto")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-kind", choices=["throttle", "timeout", "stream", "runtime"], default="throttle")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    row = {"endpoint": report["endpoint"], "requests": report["requests"], "errors": report["errors"],
+           "rps": report["throughput_rps"]}
+    for pct in ("p50", "p95", "p99"):
+        row[f"{pct}_ms"] = report["latency_ms"].get(pct)
+    if report["overhead_ms"]:
+        row["overhead_p50_ms"] = report["overhead_ms"].get("p50")
+    if "first_event_ms" in report:
+        row["first_event_p50_ms"] = report["first_event_ms"].get("p50")
+    print_table([row], list(row))
+    if args.out:
+        write_json(args.out, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# backend/benchmarks/generation_modes.py
+# Compare plan generation modes (tools / precomputed / single_pass / fan_out) on the
+# local Strands FitnessAgent: model round trips, planning tokens, latency
+# and how often the one-shot output validates without falling back.
+# Input tokens exclude the prompt prefix served from the Bedrock cache;
+# run with BEDROCK_PROMPT_CACHING=false to compare against no caching.
+#
+# Needs Bedrock access (AWS credentials + AWS_BEDROCK_MODEL_ID).
+#   python -m benchmarks.generation_modes --runs 3 --out modes.json
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.agent.fitness_agent import FitnessAgent, TOOLS_MODE, PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE, check_plan_complete
+from app.schemas.agent_schemas import PlanGenerationResponse
+
+
+def run_mode(agent: FitnessAgent, mode: str, runs: int) -> dict:
+    latencies, calls, input_tokens, output_tokens, cache_read, cache_write = [], [], [], [], [], []
+    valid = fallbacks = 0
+    for i in range(runs):
+        for profile in SAMPLE_PROFILES:
+            # Fresh conversation per run so earlier turns don't inflate tokens
+            agent.agent.messages = []
+            agent.planner.messages = []
+            plan = agent.generate_fitness_plan(profile, mode=mode)
+            usage = agent.last_usage
+            try:
+                check_plan_complete(PlanGenerationResponse(**plan))
+                valid += 1
+            except Exception:
+                pass
+            if "error" in usage:
+                continue
+            fallbacks += usage.get("fallback", False)
+            latencies.append(usage["latency_ms"])
+            calls.append(usage["model_calls"])
+            input_tokens.append(usage["input_tokens"])
+            output_tokens.append(usage["output_tokens"])
+            cache_read.append(usage["cache_read_input_tokens"])
+            cache_write.append(usage["cache_write_input_tokens"])
+
+    attempts = runs * len(SAMPLE_PROFILES)
+    return {
+        "mode": mode,
+        "attempts": attempts,
+        "valid_rate": round(valid / attempts, 3),
+        "fallbacks": fallbacks,
+        "model_calls": summarize(calls).get("mean"),
+        "input_tokens": summarize(input_tokens).get("mean"),
+        "output_tokens": summarize(output_tokens).get("mean"),
+        "cache_read_tokens": summarize(cache_read).get("mean"),
+        "cache_write_tokens": summarize(cache_write).get("mean"),
+        "latency_p50_ms": summarize(latencies).get("p50"),
+        "latency_p95_ms": summarize(latencies).get("p95"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=1, help="passes over the sample profiles per mode")
+    parser.add_argument("--modes", nargs="+", default=[TOOLS_MODE, PRECOMPUTED_MODE, SINGLE_PASS_MODE, FAN_OUT_MODE])
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    agent = FitnessAgent()
+    results = [run_mode(agent, mode, args.runs) for mode in args.modes]
+    print_table(results, list(results[0].keys()))
+    if args.out:
+        write_json(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/benchmarks/health_batch.py
+# The vectorized batch engine (app/utils/health_batch.py) against calling
+# the scalar health_calculations functions once per profile, on random
+# profiles. Every batch result is compared field by field with the scalar
+# result; --endpoint also times POST /tools/batch end to end (parse,
+# compute, stream) for NDJSON and columnar input.
+#
+#   python -m benchmarks.health_batch --sizes 1000 10000 50000
+#   python -m benchmarks.health_batch --sizes 20000 --endpoint
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, write_json
+from app.utils.health_batch import RESULT_COLUMNS, compute_batch
+from app.agent.health_calculations import calculate_bmi, calculate_bmr, calculate_macros, calculate_tdee, normalize_goal
+
+GENDERS = ["male", "female", "other", "Male"]
+ACTIVITY = ["sedentary", "light", "moderate", "active", "very_active", "unknown"]
+GOALS = ["lose-weight", "gain-weight", "maintain", "lose_weight", None]
+
+
+def random_profiles(n: int, rng: random.Random) -> list:
+    return [{
+        "weight_lbs": rng.choice([rng.randint(90, 350), round(rng.uniform(90, 350), 1)]),
+        "height_feet": rng.randint(4, 7),
+        "height_inches": rng.choice([rng.randint(0, 11), round(rng.uniform(0, 11.9), 1)]),
+        "age": rng.randint(13, 90),
+        "gender": rng.choice(GENDERS),
+        "activity_level": rng.choice(ACTIVITY),
+        "fitness_goal": rng.choice(GOALS),
+    } for _ in range(n)]
+
+
+def scalar_row(profile: dict) -> dict:
+    """What the per-profile functions return, in the batch engine's columns"""
+    bmi = calculate_bmi(profile["weight_lbs"], profile["height_feet"], profile["height_inches"])
+    bmr = calculate_bmr(profile["weight_lbs"], profile["height_feet"], profile["height_inches"],
+                        profile["age"], profile["gender"])
+    tdee = calculate_tdee(bmr["bmr"], profile["activity_level"])
+    goal = normalize_goal(profile["fitness_goal"])
+    return {"bmi": bmi["bmi"], "bmi_category": bmi["category"], "bmr": bmr["bmr"], "tdee": tdee["tdee"],
+            "goal": goal, **calculate_macros(tdee["tdee"], goal, profile["weight_lbs"])}
+
+
+def mismatches(profiles: list, expected: list, result: dict) -> int:
+    columns = {name: result[name].tolist() for name in RESULT_COLUMNS}
+    return sum(any(columns[name][i] != row[name] for name in RESULT_COLUMNS) for i, row in enumerate(expected))
+
+
+def time_endpoint(profiles: list) -> dict:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    ndjson = "".join(json.dumps(profile) + "\n" for profile in profiles).encode()
+    columns = {name: [profile[name] for profile in profiles] for name in profiles[0]}
+    timings = {}
+    for label, kwargs in {
+        "ndjson": {"content": ndjson, "headers": {"content-type": "application/x-ndjson"}},
+        "columnar": {"json": columns},
+    }.items():
+        start = time.perf_counter()
+        response = client.post("/tools/batch", **kwargs)
+        lines = response.text.count("\n")
+        timings[label] = {"ms": (time.perf_counter() - start) * 1000, "status": response.status_code, "lines": lines}
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--endpoint", action="store_true", help="also time POST /tools/batch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = []
+    for size in args.sizes:
+        profiles = random_profiles(size, rng)
+        columns = {name: [profile[name] for profile in profiles] for name in profiles[0]}
+
+        start = time.perf_counter()
+        expected = [scalar_row(profile) for profile in profiles]
+        scalar_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        result = compute_batch(columns)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        row = {
+            "profiles": size,
+            "scalar_ms": round(scalar_ms, 1),
+            "batch_ms": round(batch_ms, 1),
+            "speedup": round(scalar_ms / batch_ms, 1),
+            "mismatches": mismatches(profiles, expected, result),
+        }
+        if args.endpoint:
+            for label, timing in time_endpoint(profiles).items():
+                row[f"{label}_endpoint_ms"] = round(timing["ms"], 1)
+        rows.append(row)
+
+    print_table(rows, list(rows[0]))
+    if args.out:
+        write_json(args.out, {"runs": rows})
+    if any(row["mismatches"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# backend/benchmarks/hot_paths.py
+# Regression suite for the API hot paths: the pure calculators, the
+# /tools endpoints, login (/auth/token, password hashing), /auth/me and
+# get_current_user (JWT decode + user lookup, or the auth cache), profile
+# upsert and get-plan deserialization.
+# Requests go through the ASGI app in process on a throwaway SQLite
+# database, so the numbers are our own overhead with no network.
+#
+# Each case reports the best time per call over --repeat rounds (as timeit
+# does: slower rounds are interference, not the code) and is compared
+# with the stored baseline; the run fails (exit 1) when a case is
+# more than --threshold slower. Baselines are per machine: re-record them
+# with --save-baseline after an intended change or on new hardware.
+#
+#   python -m benchmarks.hot_paths
+#   python -m benchmarks.hot_paths --only auth --threshold 0.5
+#   python -m benchmarks.hot_paths --save-baseline
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import create_users  # also points the app at a temp database
+from benchmarks.agentcore_standin import sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, write_json
+
+import jwt
+from fastapi.testclient import TestClient
+
+from app.api.auth import ALGORITHM, SECRET_KEY, get_current_user
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import User
+from app.schemas.agent_schemas import MealPlan, PlanGenerationResponse, WorkoutPlan
+from app.services.password_pool import hash_password, verify_password
+from app.services.plan_versions import store_plan
+from app.agent.health_calculations import (calculate_bmi, calculate_bmr, calculate_macros, calculate_tdee,
+                                           compute_health_metrics)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+PROFILE = SAMPLE_PROFILES[0]
+PASSWORD = "benchmark-password-1"
+
+
+### Fixtures ###
+
+def setup_user(client: TestClient) -> dict:
+    """A registered user (real password hash) with a profile and a saved plan"""
+    create_users(0)  # creates the tables
+    username = f"hot-{os.urandom(6).hex()}"
+    token = client.post("/auth/register", json={"username": username, "password": PASSWORD}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    profile = {"age": PROFILE["age"], "weight": PROFILE["weight_lbs"], "height_feet": PROFILE["height_feet"],
+               "height_inches": PROFILE["height_inches"], "gender": PROFILE["gender"],
+               "fitness_goal": PROFILE["fitness_goal"], "activity_level": PROFILE["activity_level"],
+               "workout_days_per_week": PROFILE["workout_days_per_week"],
+               "workout_duration_minutes": PROFILE["workout_duration_minutes"],
+               "available_equipment": PROFILE["available_equipment"],
+               "dietary_preferences": PROFILE["dietary_preferences"]}
+    client.post("/profile/", json=profile, headers=headers)
+
+    plan = sample_plan(PROFILE)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.user_name == username).first()
+        store_plan(db, user.id, {key: plan[key] for key in ("health_metrics", "workout_plan", "meal_plan", "tips")})
+        password = user.password
+    finally:
+        db.close()
+    return {"username": username, "token": token, "headers": headers, "profile": profile, "plan": plan,
+            "password_hash": password}
+
+
+def build_cases(client: TestClient, user: dict) -> dict:
+    """name -> zero-argument callable doing one operation"""
+    p = PROFILE
+    tools_body = {"weight_lbs": p["weight_lbs"], "height_feet": p["height_feet"], "height_inches": p["height_inches"],
+                  "age": p["age"], "gender": p["gender"], "activity_level": p["activity_level"], "goal": "lose_weight"}
+    plan = user["plan"]
+    db = SessionLocal()
+
+    def ok(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url.path} -> "
+                               f"{response.status_code}: {response.text[:200]}")
+        return response
+
+    return {
+        "calc.bmi": lambda: calculate_bmi(p["weight_lbs"], p["height_feet"], p["height_inches"]),
+        "calc.bmr": lambda: calculate_bmr(p["weight_lbs"], p["height_feet"], p["height_inches"], p["age"], p["gender"]),
+        "calc.tdee": lambda: calculate_tdee(1750, p["activity_level"]),
+        "calc.macros": lambda: calculate_macros(2700, "lose_weight", p["weight_lbs"]),
+        "calc.health_metrics": lambda: compute_health_metrics(p),
+        "tools.bmi": lambda: ok(client.post("/tools/bmi", json=tools_body)),
+        "tools.bmr": lambda: ok(client.post("/tools/bmr", json=tools_body)),
+        "tools.tdee": lambda: ok(client.post("/tools/tdee", json={"bmr": 1750, "activity_level": "moderate"})),
+        "tools.macros": lambda: ok(client.post("/tools/macros", json={"tdee": 2700, "goal": "lose_weight",
+                                                                      "weight_lbs": p["weight_lbs"]})),
+        "tools.metrics": lambda: ok(client.post("/tools/metrics", json=tools_body)),
+        "auth.hash_password": lambda: hash_password(PASSWORD),
+        "auth.verify_password": lambda: verify_password(PASSWORD, user["password_hash"]),
+        "auth.jwt_decode": lambda: jwt.decode(user["token"], SECRET_KEY, algorithms=[ALGORITHM]),
+        "auth.current_user": lambda: get_current_user(user["token"], db),
+        "auth.token": lambda: ok(client.post("/auth/token", data={"username": user["username"], "password": PASSWORD})),
+        "auth.me": lambda: ok(client.get("/auth/me", headers=user["headers"])),
+        "profile.upsert": lambda: ok(client.post("/profile/", json=user["profile"], headers=user["headers"])),
+        "plan.deserialize": lambda: PlanGenerationResponse(
+            health_metrics=plan["health_metrics"], workout_plan=WorkoutPlan(**plan["workout_plan"]),
+            meal_plan=MealPlan(**plan["meal_plan"]), tips=plan["tips"]),
+        "plan.get_plan": lambda: ok(client.get("/agent/get-plan", headers=user["headers"])),
+    }
+
+
+### Timing ###
+
+def time_case(fn, repeat: int, round_seconds: float) -> float:
+    """Best microseconds per call over `repeat` rounds of ~round_seconds each"""
+    fn()  # warm up (imports, caches, connections)
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_seconds / 4 or calls >= 1 << 20:
+            break
+        calls *= 2
+    calls = max(1, int(calls * round_seconds / max(elapsed, 1e-9)))
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        rounds.append((time.perf_counter() - start) / calls * 1e6)
+    return min(rounds)
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_us: float) -> list:
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        row = {"case": name, "baseline_us": base if base is not None else "-", "current_us": round(current, 1)}
+        if base is None:
+            row.update(change="-", status="new")
+        else:
+            change = current / base - 1
+            regressed = change > threshold and current - base > min_delta_us
+            row.update(change=f"{change:+.0%}", status="REGRESSION" if regressed else "ok")
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("HOT_PATHS_THRESHOLD", "0.25")),
+                        help="allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--min-delta-us", type=float, default=2.0,
+                        help="ignore slowdowns smaller than this many microseconds (timer noise)")
+    parser.add_argument("--only", help="run cases whose name starts with this prefix")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--round-seconds", type=float, default=0.2)
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="re-time a case that looks regressed up to this many times before failing it")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    # Keep request logging out of the report (it is still paid for, as in production)
+    with contextlib.redirect_stdout(io.StringIO()):
+        user = setup_user(client)
+    cases = {name: fn for name, fn in build_cases(client, user).items()
+             if not args.only or name.startswith(args.only)}
+
+    results = {}
+    for name, fn in cases.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = time_case(fn, args.repeat, args.round_seconds)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("cases", {})
+    rows = compare(results, baseline, args.threshold, args.min_delta_us)
+    # A slow round from a noisy neighbour shouldn't fail the run: keep the best of a few re-timings
+    for _ in range(args.confirm if not args.save_baseline else 0):
+        suspects = [row["case"] for row in rows if row["status"] == "REGRESSION"]
+        if not suspects:
+            break
+        for name in suspects:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = min(results[name], time_case(cases[name], args.repeat, args.round_seconds))
+        rows = compare(results, baseline, args.threshold, args.min_delta_us)
+    print_table(rows, ["case", "baseline_us", "current_us", "change", "status"])
+
+    if args.out:
+        write_json(args.out, {"cases": results, "comparison": rows})
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        write_json(args.baseline, {
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "cases": {**baseline, **{name: round(value, 2) for name, value in results.items()}},
+        })
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = [row["case"] for row in rows if row["status"] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# backend/benchmarks/import_time.py
+# Cold start of the API process: how long `import app.main` takes in a
+# fresh interpreter, and which top-level packages it pulls in, from
+# `python -X importtime`. With --ref the same is measured for another
+# commit (extracted with git archive), e.g. the tree before a change:
+#
+#   python -m benchmarks.import_time --runs 5
+#   python -m benchmarks.import_time --ref HEAD~1 --top 12
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, write_json
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+WATCHED = ("strands", "bedrock_agentcore", "opentelemetry", "mcp", "boto3", "numpy")
+
+
+def run_import(tree: str, module: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [tree, env.get("PYTHONPATH")]))
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "import_time.db"))
+    env.setdefault("SECRET_KEY", "benchmark")
+    return subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+                          cwd=tree, env=env, capture_output=True, text=True)
+
+
+def measure(tree: str, module: str, runs: int) -> dict:
+    """
+    Median -X importtime total over `runs` fresh interpreters, plus the time
+    spent in each top-level package's own modules (self time) in the last
+    """
+    totals, packages = [], {}
+    for _ in range(runs):
+        result = run_import(tree, module)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed in {tree}:\n{result.stderr[-2000:]}")
+        packages = {}
+        for self_us, name in IMPORTTIME_LINE.findall(result.stderr):
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + int(self_us)
+        totals.append(sum(packages.values()))
+    return {"total_ms": statistics.median(totals) / 1000, "packages": packages}
+
+
+def extract_ref(ref: str, target: str) -> str:
+    """The backend directory as of `ref`"""
+    root = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BACKEND, capture_output=True,
+                          text=True, check=True).stdout.strip()
+    prefix = os.path.relpath(BACKEND, root)
+    archive = subprocess.run(["git", "archive", ref, prefix], cwd=root, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+    return os.path.join(target, prefix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ref", help="also measure this git commit, e.g. HEAD~1")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level packages to list")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = {"current": BACKEND}
+        if args.ref:
+            trees = {args.ref: extract_ref(args.ref, tmp), **trees}
+        results = {label: measure(tree, args.module, args.runs) for label, tree in trees.items()}
+
+    rows = [{
+        "tree": label,
+        "import_ms": round(result["total_ms"], 1),
+        "packages": len(result["packages"]),
+        **{name: "yes" if name in result["packages"] else "-" for name in WATCHED},
+    } for label, result in results.items()]
+    print_table(rows, list(rows[0]))
+
+    for label, result in results.items():
+        slowest = sorted(result["packages"].items(), key=lambda item: -item[1])[:args.top]
+        print(f"\n{label}: packages {args.module} spends the most time importing")
+        print_table([{"package": name, "self_ms": round(us / 1000, 1)} for name, us in slowest],
+                    ["package", "self_ms"])
+
+    if args.out:
+        write_json(args.out, {"summary": rows, "packages": {label: r["packages"] for label, r in results.items()}})
+
+
+if __name__ == "__main__":
+    main()
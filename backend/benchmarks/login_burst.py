@@ -0,0 +1,149 @@
+# backend/benchmarks/login_burst.py
+# Login bursts against POST /auth/token at increasing concurrency, with
+# password hashing in the process pool (app/services/password_pool.py)
+# and inline on the request threads (PASSWORD_HASH_WORKERS=0). For each
+# level: login throughput, latency, requests shed with 503, and the
+# latency of a bystander endpoint (GET /auth/me) polled during the burst,
+# which shows whether logins starve the rest of the API.
+#
+# The API runs under uvicorn in this process on a throwaway SQLite
+# database; the load generator shares its interpreter (and GIL), as a
+# proxy for the other requests a worker serves.
+#
+#   python -m benchmarks.login_burst --concurrency 1 4 16 64 --requests 64
+#   python -m benchmarks.login_burst --modes pool --workers 4 --max-pending 8
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import start_server  # also points the app at a temp database
+
+import httpx
+
+from benchmarks.common import print_table, summarize, write_json
+from app.api.auth import create_access_token
+from app.database import Base, SessionLocal, engine
+from app.models.models import User
+from app.services.password_pool import hash_password, password_pool
+
+PASSWORD = "burst-password-1"
+
+
+def create_login_users(count: int) -> list:
+    """Users sharing one real password hash; returns their names"""
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password(PASSWORD)
+    names = [f"burst-{uuid.uuid4().hex[:12]}" for _ in range(count)]
+    db = SessionLocal()
+    try:
+        db.add_all([User(id=str(uuid.uuid4()), user_name=name, password=hashed) for name in names])
+        db.commit()
+    finally:
+        db.close()
+    return names
+
+
+def configure_pool(workers: int, max_pending: int, timeout_seconds: float):
+    password_pool.shutdown(wait=True)
+    password_pool.workers = workers
+    password_pool.max_pending = max_pending
+    password_pool.timeout_seconds = timeout_seconds
+    password_pool.start()
+
+
+async def burst(base_url: str, names: list, requests: int, concurrency: int, bystander_token: str) -> dict:
+    """`requests` logins, at most `concurrency` at a time, while polling /auth/me"""
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses, retry_after = [], {}, []
+
+        async def login(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/auth/token", data={"username": names[i % len(names)],
+                                                                  "password": PASSWORD})
+                elapsed = (time.perf_counter() - start) * 1000
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            elif response.status_code == 503:
+                retry_after.append(int(response.headers.get("retry-after", 0)))
+
+        bystander, done = [], asyncio.Event()
+
+        async def poll_me():
+            headers = {"Authorization": f"Bearer {bystander_token}"}
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/auth/me", headers=headers)
+                bystander.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.02)
+
+        poller = asyncio.create_task(poll_me())
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await poller
+
+    login_stats, me_stats = summarize(latencies), summarize(bystander)
+    return {
+        "ok": statuses.get(200, 0),
+        "shed_503": statuses.get(503, 0),
+        "other": sum(count for code, count in statuses.items() if code not in (200, 503)),
+        "logins_per_s": round(statuses.get(200, 0) / elapsed, 1),
+        "login_p50_ms": login_stats.get("p50", "-"),
+        "login_p95_ms": login_stats.get("p95", "-"),
+        "me_p50_ms": me_stats.get("p50", "-"),
+        "me_p95_ms": me_stats.get("p95", "-"),
+        "max_retry_after": max(retry_after, default="-"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="logins per concurrency level")
+    parser.add_argument("--modes", nargs="+", choices=["pool", "inline"], default=["inline", "pool"])
+    parser.add_argument("--workers", type=int, default=password_pool.workers or 2, help="pool processes")
+    parser.add_argument("--max-pending", type=int, default=password_pool.max_pending)
+    parser.add_argument("--timeout", type=float, default=password_pool.timeout_seconds)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    names = create_login_users(min(args.requests, 100))
+    bystander_token = create_access_token({"sub": names[0]})
+    server = start_server(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    rows = []
+    try:
+        for mode in args.modes:
+            # Inline keeps the admission limit and timeout, so only where hashing runs differs
+            configure_pool(args.workers if mode == "pool" else 0, args.max_pending, args.timeout)
+            asyncio.run(burst(base_url, names, 2, 2, bystander_token))  # warm up
+            for concurrency in args.concurrency:
+                result = asyncio.run(burst(base_url, names, args.requests, concurrency, bystander_token))
+                rows.append({"mode": mode, "concurrency": concurrency, **result})
+                print(f"{mode} x{concurrency}: {result['logins_per_s']} logins/s, "
+                      f"{result['shed_503']} shed", flush=True)
+    finally:
+        server.should_exit = True
+        password_pool.shutdown(wait=True)
+
+    print()
+    print_table(rows, list(rows[0]))
+    if args.out:
+        write_json(args.out, {"runs": rows, "workers": args.workers, "max_pending": args.max_pending,
+                              "timeout_seconds": args.timeout, "cpus": os.cpu_count()})
+
+
+if __name__ == "__main__":
+    main()
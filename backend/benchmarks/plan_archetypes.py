@@ -0,0 +1,97 @@
+# backend/benchmarks/plan_archetypes.py
+# Archetype library lookups: nearest-neighbour search and the deterministic
+# macro adjustment, on a synthetic library covering every goal x activity
+# x equipment x days bucket. Also reports how many random profiles would
+# be served directly, personalized, or sent to full generation (the library
+# has no dietary preferences, so users with any are never served).
+#
+#   python -m benchmarks.plan_archetypes --profiles 2000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.agentcore_standin import sample_plan
+from benchmarks.common import print_table, summarize, write_json
+from app.schemas.agent_schemas import PlanGenerationResponse
+from app.services.plan_archetypes import ACTIVITY_LEVELS, SERVE, PERSONALIZE, build_library
+
+GOALS = ["lose-weight", "gain-weight", "maintain"]
+EQUIPMENT_SETS = [[], ["dumbbells"], ["dumbbells", "bench"], ["barbell", "squat rack", "bench"]]
+DIETS = [[], [], [], ["vegetarian"], ["gluten-free"]]
+
+
+def random_profile(rng: random.Random) -> dict:
+    return {
+        "age": rng.randint(18, 70), "weight_lbs": rng.randint(110, 280),
+        "height_feet": rng.randint(4, 6), "height_inches": rng.randint(0, 11),
+        "gender": rng.choice(["male", "female"]), "fitness_goal": rng.choice(GOALS),
+        "activity_level": rng.choice(ACTIVITY_LEVELS),
+        "workout_days_per_week": rng.randint(2, 6),
+        "workout_duration_minutes": rng.choice([30, 45, 60, 75]),
+        "available_equipment": rng.choice(EQUIPMENT_SETS + [["kettlebell"], ["dumbbells", "pull-up bar"]]),
+        "dietary_preferences": rng.choice(DIETS),
+    }
+
+
+def library_rows(rng: random.Random):
+    for goal in GOALS:
+        for activity in ACTIVITY_LEVELS:
+            for equipment in EQUIPMENT_SETS:
+                for days in range(2, 7):
+                    profile = dict(random_profile(rng), fitness_goal=goal, activity_level=activity,
+                                   available_equipment=equipment, workout_days_per_week=days,
+                                   workout_duration_minutes=45, dietary_preferences=[])
+                    yield profile, PlanGenerationResponse(**sample_plan(profile))
+
+
+def timed(fn, items) -> list:
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    library = build_library(library_rows(rng))
+    build_ms = round((time.perf_counter() - start) * 1000, 1)
+    profiles = [random_profile(rng) for _ in range(args.profiles)]
+
+    nearest = summarize(timed(library.nearest, profiles))
+    served = []
+    match = summarize(timed(lambda profile: served.append(library.match(profile, mode=SERVE)[0]), profiles))
+    personalized = [library.match(profile, mode=PERSONALIZE)[0] for profile in profiles]
+
+    rows = [
+        {"operation": "nearest", **{k: nearest[k] for k in ("p50", "p95", "p99")}},
+        {"operation": "match+adjust", **{k: match[k] for k in ("p50", "p95", "p99")}},
+    ]
+    report = {
+        "archetypes": len(library),
+        "build_ms": build_ms,
+        "latency_ms": rows,
+        "served_rate": round(served.count(SERVE) / len(profiles), 3),
+        "personalize_rate": round(personalized.count(PERSONALIZE) / len(profiles), 3),
+    }
+    print(f"Library: {len(library)} archetypes built in {build_ms}ms")
+    print_table(rows, ["operation", "p50", "p95", "p99"])
+    print(f"Served directly: {report['served_rate']:.1%}  within personalize distance: {report['personalize_rate']:.1%}")
+    if args.out:
+        write_json(args.out, report)
+
+
+if __name__ == "__main__":
+    main()
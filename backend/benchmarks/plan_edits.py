@@ -0,0 +1,109 @@
+# backend/benchmarks/plan_edits.py
+# Partial edits (app/services/plan_edits.py) against regenerating the whole
+# plan, on the in-process model stand-in and a throwaway SQLite database.
+# The stand-in answers at a fixed speed, so besides the measured overhead
+# the report models generation time from the output size at
+# --tokens-per-second (what dominates with a real model).
+#
+#   python -m benchmarks.plan_edits --edits 20
+#   python -m benchmarks.plan_edits --tokens-per-second 40
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import create_users  # also points the app at a temp database
+from benchmarks.agentcore_standin import StandinConfig, build_fake_model, sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.agent.fitness_agent import FitnessAgent, SINGLE_PASS_MODE
+from app.database import SessionLocal
+from app.models.models import FitnessPlan, PlanChange, User
+from app.services import plan_generation
+from app.services.plan_edits import regenerate_meal, regenerate_workout_day
+
+
+def create_user_with_plan() -> str:
+    create_users(1)
+    db = SessionLocal()
+    try:
+        user = db.query(User).order_by(User.created.desc()).first()
+        plan = sample_plan(SAMPLE_PROFILES[0])
+        db.add(FitnessPlan(id=str(uuid.uuid4()), user_id=user.id, workout_plan=plan["workout_plan"],
+                           meal_plan=plan["meal_plan"], health_metrics=plan["health_metrics"], tips=plan["tips"]))
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def output_tokens(data) -> int:
+    """~4 characters per token of the JSON the model has to write"""
+    return len(json.dumps(data, default=str, separators=(",", ":"))) // 4
+
+
+def timed_edit(fn, user_id: str, target: str) -> dict:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        change = fn(db, user_id, target, "something different")
+        return {"ms": (time.perf_counter() - start) * 1000, "input_tokens": change.usage.get("input_tokens", 0),
+                "output_tokens": output_tokens(change.after)}
+    finally:
+        db.close()
+
+
+def timed_full(agent: FitnessAgent) -> dict:
+    start = time.perf_counter()
+    plan = agent.generate_fitness_plan(SAMPLE_PROFILES[0], mode=SINGLE_PASS_MODE)
+    plan = {key: value.model_dump() if hasattr(value, "model_dump") else value for key, value in plan.items()}
+    return {"ms": (time.perf_counter() - start) * 1000, "input_tokens": agent.last_usage.get("input_tokens", 0),
+            "output_tokens": output_tokens(plan)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edits", type=int, default=20, help="runs per kind")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="model output speed for the estimate")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    model = build_fake_model(StandinConfig(latency_ms=args.latency_ms, seed=1))
+    plan_generation._local_agent = FitnessAgent(model=model)
+    user_id = create_user_with_plan()
+
+    kinds = {
+        "full_plan": lambda: timed_full(FitnessAgent(model=model)),
+        "workout_day": lambda: timed_edit(regenerate_workout_day, user_id, "monday"),
+        "meal": lambda: timed_edit(regenerate_meal, user_id, "lunch"),
+    }
+    rows, raw = [], {}
+    for kind, run in kinds.items():
+        results = [run() for _ in range(args.edits)]
+        raw[kind] = results
+        out_tokens = round(sum(r["output_tokens"] for r in results) / len(results))
+        rows.append({
+            "kind": kind,
+            "p50_ms": summarize([r["ms"] for r in results])["p50"],
+            "input_tokens": round(sum(r["input_tokens"] for r in results) / len(results)),
+            "output_tokens": out_tokens,
+            "est_generation_s": round(out_tokens / args.tokens_per_second, 1),
+        })
+    print_table(rows, list(rows[0]))
+
+    db = SessionLocal()
+    try:
+        print(f"PlanChange rows recorded: {db.query(PlanChange).filter(PlanChange.user_id == user_id).count()}")
+    finally:
+        db.close()
+
+    if args.out:
+        write_json(args.out, {"summary": rows, "runs": raw})
+
+
+if __name__ == "__main__":
+    main()
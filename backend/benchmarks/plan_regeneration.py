@@ -0,0 +1,76 @@
+# backend/benchmarks/plan_regeneration.py
+# Throughput of the bulk regeneration CLI (app/services/plan_regeneration.py)
+# against the AgentCore stand-in on a throwaway SQLite database: plans per
+# minute at a few concurrency levels, with and without a tokens-per-minute
+# budget, and a stop/resume run to check the checkpoint.
+#
+#   python -m benchmarks.plan_regeneration --users 200 --concurrency 1 8 32
+#   python -m benchmarks.plan_regeneration --tokens-per-minute 600000 --error-rate 0.05
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import create_users  # also points the app at a temp database
+from benchmarks.agentcore_standin import StandinConfig, install_agentcore_standin
+from benchmarks.common import print_table, write_json
+from app.database import SessionLocal
+from app.models.models import FitnessPlan
+from app.services import plan_regeneration
+from app.services.plan_regeneration import Checkpoint, PlanRegenerator
+
+
+def stored_plans() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(FitnessPlan).count()
+    finally:
+        db.close()
+
+
+def run_once(concurrency: int, tokens_per_minute: int, limit: int = None, checkpoint: Checkpoint = None) -> dict:
+    regenerator = PlanRegenerator(concurrency=concurrency, tokens_per_minute=tokens_per_minute,
+                                  tokens_per_plan=2000, batch_size=25, checkpoint=checkpoint,
+                                  report_every=5, limit=limit)
+    return asyncio.run(regenerator.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--tokens-per-minute", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    standin = install_agentcore_standin(StandinConfig(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=1))
+    create_users(args.users)
+    plan_regeneration.RETRY_BASE_SECONDS = 0.05
+
+    rows = []
+    for concurrency in args.concurrency:
+        report = run_once(concurrency, args.tokens_per_minute)
+        rows.append({"concurrency": concurrency, "plans_per_min": report["plans_per_minute"],
+                     "written": report["written"], "failed": report["failed"], "throttled": report["throttled"],
+                     "batches": report["batches"], "elapsed_s": report["elapsed_s"]})
+    print_table(rows, list(rows[0]))
+
+    # Stop halfway, then resume from the checkpoint
+    path = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+    first = run_once(args.concurrency[-1], args.tokens_per_minute, limit=args.users // 2, checkpoint=Checkpoint.load(path))
+    resumed = run_once(args.concurrency[-1], args.tokens_per_minute, checkpoint=Checkpoint.load(path))
+    checkpoint = Checkpoint.load(path)
+    print(f"Resume: {first['written']} + {resumed['written']} written, {len(checkpoint.failed)} failed, "
+          f"{stored_plans()} stored plans for {args.users} users")
+
+    if args.out:
+        write_json(args.out, {"runs": rows, "resume": {"first": first, "resumed": resumed}, "standin": standin.stats})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# backend/benchmarks/plan_versions.py
+# Plan history storage (app/services/plan_versions.py) on a throwaway SQLite
+# database: each user's plan is edited --edits times the way partial edits
+# do (one meal or one day's workout at a time), then every version is
+# rebuilt and checked against the document that was saved. Reports bytes
+# stored per version (patch vs snapshot vs keeping a full copy each time)
+# and how long a rebuild takes.
+#
+#   python -m benchmarks.plan_versions --users 5 --edits 100
+#   python -m benchmarks.plan_versions --snapshot-every 50
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_endpoint import create_users  # also points the app at a temp database
+from benchmarks.agentcore_standin import sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, summarize, write_json
+from app.database import SessionLocal
+from app.models.models import PlanVersion, User
+from app.services import plan_versions
+from app.services.plan_versions import get_version, json_size, store_plan
+
+EDITS = ("meal", "workout", "tip")
+
+
+def edit(document: dict, rng: random.Random, step: int) -> dict:
+    """One small change, like a partial regeneration would make"""
+    kind = rng.choice(EDITS)
+    if kind == "meal":
+        day_meal = document["meal_plan"]["day_meal"]
+        slot = rng.choice(("breakfast", "lunch", "dinner"))
+        meal = dict(day_meal[slot] or {})
+        meal["name"] = f"{slot.title()} variation {step}"
+        meal["calories"] = rng.randint(350, 750)
+        day_meal[slot] = meal
+    elif kind == "workout":
+        days = [day for day, workout in document["workout_plan"].items() if isinstance(workout, dict) and workout]
+        workout = document["workout_plan"][rng.choice(days)]
+        for exercise in workout.get("exercises") or []:
+            exercise["name"] = f"{exercise['name'].split(' (')[0]} (v{step})"
+    else:
+        document["tips"] = document["tips"][1:] + [f"Tip added at step {step}"]
+    return document
+
+
+def run_user(user_id: str, edits: int, rng: random.Random) -> list:
+    """Save the initial plan plus `edits` changes; the expected document of every version"""
+    db = SessionLocal()
+    try:
+        document = sample_plan(SAMPLE_PROFILES[0])
+        document = {key: document[key] for key in ("health_metrics", "workout_plan", "meal_plan", "tips")}
+        expected = [copy.deepcopy(document)]
+        store_plan(db, user_id, copy.deepcopy(document), source="generate")
+        for step in range(edits):
+            document = edit(document, rng, step)
+            expected.append(copy.deepcopy(document))
+            store_plan(db, user_id, copy.deepcopy(document), source="edit")
+        return expected
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--edits", type=int, default=100, help="edits per user")
+    parser.add_argument("--snapshot-every", type=int, default=plan_versions.SNAPSHOT_EVERY)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    plan_versions.SNAPSHOT_EVERY = args.snapshot_every
+    rng = random.Random(args.seed)
+    create_users(args.users)
+    db = SessionLocal()
+    try:
+        user_ids = [user.id for user in db.query(User).order_by(User.created.desc()).limit(args.users)]
+    finally:
+        db.close()
+
+    # 1. Build the histories
+    start = time.perf_counter()
+    expected = {user_id: run_user(user_id, args.edits, rng) for user_id in user_ids}
+    write_ms = (time.perf_counter() - start) * 1000 / (args.users * (args.edits + 1))
+
+    # 2. Rebuild every version and compare
+    rebuild_ms, mismatches = [], 0
+    db = SessionLocal()
+    try:
+        for user_id, documents in expected.items():
+            for version, document in enumerate(documents, start=1):
+                start = time.perf_counter()
+                rebuilt = get_version(db, user_id, version)
+                rebuild_ms.append((time.perf_counter() - start) * 1000)
+                mismatches += rebuilt != document
+        rows = db.query(PlanVersion.kind, PlanVersion.size_bytes).filter(PlanVersion.user_id.in_(user_ids)).all()
+    finally:
+        db.close()
+
+    # 3. Storage against a full copy per version
+    full_bytes = sum(json_size(document) for documents in expected.values() for document in documents)
+    stored_bytes = sum(row.size_bytes for row in rows)
+    report = []
+    for kind in (plan_versions.SNAPSHOT, plan_versions.PATCH):
+        sizes = [row.size_bytes for row in rows if row.kind == kind]
+        if sizes:
+            report.append({"kind": kind, "rows": len(sizes), "avg_bytes": round(sum(sizes) / len(sizes))})
+    report.append({"kind": "full_copy", "rows": len(rows), "avg_bytes": round(full_bytes / len(rows))})
+    print_table(report, ["kind", "rows", "avg_bytes"])
+
+    rebuild = summarize(rebuild_ms)
+    print(f"Stored {stored_bytes / 1024:.0f} KiB vs {full_bytes / 1024:.0f} KiB as full copies "
+          f"({stored_bytes / full_bytes:.1%}); write {write_ms:.2f}ms/version")
+    print(f"Rebuild p50 {rebuild['p50']:.2f}ms, p95 {rebuild['p95']:.2f}ms; "
+          f"{mismatches} of {len(rebuild_ms)} versions differ from what was saved")
+
+    if args.out:
+        write_json(args.out, {"storage": report, "stored_bytes": stored_bytes, "full_bytes": full_bytes,
+                              "write_ms": write_ms, "rebuild_ms": rebuild, "mismatches": mismatches})
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
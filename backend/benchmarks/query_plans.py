@@ -0,0 +1,168 @@
+# backend/benchmarks/query_plans.py
+# Query plan audit for the hot lookups: runs the auth, profile and plan
+# endpoints (auth.py, profile.py, agent.py) through the ASGI app, records
+# every SELECT/UPDATE/DELETE they issue, EXPLAINs each one and fails
+# (exit 1) if any reads a table with a full scan instead of an index.
+#
+# The schema is built by the Alembic migrations (--revision picks how far),
+# so this checks what production runs, not just the models. Runs on a
+# throwaway SQLite database by default; point DATABASE_URL at an empty
+# PostgreSQL database to audit its planner (sequential scans are disabled
+# there, so small tables don't hide a missing index).
+#
+#   python -m benchmarks.query_plans
+#   python -m benchmarks.query_plans --revision f2b7c4d8e013   # before the unique indexes
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Must be set before the app modules read their configuration
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production")
+os.environ["AUTH_CACHE_BACKEND"] = "off"  # every request must reach the users lookup
+
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from benchmarks.agentcore_standin import sample_plan
+from benchmarks.common import SAMPLE_PROFILES, print_table, write_json
+from app.database import engine
+from app.main import app
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDITED = ("SELECT", "UPDATE", "DELETE")
+
+
+### Capture ###
+
+class QueryRecorder:
+    """Statements the engine executes, labelled with the request that issued them"""
+
+    def __init__(self):
+        self.label = None
+        self.queries = []
+        self._seen = set()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or executemany or not statement.lstrip().upper().startswith(AUDITED):
+            return
+        if (self.label, statement) not in self._seen:
+            self._seen.add((self.label, statement))
+            self.queries.append({"request": self.label, "statement": statement, "parameters": parameters})
+
+
+def run_requests(client: TestClient, recorder: QueryRecorder):
+    """The hot requests of auth.py, profile.py and agent.py, as one user"""
+    username, password = f"audit-{uuid.uuid4().hex[:12]}", "audit-password"
+    p = SAMPLE_PROFILES[0]
+    profile = {"age": p["age"], "weight": p["weight_lbs"], "height_feet": p["height_feet"],
+               "height_inches": p["height_inches"], "gender": p["gender"], "fitness_goal": p["fitness_goal"],
+               "activity_level": p["activity_level"], "workout_days_per_week": p["workout_days_per_week"],
+               "workout_duration_minutes": p["workout_duration_minutes"],
+               "available_equipment": p["available_equipment"], "dietary_preferences": p["dietary_preferences"]}
+    plan = {key: sample_plan(p)[key] for key in ("health_metrics", "workout_plan", "meal_plan", "tips")}
+    headers = {}
+
+    def call(label, method, path, **kwargs):
+        recorder.label = label
+        try:
+            response = client.request(method, path, headers=headers, **kwargs)
+        finally:
+            recorder.label = None
+        if response.status_code >= 400:
+            raise RuntimeError(f"{label} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+    token = call("POST /auth/register", "POST", "/auth/register",
+                 json={"username": username, "password": password}).json()["access_token"]
+    call("POST /auth/token", "POST", "/auth/token", data={"username": username, "password": password})
+    headers["Authorization"] = f"Bearer {token}"
+    call("GET /auth/me", "GET", "/auth/me")
+    call("POST /profile/ (create)", "POST", "/profile/", json=profile)
+    call("POST /profile/ (update)", "POST", "/profile/", json=profile)
+    call("GET /profile/", "GET", "/profile/")
+    call("POST /agent/save-plan (first)", "POST", "/agent/save-plan", json=plan)
+    call("POST /agent/save-plan", "POST", "/agent/save-plan", json=plan)
+    call("GET /agent/get-plan", "GET", "/agent/get-plan")
+    call("GET /agent/plan/history", "GET", "/agent/plan/history")
+    call("GET /agent/plan/versions/{version}", "GET", "/agent/plan/versions/1")
+
+
+### Plans ###
+
+def explain(conn, query: dict) -> list:
+    """(plan line, full table scan?) for each step of the query's plan"""
+    statement, parameters = query["statement"], query["parameters"]
+    if conn.dialect.name == "postgresql":
+        data = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        plan = (json.loads(data) if isinstance(data, str) else data)[0]["Plan"]
+        steps, nodes = [], [plan]
+        while nodes:
+            node = nodes.pop(0)
+            line = node["Node Type"]
+            if node.get("Index Name"):
+                line += f" using {node['Index Name']}"
+            if node.get("Relation Name"):
+                line += f" on {node['Relation Name']}"
+            steps.append((line, node["Node Type"] == "Seq Scan"))
+            nodes.extend(node.get("Plans", []))
+        return steps
+    # SQLite: "SEARCH t USING INDEX ..." is an index lookup, "SCAN t" reads the whole table
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [(row[-1], bool(re.match(r"SCAN \w+$", row[-1]))) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--revision", default="head", help="Alembic revision to build the schema at")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    # 1. Schema from the migrations
+    config = Config(os.path.join(BACKEND, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+    config.set_main_option("sqlalchemy.url", engine.url.render_as_string(hide_password=False))
+    command.upgrade(config, args.revision)
+
+    # 2. Record what the endpoints execute
+    recorder = QueryRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    try:
+        run_requests(TestClient(app), recorder)
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder)
+
+    # 3. EXPLAIN each statement
+    rows = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for query in recorder.queries:
+            steps = explain(conn, query)
+            full_scan = any(scan for _, scan in steps)
+            rows.append({"request": query["request"], "plan": "; ".join(line for line, _ in steps),
+                         "status": "FULL SCAN" if full_scan else "ok"})
+        conn.rollback()
+
+    print_table(rows, ["request", "plan", "status"])
+    if args.out:
+        write_json(args.out, {"revision": args.revision, "dialect": engine.dialect.name,
+                              "queries": [{**row, "statement": query["statement"]}
+                                          for row, query in zip(rows, recorder.queries)]})
+    scans = [row for row in rows if row["status"] != "ok"]
+    if scans:
+        print(f"{len(scans)} of {len(rows)} queries read a whole table")
+        sys.exit(1)
+    print(f"All {len(rows)} queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/tools_metrics.py
+# POST /tools/metrics against chaining /tools/bmi -> /bmr -> /tdee -> /macros
+# per profile, in process through the ASGI app (so it measures routing,
+# validation and serialization, not the network - every avoided round
+# trip saves a real RTT on top). Profiles are drawn from --distinct unique
+# inputs so the memo cache sees a realistic repeat rate.
+#
+#   python -m benchmarks.tools_metrics --requests 2000 --distinct 200
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from benchmarks.common import print_table, summarize, write_json
+from app.main import app
+from app.agent.health_calculations import metrics_cache_stats
+
+ACTIVITY = ["sedentary", "light", "moderate", "active", "very_active"]
+GOALS = ["lose_weight", "gain_weight", "maintain"]
+
+
+def random_profile(rng: random.Random) -> dict:
+    return {
+        "weight_lbs": rng.randint(110, 280), "height_feet": rng.randint(4, 6), "height_inches": rng.randint(0, 11),
+        "age": rng.randint(18, 70), "gender": rng.choice(["male", "female"]),
+        "activity_level": rng.choice(ACTIVITY), "goal": rng.choice(GOALS),
+    }
+
+
+def chained(client: TestClient, profile: dict) -> dict:
+    bmi = client.post("/tools/bmi", json=profile).json()
+    bmr = client.post("/tools/bmr", json=profile).json()
+    tdee = client.post("/tools/tdee", json={"bmr": bmr["bmr"], "activity_level": profile["activity_level"]}).json()
+    macros = client.post("/tools/macros", json={"tdee": tdee["tdee"], "goal": profile["goal"],
+                                                 "weight_lbs": profile["weight_lbs"]}).json()
+    return {"bmi": bmi, "bmr": bmr["bmr"], "tdee": tdee["tdee"], "macros": macros}
+
+
+def one_shot(client: TestClient, profile: dict) -> dict:
+    return client.post("/tools/metrics", json=profile).json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200, help="unique profiles the requests are drawn from")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pool = [random_profile(rng) for _ in range(args.distinct)]
+    profiles = [rng.choice(pool) for _ in range(args.requests)]
+    client = TestClient(app)
+
+    rows, mismatches = [], 0
+    for label, call in (("chained_4_calls", chained), ("metrics_1_call", one_shot)):
+        timings = []
+        results = []
+        for profile in profiles:
+            start = time.perf_counter()
+            results.append(call(client, profile))
+            timings.append((time.perf_counter() - start) * 1000)
+        stats = summarize(timings)
+        rows.append({"path": label, "p50_ms": stats["p50"], "p95_ms": stats["p95"],
+                     "total_s": round(sum(timings) / 1000, 2)})
+        if label == "chained_4_calls":
+            expected = results
+        else:
+            mismatches = sum(got != want for got, want in zip(results, expected))
+
+    print_table(rows, list(rows[0]))
+    cache = metrics_cache_stats()
+    print(f"Memo cache: {cache['hits']} hits / {cache['misses']} misses (hit rate {cache['hit_rate']:.1%}); "
+          f"{mismatches} of {len(profiles)} one-shot results differ from the chained calls")
+
+    if args.out:
+        write_json(args.out, {"runs": rows, "cache": cache, "mismatches": mismatches})
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
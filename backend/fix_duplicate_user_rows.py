@@ -0,0 +1,96 @@
+# backend/fix_duplicate_user_rows.py
+# Data fix to run before migration c93e1f7a4b68 (unique indexes on
+# users.user_name, user_profiles.user_id and fitness_plans.user_id), which
+# refuses to run while duplicates exist. By default it only reports every
+# conflict; review the report, then re-run with the fixes you agree to:
+#
+#   python fix_duplicate_user_rows.py                  # report only
+#   python fix_duplicate_user_rows.py --apply          # remove duplicate profiles and plans
+#   python fix_duplicate_user_rows.py --apply --rename-users
+#
+# Kept rows: the newest plan version per user, and the first profile by id
+# (profiles carry no timestamps). Duplicate user names are only reported
+# unless --rename-users is given: that changes login names, so the users
+# involved should be contacted first. Later accounts become "<name>~<id>".
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, select
+
+from app.database import engine
+from app.models.models import FitnessPlan, User, UserProfile
+
+
+def duplicate_groups(conn, table, column, *order_by) -> dict:
+    """{value: rows sharing it, keep-first order} for every duplicated value of column"""
+    duplicated = select(column).group_by(column).having(func.count() > 1).subquery()
+    rows = conn.execute(select(table).where(column.in_(select(duplicated))).order_by(column, *order_by)).all()
+    groups = {}
+    for row in rows:
+        groups.setdefault(getattr(row, column.name), []).append(row)
+    return groups
+
+
+def fix_user_names(conn, rename: bool) -> int:
+    users = User.__table__
+    groups = duplicate_groups(conn, users, users.c.user_name, users.c.created, users.c.id)
+    for user_name, rows in groups.items():
+        print(f"⚠️ User name '{user_name}' is shared by {len(rows)} accounts:")
+        for i, row in enumerate(rows):
+            new_name = f"{user_name}~{row.id[:8]}"
+            action = "keeps the name" if i == 0 else (f"renamed to '{new_name}'" if rename else f"would be renamed to '{new_name}'")
+            print(f"    user {row.id} (created {row.created}): {action}")
+            if i and rename:
+                conn.execute(users.update().where(users.c.id == row.id).values(user_name=new_name))
+    return len(groups)
+
+
+def fix_profiles(conn, apply: bool) -> int:
+    profiles = UserProfile.__table__
+    groups = duplicate_groups(conn, profiles, profiles.c.user_id, profiles.c.id)
+    for user_id, rows in groups.items():
+        removed = [row.id for row in rows[1:]]
+        print(f"⚠️ User {user_id} has {len(rows)} profiles: keeping {rows[0].id}, "
+              f"{'removed' if apply else 'would remove'} {', '.join(removed)}")
+        if apply:
+            conn.execute(profiles.delete().where(profiles.c.id.in_(removed)))
+    return len(groups)
+
+
+def fix_plans(conn, apply: bool) -> int:
+    plans = FitnessPlan.__table__
+    groups = duplicate_groups(conn, plans, plans.c.user_id, plans.c.version.desc().nulls_last(),
+                              plans.c.last_modified.desc().nulls_last(), plans.c.created_at.desc().nulls_last(),
+                              plans.c.id)
+    for user_id, rows in groups.items():
+        removed = [f"{row.id} (version {row.version}, modified {row.last_modified})" for row in rows[1:]]
+        print(f"⚠️ User {user_id} has {len(rows)} fitness plans: keeping {rows[0].id} (version {rows[0].version}), "
+              f"{'removed' if apply else 'would remove'} {', '.join(removed)}")
+        if apply:
+            # Their history stays in plan_versions
+            conn.execute(plans.delete().where(plans.c.id.in_([row.id for row in rows[1:]])))
+    return len(groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report (and optionally fix) rows that block the unique user indexes")
+    parser.add_argument("--apply", action="store_true", help="delete duplicate profiles and plans")
+    parser.add_argument("--rename-users", action="store_true", help="with --apply, rename later accounts sharing a user name")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        names = fix_user_names(conn, rename=args.apply and args.rename_users)
+        profiles = fix_profiles(conn, apply=args.apply)
+        plans = fix_plans(conn, apply=args.apply)
+
+    print(f"📋 Conflicts: {names} user name(s), {profiles} user(s) with several profiles, {plans} user(s) with several plans")
+    if not args.apply and (names or profiles or plans):
+        print("Nothing was changed. Re-run with --apply (and --rename-users for user names) after review.")
+    elif names and not args.rename_users:
+        print("Duplicate user names were left as they are; resolve them before running the migration.")
+
+
+if __name__ == "__main__":
+    main()